@@ -0,0 +1,67 @@
+"""
+Gunicorn configuration used by the Procfile.
+
+``GUNICORN_PROFILE`` selects how the app is served:
+
+- ``wsgi`` (default): sync workers running ``todo_project.wsgi``. Each
+  worker handles one request at a time.
+- ``asgi``: uvicorn workers running ``todo_project.asgi``. List and
+  detail reads go through the async views, so a worker keeps serving
+  other requests while one waits on the database. The ``/api/events/``
+  change feed is only served here; with the default in-process event
+  broker it is turned off (503, with a warning in the log) unless
+  ``WEB_CONCURRENCY`` is 1.
+
+``WEB_CONCURRENCY`` sets the number of worker processes (Heroku sets it
+from the dyno size).
+
+The workers share their Prometheus metrics (served at ``/metrics``)
+through files in ``PROMETHEUS_MULTIPROC_DIR``, so every scrape sees the
+totals of all workers whichever one answers it.
+"""
+import os
+import shutil
+import tempfile
+
+profile = os.environ.get('GUNICORN_PROFILE', 'wsgi').lower()
+
+if profile == 'asgi':
+    wsgi_app = 'todo_project.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+elif profile == 'wsgi':
+    wsgi_app = 'todo_project.wsgi:application'
+    worker_class = 'sync'
+else:
+    raise RuntimeError(f'Unknown GUNICORN_PROFILE "{profile}"; use "wsgi" or "asgi".')
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+bind = '0.0.0.0:' + os.environ.get('PORT', '8000')
+
+# Set before the workers import prometheus_client, which reads it then.
+prometheus_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'chorify-prometheus'),
+)
+
+
+def on_starting(server):
+    # Files left by a previous run would be merged into the totals.
+    shutil.rmtree(prometheus_dir, ignore_errors=True)
+    os.makedirs(prometheus_dir, exist_ok=True)
+
+
+def post_worker_init(worker):
+    from todo_api.metrics import record_worker
+
+    record_worker(worker)
+    if profile == 'asgi':
+        from todo_api.events import check_worker_count
+
+        check_worker_count(worker.cfg.workers)
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
@@ -3,16 +3,24 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
 from .models import User
 from django.contrib import admin
-from .models import ShoppingList, ToDoList
+from .models import ShoppingList, ShoppingItem, ToDoList
+
+class ShoppingItemInline(admin.TabularInline):
+    model = ShoppingItem
+    fields = ('item', 'quantity', 'checked', 'position')
+    extra = 0
 
 class ShoppingListAdmin(admin.ModelAdmin):
     list_display = ('name', 'user') 
+    list_select_related = ('user',)
     search_fields = ('name', 'user__email')
     list_filter = ('user',)
+    inlines = [ShoppingItemInline]
 admin.site.register(ShoppingList, ShoppingListAdmin)
 
 class ToDoListAdmin(admin.ModelAdmin):
     list_display = ('description', 'user', 'done', 'due_date') 
+    list_select_related = ('user',)
     search_fields = ('description', 'user__email')
     list_filter = ('user', 'done', 'due_date')
 admin.site.register(ToDoList, ToDoListAdmin)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TodoApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'todo_api'
+
+    def ready(self):
+        from . import metrics, signals  # noqa: F401
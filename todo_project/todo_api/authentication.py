@@ -0,0 +1,155 @@
+import copy
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .instrumentation import record_cache_lookup
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    ``TokenAuthentication`` that remembers token -> (user, token) pairs.
+
+    A warm request authenticates without touching the database. Entries
+    live in the backend described by ``TODO_API_TOKEN_CACHE`` and are
+    dropped when the token is deleted (logout) and when its user is saved
+    (deactivation, profile changes) or deleted; see ``signals.py``. The
+    backend's timeout bounds how long another process can keep using an
+    entry that was invalidated elsewhere.
+
+    Like ``ListCache``, entry keys embed a per-token generation that
+    invalidation drops. A miss reads the generation before the database,
+    so an invalidation landing between that read and the write orphans
+    the entry instead of leaving a revoked token cached.
+
+    Inactive users and unknown tokens are never cached, so failures
+    always go through the database.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        if cache is None:
+            return super().authenticate_credentials(key)
+
+        cache_key = token_cache_key(cache, key)
+        entry = cache.get(cache_key)
+        record_cache_lookup('token', entry is not None)
+        if entry is None:
+            entry = super().authenticate_credentials(key)
+            cache.set(cache_key, entry)
+        user, token = entry
+        # Hand out copies so one request cannot modify another's user.
+        return copy.copy(user), copy.copy(token)
+
+    async def aauthenticate(self, request):
+        """
+        Async counterpart of ``authenticate`` for plain Django requests,
+        used by the async views. Returns ``(user, token)`` or None when
+        the request carries no token.
+        """
+        key = _TokenKeyParser(keyword=self.keyword).authenticate(request)
+        if key is None:
+            return None
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        cache = get_token_cache()
+        entry = None
+        if cache is not None:
+            cache_key = token_cache_key(cache, key)
+            entry = cache.get(cache_key)
+            record_cache_lookup('token', entry is not None)
+        if entry is None:
+            model = self.get_model()
+            try:
+                token = await model.objects.select_related('user').aget(key=key)
+            except model.DoesNotExist:
+                raise AuthenticationFailed(_('Invalid token.'))
+            if not token.user.is_active:
+                raise AuthenticationFailed(_('User inactive or deleted.'))
+            entry = (token.user, token)
+            if cache is not None:
+                cache.set(cache_key, entry)
+        user, token = entry
+        return copy.copy(user), copy.copy(token)
+
+
+class _TokenKeyParser(TokenAuthentication):
+    """
+    Reuses DRF's ``Authorization`` header parsing (and its error
+    messages) but returns the token key instead of looking it up.
+    """
+
+    def __init__(self, keyword):
+        self.keyword = keyword
+
+    def authenticate_credentials(self, key):
+        return key
+
+
+def _token_digest(key):
+    # Raw tokens are credentials; only a digest is used in cache keys.
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def token_cache_key(cache, key):
+    """
+    Returns the entry key of token ``key`` under its current generation,
+    starting a generation if it has none.
+    """
+    digest = _token_digest(key)
+    generation_key = f'auth-token:gen:{digest}'
+    generation = cache.get(generation_key)
+    if generation is None:
+        # Random, so a dropped generation never comes back.
+        generation = uuid.uuid4().hex
+        cache.set(generation_key, generation, timeout=None)
+    return f'auth-token:{digest}:{generation}'
+
+
+def invalidate_tokens(keys):
+    """
+    Drops the cached authentication of the given token keys by dropping
+    their generations, which orphans entries being written concurrently
+    too.
+    """
+    cache = get_token_cache()
+    if cache is None:
+        return
+    for key in keys:
+        cache.delete(f'auth-token:gen:{_token_digest(key)}')
+
+
+_token_cache = None
+_configured = False
+
+
+def get_token_cache():
+    """
+    Returns the backend described by the ``TODO_API_TOKEN_CACHE``
+    setting, or None when token caching is disabled.
+    """
+    global _token_cache, _configured
+    if not _configured:
+        config = getattr(settings, 'TODO_API_TOKEN_CACHE', None)
+        if config and config.get('BACKEND'):
+            _token_cache = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+        else:
+            _token_cache = None
+        _configured = True
+    return _token_cache
+
+
+@receiver(setting_changed)
+def reset_token_cache(*, setting, **kwargs):
+    global _token_cache, _configured
+    if setting == 'TODO_API_TOKEN_CACHE':
+        _token_cache = None
+        _configured = False
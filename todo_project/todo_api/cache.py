@@ -0,0 +1,210 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .instrumentation import record_cache_lookup
+
+DEFAULT_TIMEOUT = object()
+
+
+class LRUCacheBackend:
+    """
+    Bounded, thread-safe in-process cache.
+
+    Values are stored as-is (no pickling), so a hit costs a dict lookup.
+    The least recently used entry is evicted once ``max_entries`` is
+    reached. ``timeout`` (seconds) is optional.
+    """
+
+    def __init__(self, max_entries=1024, timeout=None):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.timeout
+        expires = time.monotonic() + timeout if timeout is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DjangoCacheBackend:
+    """
+    Stores entries in one of the caches configured in ``CACHES``.
+
+    With a shared cache (Redis, Memcached) invalidations are seen by every
+    worker process.
+    """
+
+    def __init__(self, alias='default', timeout=300):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.timeout
+        self.cache.set(key, value, timeout)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class ListCache:
+    """
+    Caches list responses per user and resource.
+
+    Each (resource, user) pair has a generation token stored in the
+    backend; entry keys embed it, so invalidating a user's lists is a
+    single write that orphans every cached variant (pagination, envelope,
+    ...) at once. Orphaned entries age out of the backend.
+
+    Entries are ``(etag, data)`` pairs. With ``validate`` enabled the
+    caller passes the current ETag to ``get`` and stale entries count as
+    misses. That keeps per-process backends correct when another worker
+    handled the write.
+    """
+
+    def __init__(self, backend, validate=True, key_prefix='lists'):
+        self.backend = backend
+        self.validate = validate
+        self.key_prefix = key_prefix
+        self.hits = 0
+        self.misses = 0
+        # Threaded workers serve requests concurrently; += is not atomic.
+        self._stats_lock = threading.Lock()
+
+    def generation_key(self, resource, user_id):
+        return f'{self.key_prefix}:gen:{resource}:{user_id}'
+
+    def make_key(self, resource, user_id, variant):
+        """
+        Returns the entry key for one representation of a user's list.
+        """
+        generation_key = self.generation_key(resource, user_id)
+        generation = self.backend.get(generation_key)
+        if generation is None:
+            # A fresh random token, never a counter, so an evicted
+            # generation cannot resurrect entries written under it.
+            generation = uuid.uuid4().hex
+            self.backend.set(generation_key, generation, timeout=None)
+        digest = hashlib.md5(variant.encode('utf-8')).hexdigest()
+        return f'{self.key_prefix}:{resource}:{user_id}:{generation}:{digest}'
+
+    def get(self, key, etag=None):
+        """
+        Returns the cached ``(etag, data)`` pair for ``key``, or None.
+
+        If ``etag`` is given, an entry cached under a different ETag is
+        treated as a miss.
+        """
+        entry = self.backend.get(key)
+        if entry is not None and etag is not None and entry[0] != etag:
+            entry = None
+        with self._stats_lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        record_cache_lookup('list', entry is not None)
+        return entry
+
+    def set(self, key, etag, data):
+        self.backend.set(key, (etag, data))
+
+    def invalidate(self, resource, user_id):
+        """
+        Drops every cached representation of ``resource`` for a user.
+        """
+        self.backend.set(self.generation_key(resource, user_id), uuid.uuid4().hex, timeout=None)
+
+    def stats(self):
+        """
+        Returns the hit and miss counters of this process.
+        """
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / total if total else 0.0,
+        }
+
+
+_list_cache = None
+_configured = False
+
+
+def get_list_cache():
+    """
+    Returns the process-wide ``ListCache`` described by the
+    ``TODO_API_LIST_CACHE`` setting, or None when caching is disabled.
+    """
+    global _list_cache, _configured
+    if not _configured:
+        config = getattr(settings, 'TODO_API_LIST_CACHE', None)
+        if config and config.get('BACKEND'):
+            backend = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+            _list_cache = ListCache(
+                backend,
+                validate=config.get('VALIDATE', True),
+                key_prefix=config.get('KEY_PREFIX', 'lists'),
+            )
+        else:
+            _list_cache = None
+        _configured = True
+    return _list_cache
+
+
+@receiver(setting_changed)
+def reset_list_cache(*, setting, **kwargs):
+    global _list_cache, _configured
+    if setting == 'TODO_API_LIST_CACHE':
+        _list_cache = None
+        _configured = False
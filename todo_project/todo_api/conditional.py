@@ -0,0 +1,270 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from .cache import get_list_cache
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The resource has been modified since it was last fetched.'
+    default_code = 'precondition_failed'
+
+
+def make_etag(*parts):
+    """
+    Builds a strong, quoted ETag from the given version parts.
+    """
+    digest = hashlib.sha1(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return quote_etag(digest)
+
+
+def representation_variant(request):
+    """
+    Describes everything in the request that changes the response body
+    for the same data: the query string and the negotiated media type.
+    """
+    # DRF requests expose ``query_params``; plain Django ones (async views) ``GET``.
+    query_params = getattr(request, 'query_params', None) or request.GET
+    params = urlencode(sorted(query_params.lists()), doseq=True)
+    return f'{params}|{getattr(request, "accepted_media_type", "")}'
+
+
+def owner_fingerprint(user):
+    """
+    The owner is nested in every row, so its serialized fields are part
+    of the version too.
+    """
+    return f'{user.pk}/{user.email}/{user.is_active}/{user.is_staff}'
+
+
+def collection_etag(queryset, request):
+    """
+    Computes the ETag of a user's collection without serializing it.
+
+    ``queryset`` must include tombstones (``all_objects``) so that
+    deletions bump the version. The newest ``updated_at`` changes on every
+    write and soft delete, and the row count changes when tombstones are
+    purged; both come from one aggregate over the ``(user, updated_at)``
+    index.
+
+    Parameters:
+    - queryset: All rows of the collection, including tombstones.
+    - request: The DRF request the response is built for.
+
+    Returns:
+    A strong, quoted ETag string.
+    """
+    version = queryset.aggregate(latest=Max('updated_at'), count=Count('id'))
+    return version_etag(queryset, version, request)
+
+
+async def acollection_etag(queryset, request):
+    """
+    Async counterpart of ``collection_etag``.
+    """
+    version = await queryset.aaggregate(latest=Max('updated_at'), count=Count('id'))
+    return version_etag(queryset, version, request)
+
+
+def version_etag(queryset, version, request):
+    return make_etag(
+        queryset.model._meta.label,
+        owner_fingerprint(request.user),
+        version['latest'].isoformat() if version['latest'] else '',
+        version['count'],
+        representation_variant(request),
+    )
+
+
+def instance_version(instance):
+    """
+    Identifies the stored state of a single row, from its primary key,
+    ``updated_at`` and owner, whatever representation it is sent in.
+    """
+    return make_etag(
+        instance._meta.label,
+        instance.pk,
+        instance.updated_at.isoformat(),
+        owner_fingerprint(instance.user),
+    ).strip('"')
+
+
+def instance_etag(instance, request):
+    """
+    Computes the ETag of a single row as ``"<version>-<variant>"``.
+
+    The whole value tells representations apart for ``If-None-Match``;
+    ``If-Match`` only compares the version (see ``version_matches``), so
+    an ETag fetched with ``?fields=`` still guards a plain write.
+    """
+    variant = make_etag(representation_variant(request)).strip('"')
+    return quote_etag(f'{instance_version(instance)}-{variant}')
+
+
+def etag_matches(header, etag, weak=True):
+    """
+    Returns True if ``etag`` satisfies an ``If-None-Match`` (weak
+    comparison) or ``If-Match`` (strong comparison, ``weak=False``)
+    header value.
+    """
+    if not header:
+        return False
+    candidates = parse_etags(header)
+    if candidates == ['*']:
+        return True
+    if weak:
+        return etag in (candidate.removeprefix('W/') for candidate in candidates)
+    return etag in candidates
+
+
+def version_matches(header, version):
+    """
+    Returns True if an ``If-Match`` header value names a strong ETag of
+    the row version ``version``, in any representation, or is ``*``.
+    """
+    if not header:
+        return False
+    candidates = parse_etags(header)
+    if candidates == ['*']:
+        return True
+    return any(
+        not candidate.startswith('W/') and candidate.strip('"').partition('-')[0] == version
+        for candidate in candidates
+    )
+
+
+def not_modified(etag):
+    """
+    Returns an empty 304 response carrying the current ETag.
+    """
+    return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+
+class ConditionalListMixin:
+    """
+    Wraps a list view's GET in ETag handling and the list cache.
+
+    ``list()`` only builds the representation. This mixin computes the
+    collection ETag, answers a matching ``If-None-Match`` with 304, serves
+    cached payloads, and stores fresh ones under the key for the user,
+    resource and request variant.
+    """
+    cache_resource = None
+    version_model = None
+
+    def get_version_queryset(self):
+        return self.version_model.all_objects.filter(user=self.request.user)
+
+    def get(self, request, *args, **kwargs):
+        cache = get_list_cache()
+        etag = entry = key = None
+        if cache is None or cache.validate:
+            etag = collection_etag(self.get_version_queryset(), request)
+        if cache is not None:
+            key = self.get_cache_key(cache, request)
+            entry = cache.get(key, etag)
+            if entry is not None:
+                etag = entry[0]
+            elif etag is None:
+                etag = collection_etag(self.get_version_queryset(), request)
+
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return not_modified(etag)
+
+        if entry is not None:
+            response = Response(entry[1], status=status.HTTP_200_OK, content_type='application/json')
+        else:
+            response = self.list(request, *args, **kwargs)
+            if key is not None and response.status_code == status.HTTP_200_OK:
+                cache.set(key, etag, response.data)
+        response['ETag'] = etag
+        return response
+
+    async def aget(self, request, *args, **kwargs):
+        """
+        Async counterpart of ``get``, used by the async views. The
+        version aggregate and the rows (``alist()``) are read with the
+        async ORM. The cache is used synchronously, so the async views
+        expect an in-process or network cache, not a database one.
+        """
+        cache = get_list_cache()
+        etag = entry = key = None
+        if cache is None or cache.validate:
+            etag = await acollection_etag(self.get_version_queryset(), request)
+        if cache is not None:
+            key = self.get_cache_key(cache, request)
+            entry = cache.get(key, etag)
+            if entry is not None:
+                etag = entry[0]
+            elif etag is None:
+                etag = await acollection_etag(self.get_version_queryset(), request)
+
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return not_modified(etag)
+
+        if entry is not None:
+            response = Response(entry[1], status=status.HTTP_200_OK, content_type='application/json')
+        else:
+            response = await self.alist(request, *args, **kwargs)
+            if key is not None and response.status_code == status.HTTP_200_OK:
+                cache.set(key, etag, response.data)
+        response['ETag'] = etag
+        return response
+
+    def get_cache_key(self, cache, request):
+        variant = f'{request.get_host()}|{representation_variant(request)}'
+        return cache.make_key(self.cache_resource, request.user.pk, variant)
+
+
+class ConditionalWriteMixin:
+    """
+    Adds ``If-Match`` lost-update protection to a
+    ``RetrieveUpdateDestroyAPIView``.
+
+    When the header is present on PUT, PATCH or DELETE, the row is read
+    with ``SELECT ... FOR UPDATE`` by the lookup the view performs anyway,
+    its version is compared with the one in the ETag, and a mismatch
+    fails with 412 before anything is written. No extra read is needed.
+    """
+
+    def requires_precondition(self):
+        return self.request.method not in SAFE_METHODS and 'If-Match' in self.request.headers
+
+    def requires_lock(self):
+        """
+        Returns True when the row must be read ``FOR UPDATE``. Views that
+        compute the new state from the stored one extend this.
+        """
+        return self.requires_precondition()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.requires_lock():
+            queryset = queryset.select_for_update(of=('self',))
+        return queryset
+
+    def get_object(self):
+        instance = super().get_object()
+        if self.requires_precondition():
+            if not version_matches(self.request.headers['If-Match'], instance_version(instance)):
+                raise PreconditionFailed()
+        self.object = instance
+        return instance
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            response = super().update(request, *args, **kwargs)
+        response['ETag'] = instance_etag(self.object, request)
+        return response
+
+    def destroy(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().destroy(request, *args, **kwargs)
@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import deque
+
+from django.db.backends.postgresql.base import Database
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresDatabaseWrapper
+
+
+class ConnectionPool:
+    """
+    A bounded, thread-safe pool of open psycopg2 connections.
+
+    At most ``max_size`` connections are checked out at once; ``get``
+    waits up to ``timeout`` seconds for one to be returned and then
+    fails with ``OperationalError``. Returned connections are reset
+    (rolled back, session settings cleared) before being handed out
+    again. With ``health_checks`` a connection that has been idle for
+    more than ``check_after`` seconds is pinged before reuse and replaced
+    if the server dropped it; one returned moments ago was just reset
+    successfully, so it skips the round trip.
+    """
+
+    def __init__(self, max_size=10, timeout=5, health_checks=True, check_after=1.0):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_checks = health_checks
+        self.check_after = check_after
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def get(self, connect):
+        """
+        Returns an idle connection, or a new one made by ``connect()``.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise Database.OperationalError(
+                f'No database connection became free within {self.timeout}s '
+                f'(pool size {self.max_size}).'
+            )
+        try:
+            while True:
+                with self._lock:
+                    connection, returned = self._idle.pop() if self._idle else (None, None)
+                if connection is None:
+                    return connect()
+                if self.is_usable(connection, time.monotonic() - returned):
+                    return connection
+                self.discard(connection)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def put(self, connection):
+        try:
+            if connection.closed or connection.info.transaction_status == Database.extensions.TRANSACTION_STATUS_UNKNOWN:
+                self.discard(connection)
+                return
+            try:
+                connection.reset()
+            except Database.Error:
+                self.discard(connection)
+                return
+            with self._lock:
+                self._idle.append((connection, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def is_usable(self, connection, idle_for=None):
+        if connection.closed:
+            return False
+        if not self.health_checks or (idle_for is not None and idle_for <= self.check_after):
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Database.Error:
+            return False
+        return True
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except Database.Error:
+            pass
+
+    def close(self):
+        """
+        Closes every idle connection.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for connection, _ in idle:
+            self.discard(connection)
+
+    def __len__(self):
+        return len(self._idle)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class DatabaseWrapper(PostgresDatabaseWrapper):
+    """
+    PostgreSQL backend that borrows connections from a per-process pool
+    instead of opening one per thread.
+
+    Django keeps one connection per thread. That is fine for sync workers
+    with ``CONN_MAX_AGE``, but under ASGI every request runs its database
+    work in a new thread, so persistent connections cannot be reused and
+    each request pays for a fresh connection. With this backend Django's
+    "close" returns the connection to the pool, so set ``CONN_MAX_AGE``
+    to 0 and let the pool keep connections open.
+
+    Configured with the ``POOL`` key of the database settings:
+    ``MAX_SIZE`` (connections per process, default 10) and ``TIMEOUT``
+    (seconds to wait for a free connection, default 5). When
+    ``CONN_HEALTH_CHECKS`` is on, connections idle for longer than
+    ``HEALTH_CHECK_AFTER`` seconds (default 1) are checked before reuse.
+    """
+
+    @property
+    def pool(self):
+        key = (self.alias, self.settings_dict['NAME'])
+        pool = _pools.get(key)
+        if pool is None:
+            with _pools_lock:
+                pool = _pools.get(key)
+                if pool is None:
+                    options = self.settings_dict.get('POOL') or {}
+                    pool = _pools[key] = ConnectionPool(
+                        max_size=options.get('MAX_SIZE', 10),
+                        timeout=options.get('TIMEOUT', 5),
+                        health_checks=self.settings_dict['CONN_HEALTH_CHECKS'],
+                        check_after=options.get('HEALTH_CHECK_AFTER', 1.0),
+                    )
+        return pool
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.get(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        # A reused connection was opened by another thread's wrapper and
+        # reset to the server's default isolation level since.
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get('isolation_level', connection.isolation_level)
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.put(self.connection)
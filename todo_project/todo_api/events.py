@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Sent instead of the queued events when a subscriber falls behind: the
+# client should refetch its lists.
+RESYNC = {'action': 'resync'}
+
+
+class Subscription:
+    """
+    One client's queue of events, owned by the event loop that serves
+    the stream. ``push`` may be called from any thread.
+    """
+
+    def __init__(self, broker, user_id, max_queued):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(max_queued)
+
+    def push(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The loop is closed; the stream is gone.
+            pass
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Rather than buffering without bound for a slow client, drop
+            # its backlog and tell it to resync.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """
+    Thread-safe publish/subscribe within one process.
+
+    Writes happen in sync views (worker threads) and streams are served
+    by the event loop, so ``publish`` hands events over with
+    ``call_soon_threadsafe``. Subscribers only see events published in
+    their own process: run a single ASGI worker, or plug in a backend
+    with the same ``subscribe``/``unsubscribe``/``publish`` methods that
+    relays events between processes. ``check_worker_count`` turns the
+    stream off when there are several workers.
+    """
+    # Events never leave the process that published them.
+    per_process = True
+
+    def __init__(self, max_queued=100):
+        self.max_queued = max_queued
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        """
+        Returns a ``Subscription`` for the events of ``user_id``. Must be
+        called from the event loop that will read it.
+        """
+        subscription = Subscription(self, user_id, self.max_queued)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            subscription.push(event)
+
+
+def publish_event(user_id, resource, action, pk, updated_at=None):
+    """
+    Publishes a change to the user's event stream once the current
+    transaction commits, so clients never refetch uncommitted state.
+
+    Parameters:
+    - user_id: The owner of the changed row.
+    - resource: ``'todo-list'`` or ``'shopping-list'``.
+    - action: ``'created'``, ``'updated'`` or ``'deleted'``.
+    - pk: The primary key of the row.
+    - updated_at: The row's new ``updated_at``, if known.
+    """
+    broker = get_event_broker()
+    if broker is None:
+        return
+    event = {
+        'resource': resource,
+        'action': action,
+        'id': pk,
+        'updated_at': updated_at.isoformat() if updated_at else None,
+    }
+    transaction.on_commit(lambda: broker.publish(user_id, event))
+
+
+def publish_resync(user_id):
+    """
+    Tells the user's streams to refetch everything once the current
+    transaction commits, for changes too large to send row by row.
+    """
+    broker = get_event_broker()
+    if broker is None:
+        return
+    transaction.on_commit(lambda: broker.publish(user_id, RESYNC))
+
+
+_broker = None
+_configured = False
+_disabled_reason = None
+
+
+def get_event_broker():
+    """
+    Returns the broker described by the ``TODO_API_EVENT_BROKER``
+    setting, or None when the event stream is disabled.
+    """
+    global _broker, _configured
+    if _disabled_reason is not None:
+        return None
+    if not _configured:
+        config = getattr(settings, 'TODO_API_EVENT_BROKER', None)
+        if config and config.get('BACKEND'):
+            _broker = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+        else:
+            _broker = None
+        _configured = True
+    return _broker
+
+
+def check_worker_count(workers):
+    """
+    Turns the event stream off in a server with several worker processes
+    when the configured broker only delivers events within a process: a
+    client would miss every change saved by a worker other than the one
+    holding its stream. The workers keep serving everything else, and
+    ``/api/events/`` answers 503 until the server runs a single worker
+    or a broker shared between processes. Called by gunicorn.conf.py
+    when serving ASGI.
+
+    Parameters:
+    - workers: The number of worker processes of the server.
+    """
+    global _disabled_reason
+    _disabled_reason = None
+    broker = get_event_broker()
+    if workers > 1 and getattr(broker, 'per_process', False):
+        _disabled_reason = (
+            f'The event stream is disabled: {type(broker).__name__} only reaches streams in its own '
+            f'process, but the server runs {workers} workers.'
+        )
+        logger.warning(
+            '%s Set WEB_CONCURRENCY=1 or configure a TODO_API_EVENT_BROKER shared between processes.',
+            _disabled_reason,
+        )
+
+
+def event_stream_disabled():
+    """
+    Returns why ``check_worker_count`` turned the event stream off in
+    this process, or None.
+    """
+    return _disabled_reason
+
+
+@receiver(setting_changed)
+def reset_event_broker(*, setting, **kwargs):
+    global _broker, _configured
+    if setting == 'TODO_API_EVENT_BROKER':
+        _broker = None
+        _configured = False
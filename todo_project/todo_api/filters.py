@@ -0,0 +1,96 @@
+from django.db import connections
+from django.db.models import Func
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+# Text search configuration of the GIN index in migration 0013. 'simple'
+# lowercases words without stemming, which suits todos in any language.
+SEARCH_CONFIG = 'simple'
+
+
+class SearchDocument(Func):
+    """
+    ``to_tsvector`` written exactly like the expression of the GIN index,
+    which Postgres only uses for queries repeating that expression.
+    Django's ``SearchVector`` would add a ``COALESCE`` and miss the index.
+    """
+    function = 'to_tsvector'
+    template = "%(function)s('" + SEARCH_CONFIG + "'::regconfig, %(expressions)s)"
+
+
+class ToDoListFilter(BaseFilterBackend):
+    """
+    Narrows a user's todos down to what the client displays, in SQL:
+
+    - ``done``: ``true`` or ``false``.
+    - ``due_before`` / ``due_after``: ISO dates, exclusive; todos
+      without a due date never match.
+    - ``q``: words that must all appear in the description. Postgres
+      runs a full-text search (``websearch_to_tsquery`` syntax, so
+      ``"exact phrase"`` and ``-word`` work) on the GIN index; other
+      databases fall back to a case-insensitive substring match of the
+      whole string.
+    - ``ordering``: ``id`` or ``due_date``, ``-`` for descending order.
+      Paginated requests are ordered by the paginator, which accepts the
+      same values, so both return rows in the same order.
+
+    Invalid values are rejected with a 400 naming the parameter.
+    """
+    max_search_length = 200
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        errors = {}
+        filters = {}
+        for param, lookup, field in (
+            ('done', 'done', serializers.BooleanField()),
+            ('due_before', 'due_date__lt', serializers.DateField()),
+            ('due_after', 'due_date__gt', serializers.DateField()),
+        ):
+            if param not in params:
+                continue
+            try:
+                filters[lookup] = field.to_internal_value(params[param])
+            except serializers.ValidationError as exc:
+                errors[param] = exc.detail
+
+        search = params.get('q', '').strip()
+        if len(search) > self.max_search_length:
+            errors['q'] = [f'Ensure this value has at most {self.max_search_length} characters.']
+        orderings = getattr(getattr(view, 'paginator', None), 'orderings', None)
+        if 'ordering' in params and orderings is not None:
+            field = serializers.ChoiceField([prefix + name for name in orderings for prefix in ('', '-')])
+            try:
+                field.to_internal_value(params['ordering'])
+            except serializers.ValidationError as exc:
+                errors['ordering'] = exc.detail
+        if errors:
+            raise ValidationError(errors)
+
+        queryset = queryset.filter(**filters)
+        if search:
+            queryset = self.search(queryset, search)
+        return self.order(request, queryset, view)
+
+    def search(self, queryset, search):
+        """
+        Filters ``queryset`` to the todos whose description matches
+        ``search``.
+        """
+        if connections[queryset.db].vendor != 'postgresql':
+            return queryset.filter(description__icontains=search)
+        # Imports psycopg2, so only on Postgres.
+        from django.contrib.postgres.search import SearchQuery, SearchVectorField
+
+        document = SearchDocument('description', output_field=SearchVectorField())
+        query = SearchQuery(search, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.alias(search_document=document).filter(search_document=query)
+
+    def order(self, request, queryset, view):
+        paginator = getattr(view, 'paginator', None)
+        if 'ordering' not in request.query_params or not hasattr(paginator, 'get_ordering'):
+            return queryset
+        if paginator.is_requested(request):
+            return queryset
+        return queryset.order_by(*paginator.get_order_by(paginator.get_ordering(request)))
@@ -0,0 +1,32 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    Django's ASGI handler, except that streaming response bodies are
+    produced in the request's sync thread instead of on the event loop.
+
+    Django 4.1 iterates a ``StreamingHttpResponse`` on the loop, where
+    the ORM refuses to run, so a body read from the database (the export)
+    would fail. Here every chunk is pulled with ``sync_to_async``, on the
+    thread (and database connection) the view ran on, and sent before
+    Django's closing message.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        chunks = iter(response.streaming_content)
+        # Django still sends the headers and closes the response.
+        response.streaming_content = ()
+        next_chunk = sync_to_async(next, thread_sensitive=True)
+
+        async def send_with_body(message):
+            if message['type'] == 'http.response.body' and not message.get('more_body', False):
+                while (chunk := await next_chunk(chunks, None)) is not None:
+                    if chunk:
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send(message)
+
+        await super().send_response(response, send_with_body)
@@ -0,0 +1,136 @@
+import heapq
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.dispatch import Signal
+
+# Sent by RequestTimingMiddleware after every request, with ``request``,
+# ``response`` and ``metrics`` (a RequestMetrics) as arguments.
+request_measured = Signal()
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    Where the time of one request went: wall time, database time and
+    query count, and named sections such as serialization and rendering.
+
+    Times are in seconds. ``queries`` keeps the duration and SQL (without
+    parameters) of the ``max_queries`` slowest queries for the slow
+    request log, as a heap (smallest first, unordered otherwise); the
+    count and the total time include every query. ``cache_lookups``
+    counts hits and misses per ``(cache, hit)`` pair, and
+    ``response_bytes`` is the size of a non-streaming response body.
+    """
+
+    def __init__(self, max_queries=20):
+        self.started = time.perf_counter()
+        self.max_queries = max_queries
+        self.total = None
+        self.query_count = 0
+        self.db_time = 0.0
+        self.queries = []
+        self.sections = {}
+        self.cache_lookups = {}
+        self.response_bytes = None
+
+    def add_query(self, sql, duration):
+        self.query_count += 1
+        self.db_time += duration
+        if len(self.queries) < self.max_queries:
+            heapq.heappush(self.queries, (duration, sql))
+        elif self.max_queries and duration > self.queries[0][0]:
+            heapq.heappushpop(self.queries, (duration, sql))
+
+    def add_section(self, name, duration):
+        self.sections[name] = self.sections.get(name, 0.0) + duration
+
+    def add_cache_lookup(self, cache, hit):
+        key = (cache, hit)
+        self.cache_lookups[key] = self.cache_lookups.get(key, 0) + 1
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def server_timing(self):
+        """
+        Formats the metrics as a ``Server-Timing`` header value, in
+        milliseconds.
+        """
+        entries = [
+            f'total;dur={self.total * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.query_count} queries"',
+        ]
+        entries += [f'{name};dur={duration * 1000:.1f}' for name, duration in self.sections.items()]
+        return ', '.join(entries)
+
+
+def current_metrics():
+    """
+    Returns the metrics of the request being handled, or None outside
+    an instrumented request.
+    """
+    return _current.get()
+
+
+@contextmanager
+def measuring(metrics):
+    """
+    Makes ``metrics`` the current request's metrics inside the block. A
+    context variable carries them, so they follow the request into the
+    threads ``sync_to_async`` runs sync code in.
+    """
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed(name):
+    """
+    Adds the time spent in the block to the section ``name`` of the
+    current request's metrics. Costs one context variable lookup when no
+    request is being measured.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_section(name, time.perf_counter() - started)
+
+
+def record_cache_lookup(cache, hit):
+    """
+    Counts a hit or miss of ``cache`` (``'list'`` or ``'token'``) in the
+    current request's metrics, if any.
+    """
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_cache_lookup(cache, hit)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    ``execute_wrapper`` that adds every query's duration to the current
+    request's metrics.
+
+    It stays installed on each connection (see ``signals.py``) instead
+    of being added per request: connections belong to threads, and the
+    queries of an async request run in other threads than its middleware.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, time.perf_counter() - started)
@@ -0,0 +1,166 @@
+import bisect
+
+from .models import ShoppingItem
+
+# Gap between neighbouring positions when a list is (re)numbered. Items
+# inserted or moved between two neighbours take a position in the gap,
+# so only their own row is written until a gap is used up.
+POSITION_STEP = 1024
+
+ITEM_FIELDS = ('item', 'quantity', 'checked')
+
+
+def _longest_increasing(values):
+    """
+    Returns the indexes of a longest strictly increasing subsequence of
+    the non-None ``values`` (patience sorting, O(n log n)).
+    """
+    tails = []
+    tail_values = []
+    previous = [None] * len(values)
+    for index, value in enumerate(values):
+        if value is None or value <= 0:
+            continue
+        slot = bisect.bisect_left(tail_values, value)
+        previous[index] = tails[slot - 1] if slot else None
+        if slot == len(tails):
+            tails.append(index)
+            tail_values.append(value)
+        else:
+            tails[slot] = index
+            tail_values[slot] = value
+
+    keep = []
+    index = tails[-1] if tails else None
+    while index is not None:
+        keep.append(index)
+        index = previous[index]
+    return keep
+
+
+def assign_positions(current):
+    """
+    Picks sort positions for items in their desired order, reusing as
+    many of the current positions as possible.
+
+    Parameters:
+    - current: The current position of each item in the desired order,
+      or None for items that have no position yet.
+
+    Returns:
+    A list of strictly increasing positions, one per item. The largest
+    set of items whose current positions are already in order keep them;
+    the others get a position in the gap between their neighbours. If a
+    gap is too small, the whole list is renumbered.
+    """
+    result = [None] * len(current)
+    for index in _longest_increasing(current):
+        result[index] = current[index]
+
+    index = 0
+    while index < len(result):
+        if result[index] is not None:
+            index += 1
+            continue
+        end = index
+        while end < len(result) and result[end] is None:
+            end += 1
+        low = result[index - 1] if index else 0
+        count = end - index
+        if end == len(result):
+            values = [low + POSITION_STEP * (offset + 1) for offset in range(count)]
+        else:
+            gap = (result[end] - low) // (count + 1)
+            if gap < 1:
+                return [POSITION_STEP * (offset + 1) for offset in range(len(result))]
+            values = [low + gap * (offset + 1) for offset in range(count)]
+        result[index:end] = values
+        index = end
+    return result
+
+
+def sync_items(shopping_list, items):
+    """
+    Makes the items of ``shopping_list`` match ``items`` with as few
+    writes as possible.
+
+    Entries with an ``id`` of an existing item update that row (only if
+    something changed); entries without one are created; rows that are
+    not mentioned are deleted. Positions are reused where the order
+    allows it.
+
+    Parameters:
+    - shopping_list: A saved ShoppingList instance.
+    - items: A list of dicts with ``item``, ``quantity``, ``checked`` and
+      an optional ``id``.
+
+    Returns:
+    The ShoppingItem rows in their new order.
+    """
+    existing = {row.pk: row for row in shopping_list.items.all()}
+    rows = []
+    for data in items:
+        row = existing.pop(data.get('id'), None)
+        if row is None:
+            row = ShoppingItem(shopping_list=shopping_list)
+        rows.append((row, data))
+
+    positions = assign_positions([row.position if row.pk else None for row, _ in rows])
+    to_create = []
+    to_update = []
+    for (row, data), position in zip(rows, positions):
+        changed = row.position != position
+        row.position = position
+        for field in ITEM_FIELDS:
+            if field in data and getattr(row, field) != data[field]:
+                setattr(row, field, data[field])
+                changed = True
+        if row.pk is None:
+            to_create.append(row)
+        elif changed:
+            to_update.append(row)
+
+    if existing:
+        ShoppingItem.objects.filter(pk__in=list(existing)).delete()
+    if to_update:
+        ShoppingItem.objects.bulk_update(to_update, ['position', *ITEM_FIELDS])
+    if to_create:
+        ShoppingItem.objects.bulk_create(to_create)
+
+    # Drop any prefetched items so later reads see the new state.
+    getattr(shopping_list, '_prefetched_objects_cache', {}).pop('items', None)
+    return [row for row, _ in rows]
+
+
+def position_at(shopping_list, index, exclude=None):
+    """
+    Returns a position that places an item at ``index`` among the other
+    items of ``shopping_list``.
+
+    Normally only the moved or inserted item is written. If its
+    neighbours leave no room, the other items are renumbered first.
+
+    Parameters:
+    - shopping_list: The ShoppingList the item belongs to.
+    - index: The desired zero-based index; clamped to the list length.
+    - exclude: The pk of the item being moved, if it already exists.
+
+    Returns:
+    The position to store on the item.
+    """
+    others = list(
+        shopping_list.items.exclude(pk=exclude).order_by('position', 'id').values_list('pk', 'position')
+    )
+    index = max(0, min(index, len(others)))
+    current = [position for _, position in others]
+    positions = assign_positions(current[:index] + [None] + current[index:])
+
+    new_position = positions.pop(index)
+    renumbered = [
+        ShoppingItem(pk=pk, position=position)
+        for (pk, old), position in zip(others, positions)
+        if old != position
+    ]
+    if renumbered:
+        ShoppingItem.objects.bulk_update(renumbered, ['position'])
+    return new_position
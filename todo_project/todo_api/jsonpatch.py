@@ -0,0 +1,197 @@
+import copy
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .renderers import ORJSONParser
+
+# Sentinel for "no value", since None is a valid JSON value (null).
+MISSING = object()
+
+
+class JSONPatchError(ValueError):
+    """
+    Raised when a JSON Patch document is malformed or cannot be applied.
+    """
+
+
+class JSONPatchTestFailed(JSONPatchError):
+    """
+    Raised when a ``test`` operation does not match the target document.
+    """
+
+
+class PatchConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The patch does not apply to the current state of the resource.'
+    default_code = 'conflict'
+
+
+class JSONPatchParser(ORJSONParser):
+    """
+    Parses ``application/json-patch+json`` request bodies (RFC 6902).
+    """
+    media_type = 'application/json-patch+json'
+
+
+def parse_pointer(pointer):
+    """
+    Splits a JSON Pointer (RFC 6901) such as ``/items/0/checked`` into
+    its unescaped reference tokens.
+    """
+    if not isinstance(pointer, str):
+        raise JSONPatchError('A path must be a string.')
+    if pointer == '':
+        return []
+    if not pointer.startswith('/'):
+        raise JSONPatchError(f'Invalid path "{pointer}".')
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def _index(container, token, pointer, allow_end=False):
+    if token == '-' and allow_end:
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith('0')):
+        raise JSONPatchError(f'Invalid array index in "{pointer}".')
+    index = int(token)
+    limit = len(container) if allow_end else len(container) - 1
+    if index > limit:
+        raise JSONPatchError(f'Array index out of range in "{pointer}".')
+    return index
+
+
+def _resolve_parent(document, pointer):
+    """
+    Returns the container holding the target of ``pointer`` and the last
+    reference token.
+    """
+    tokens = parse_pointer(pointer)
+    if not tokens:
+        raise JSONPatchError('The whole document cannot be the target of this operation.')
+    container = document
+    for token in tokens[:-1]:
+        container = _child(container, token, pointer)
+    return container, tokens[-1]
+
+
+def _child(container, token, pointer):
+    if isinstance(container, list):
+        return container[_index(container, token, pointer)]
+    if isinstance(container, dict):
+        if token not in container:
+            raise JSONPatchError(f'Path "{pointer}" does not exist.')
+        return container[token]
+    raise JSONPatchError(f'Path "{pointer}" does not exist.')
+
+
+def _equal(left, right):
+    """
+    Compares two JSON values the way RFC 6902 ``test`` does: booleans
+    never equal numbers, and lists and objects are compared deeply.
+    """
+    if isinstance(left, bool) or isinstance(right, bool):
+        return type(left) is type(right) and left == right
+    if isinstance(left, list) and isinstance(right, list):
+        return len(left) == len(right) and all(_equal(a, b) for a, b in zip(left, right))
+    if isinstance(left, dict) and isinstance(right, dict):
+        return left.keys() == right.keys() and all(_equal(left[key], right[key]) for key in left)
+    return left == right
+
+
+def _get(document, pointer):
+    value = document
+    for token in parse_pointer(pointer):
+        value = _child(value, token, pointer)
+    return value
+
+
+def _add(document, pointer, value):
+    container, token = _resolve_parent(document, pointer)
+    if isinstance(container, list):
+        container.insert(_index(container, token, pointer, allow_end=True), value)
+    elif isinstance(container, dict):
+        container[token] = value
+    else:
+        raise JSONPatchError(f'Path "{pointer}" does not exist.')
+
+
+def _remove(document, pointer):
+    container, token = _resolve_parent(document, pointer)
+    if isinstance(container, list):
+        return container.pop(_index(container, token, pointer))
+    if isinstance(container, dict) and token in container:
+        return container.pop(token)
+    raise JSONPatchError(f'Path "{pointer}" does not exist.')
+
+
+def _replace(document, pointer, value):
+    container, token = _resolve_parent(document, pointer)
+    if isinstance(container, list):
+        container[_index(container, token, pointer)] = value
+    elif isinstance(container, dict) and token in container:
+        container[token] = value
+    else:
+        raise JSONPatchError(f'Path "{pointer}" does not exist.')
+
+
+def apply_patch(document, operations):
+    """
+    Applies a JSON Patch (RFC 6902) to ``document`` and returns the
+    result.
+
+    The input is not modified. Operations are applied in order to a deep
+    copy, so a failing operation leaves nothing half-applied. All six
+    operations are supported: ``add``, ``remove``, ``replace``, ``move``,
+    ``copy`` and ``test``.
+
+    Parameters:
+    - document: The JSON-compatible value to patch (dicts, lists, scalars).
+    - operations: The parsed patch, a list of operation objects.
+
+    Raises:
+    - JSONPatchError: If the patch is malformed or an operation targets a
+      path that does not exist.
+    - JSONPatchTestFailed: If a ``test`` operation does not match.
+
+    Returns:
+    The patched copy of ``document``.
+    """
+    if not isinstance(operations, list):
+        raise JSONPatchError('A JSON Patch must be a list of operations.')
+
+    result = copy.deepcopy(document)
+    for number, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            raise JSONPatchError(f'Operation {number} must be an object.')
+        op = operation.get('op')
+        path = operation.get('path', MISSING)
+        if path is MISSING:
+            raise JSONPatchError(f'Operation {number} is missing "path".')
+        parse_pointer(path)
+        value = operation.get('value', MISSING)
+        if op in ('add', 'replace', 'test') and value is MISSING:
+            raise JSONPatchError(f'Operation {number} is missing "value".')
+
+        if op == 'add':
+            _add(result, path, copy.deepcopy(value))
+        elif op == 'remove':
+            _remove(result, path)
+        elif op == 'replace':
+            _replace(result, path, copy.deepcopy(value))
+        elif op in ('move', 'copy'):
+            source = operation.get('from', MISSING)
+            if source is MISSING:
+                raise JSONPatchError(f'Operation {number} is missing "from".')
+            if op == 'move':
+                if path != source and path.startswith(source + '/'):
+                    raise JSONPatchError(f'Operation {number} moves a value into itself.')
+                moved = _remove(result, source)
+            else:
+                moved = copy.deepcopy(_get(result, source))
+            _add(result, path, moved)
+        elif op == 'test':
+            if not _equal(_get(result, path), value):
+                raise JSONPatchTestFailed(f'Test failed at "{path}".')
+        else:
+            raise JSONPatchError(f'Operation {number} has an unknown op "{op}".')
+    return result
@@ -0,0 +1,78 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.utils import load_backend
+
+POOLED_ENGINE = 'todo_api.db.pooled_postgresql'
+
+
+class Command(BaseCommand):
+    help = 'Measures per-request database connection cost with and without connection reuse.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Simulated requests per scenario.')
+        parser.add_argument('--database', default='default', help='Database alias to connect to.')
+
+    def handle(self, *args, **options):
+        """
+        Runs ``--requests`` simulated requests per scenario and reports
+        the mean, p50 and p95 time of each in milliseconds.
+
+        A simulated request is what Django does around a view: the
+        ``request_started``/``request_finished`` connection housekeeping
+        (``close_if_unusable_or_obsolete``) plus one ``SELECT 1``. The
+        scenarios are a new connection per request (``CONN_MAX_AGE=0``),
+        persistent connections without and with ``CONN_HEALTH_CHECKS``,
+        and, on PostgreSQL, the pooled backend.
+        """
+        requests, alias = options['requests'], options['database']
+        base = connections[alias].settings_dict
+        scenarios = [
+            ('new connection', {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}),
+            ('persistent', {'CONN_MAX_AGE': None, 'CONN_HEALTH_CHECKS': False}),
+            ('persistent+check', {'CONN_MAX_AGE': None, 'CONN_HEALTH_CHECKS': True}),
+        ]
+        if connections[alias].vendor == 'postgresql':
+            scenarios.append(('pool+check', {'ENGINE': POOLED_ENGINE, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True}))
+        else:
+            self.stdout.write(self.style.WARNING('The pooled backend needs PostgreSQL; skipping it.'))
+
+        results = {}
+        for name, overrides in scenarios:
+            settings_dict = {**base, **overrides}
+            if overrides.get('ENGINE') != POOLED_ENGINE and base['ENGINE'] == POOLED_ENGINE:
+                settings_dict['ENGINE'] = 'django.db.backends.postgresql'
+            wrapper = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, f'bench-{name}')
+            try:
+                timings = self.run(wrapper, requests)
+            finally:
+                wrapper.close()
+                if hasattr(wrapper, 'pool'):
+                    wrapper.pool.close()
+            results[name] = statistics.mean(timings)
+            self.stdout.write(
+                f'{name:<17} mean {statistics.mean(timings):7.3f} ms  '
+                f'p50 {statistics.median(timings):7.3f} ms  '
+                f'p95 {statistics.quantiles(timings, n=20)[-1]:7.3f} ms'
+            )
+
+        baseline = results['new connection']
+        for name, mean in results.items():
+            if name != 'new connection' and mean:
+                self.stdout.write(f'{name} saves {baseline - mean:.3f} ms per request ({baseline / mean:.1f}x)')
+
+    def run(self, wrapper, requests):
+        timings = []
+        # One untimed request, so every scenario starts from a warm server.
+        for index in range(requests + 1):
+            started = time.perf_counter()
+            wrapper.close_if_unusable_or_obsolete()
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            wrapper.close_if_unusable_or_obsolete()
+            if index:
+                timings.append((time.perf_counter() - started) * 1000)
+        return timings
@@ -0,0 +1,325 @@
+import datetime
+import http.client
+import json
+import math
+import platform
+import random
+import statistics
+import time
+from urllib.parse import urlsplit
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from todo_api.items import position_at
+from todo_api.models import ShoppingItem, ShoppingList, ToDoList
+from todo_api.transfer import CONTENT_TYPES
+from todo_api.urls import urlpatterns
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_timings, percent):
+    """
+    Returns the nearest-rank ``percent`` percentile of already sorted
+    timings: the smallest value that at least ``percent`` % of the
+    timings are less than or equal to.
+    """
+    rank = max(1, math.ceil(percent / 100 * len(sorted_timings)))
+    return sorted_timings[rank - 1]
+
+
+class InProcessTransport:
+    """
+    Sends requests through ``django.test.Client``: the whole middleware
+    and view stack, without a server or sockets.
+
+    The client's ``testserver`` host is allowed for the duration of the
+    run. ``setup_test_environment()`` would do that too, but it also
+    instruments template rendering, which would skew the timings.
+    Throttling is turned off, so long runs as one user are not cut short
+    by 429s; against a server, raise its ``TODO_API_THROTTLE`` rates.
+    """
+    name = 'in-process'
+
+    def __init__(self, token):
+        self.client = Client(raise_request_exception=False, HTTP_AUTHORIZATION=f'Token {token}')
+        self.overrides = override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], TODO_API_THROTTLE=None,
+        )
+        self.overrides.enable()
+
+    def request(self, method, path, body, content_type):
+        response = self.client.generic(method, path, body or b'', content_type)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        return response.status_code, size
+
+    def close(self):
+        self.overrides.disable()
+
+
+class HTTPTransport:
+    """
+    Sends requests to a running server over one keep-alive connection,
+    so timings include the server, its workers and the network stack.
+    """
+    name = 'http'
+
+    def __init__(self, token, base_url):
+        url = urlsplit(base_url)
+        if url.scheme not in ('http', 'https') or not url.hostname:
+            raise CommandError(f'Invalid --base-url {base_url!r}.')
+        connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(url.hostname, url.port, timeout=30)
+        self.headers = {'Authorization': f'Token {token}'}
+
+    def request(self, method, path, body, content_type):
+        headers = {**self.headers, 'Content-Type': content_type} if body else self.headers
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        return response.status, len(response.read())
+
+    def close(self):
+        self.connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks every endpoint in todo_api/urls.py and writes p50/p95/p99 and req/s to a JSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default='load-0', help='User to send requests as; see seed_load_data.')
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per endpoint.')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per endpoint before timing.')
+        parser.add_argument(
+            '--base-url', help='Benchmark a running server, e.g. http://127.0.0.1:8000, instead of the test client.',
+        )
+        parser.add_argument('--output', default='bench-results.json', help='JSON file to write the results to.')
+        parser.add_argument('--label', default='', help='Name of the run in the results, e.g. a release.')
+        parser.add_argument('--only', nargs='+', metavar='NAME', help='Only benchmark these scenarios.')
+        parser.add_argument('--compare', metavar='FILE', help='Results of an earlier run to compare p95 against.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for picking rows.')
+
+    def handle(self, *args, **options):
+        """
+        Sends ``--warmup`` and then ``--requests`` requests to every
+        scenario and records the latency of each timed one.
+
+        There is at least one scenario per URL name in ``todo_api/urls.py``
+        (the command refuses to run otherwise, so a new endpoint cannot be
+        left out). Rows that a request needs, such as the todo a DELETE
+        removes, are created with the ORM before the request and outside
+        the timed section. Writes add rows to the user's data, so seed
+        again before comparing runs.
+
+        Requests are sent one at a time, so ``req_per_s`` is the rate of
+        a single client (1 / mean latency), which compares releases rather
+        than measuring the capacity of a deployment.
+        """
+        user_model = get_user_model()
+        try:
+            user = user_model.objects.get(**{user_model.USERNAME_FIELD: options['user']})
+        except user_model.DoesNotExist:
+            raise CommandError(f'No user named {options["user"]!r}; run seed_load_data first.')
+        token, _ = Token.objects.get_or_create(user=user)
+
+        scenarios = self.get_scenarios(user, random.Random(options['seed']))
+        missing = {pattern.name for pattern in urlpatterns} - {name for _, _, name, _ in scenarios}
+        if missing:
+            raise CommandError(f'No benchmark scenario for: {", ".join(sorted(missing))}.')
+        if options['only']:
+            unknown = set(options['only']) - {label for label, _, _, _ in scenarios}
+            if unknown:
+                raise CommandError(f'Unknown scenarios: {", ".join(sorted(unknown))}.')
+            scenarios = [scenario for scenario in scenarios if scenario[0] in options['only']]
+
+        if options['base_url']:
+            transport = HTTPTransport(token.key, options['base_url'])
+        else:
+            transport = InProcessTransport(token.key)
+        try:
+            endpoints = {
+                label: self.run(transport, method, name, prepare, options['warmup'], options['requests'])
+                for label, method, name, prepare in scenarios
+            }
+        finally:
+            transport.close()
+
+        results = {
+            'label': options['label'],
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'transport': transport.name,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connections[router.db_for_read(ToDoList)].vendor,
+            'requests': options['requests'],
+            'endpoints': endpoints,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2)
+            output.write('\n')
+
+        for label, result in endpoints.items():
+            self.stdout.write(
+                f'{label:<28} {result["status"]}  p50 {result["p50_ms"]:8.2f} ms  p95 {result["p95_ms"]:8.2f} ms  '
+                f'p99 {result["p99_ms"]:8.2f} ms  {result["req_per_s"]:8.1f} req/s'
+            )
+        if options['compare']:
+            self.compare(options['compare'], endpoints)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}.'))
+
+    def get_scenarios(self, user, rng):
+        """
+        Returns ``(label, method, URL name, prepare)`` tuples, where
+        ``prepare()`` creates whatever the request needs and returns its
+        path, body and content type.
+        """
+        todo_ids = list(ToDoList.objects.filter(user=user).values_list('pk', flat=True)[:1000])
+        list_ids = list(ShoppingList.objects.filter(user=user).values_list('pk', flat=True)[:1000])
+        item_keys = list(
+            ShoppingItem.objects.filter(shopping_list__user=user, shopping_list__deleted_at__isnull=True)
+            .values_list('shopping_list_id', 'pk')[:1000]
+        )
+        if not (todo_ids and list_ids and item_keys):
+            raise CommandError(f'{user} needs todos, shopping lists and items; run seed_load_data first.')
+
+        def request(name, body=None, query='', content_type='application/json', **kwargs):
+            if body is not None and content_type == 'application/json':
+                body = json.dumps(body).encode()
+            return reverse(name, kwargs=kwargs) + query, body, content_type
+
+        def random_item():
+            pk, item_pk = rng.choice(item_keys)
+            return {'pk': pk, 'item_pk': item_pk}
+
+        def fresh_list():
+            return ShoppingList.objects.create(user=user, name='Benchmark')
+
+        def fresh_item():
+            shopping_list = ShoppingList.objects.get(pk=rng.choice(list_ids))
+            position = position_at(shopping_list, len(item_keys))
+            return ShoppingItem.objects.create(shopping_list=shopping_list, item='Benchmark', position=position)
+
+        batch = {'requests': [
+            {'method': 'GET', 'path': reverse('todo-list')},
+            {'method': 'GET', 'path': reverse('shopping-list')},
+        ]}
+        imported = b'\n'.join([
+            b'{"type": "todo", "description": "Imported"}',
+            b'{"type": "shopping-list", "id": 1, "name": "Imported"}',
+            b'{"type": "shopping-item", "list": 1, "item": "Imported"}',
+        ])
+        return [
+            ('user-list', 'GET', 'user-list', lambda: request('user-list')),
+            ('user-detail', 'GET', 'user-detail', lambda: request('user-detail', pk=user.pk)),
+            ('shopping-list', 'GET', 'shopping-list', lambda: request('shopping-list')),
+            ('shopping-list paged', 'GET', 'shopping-list', lambda: request('shopping-list', query='?page_size=20')),
+            ('shopping-list create', 'POST', 'shopping-list', lambda: request(
+                'shopping-list', {'name': 'Benchmark', 'items': [{'item': 'a'}, {'item': 'b'}, {'item': 'c'}]},
+            )),
+            ('shopping-list-detail', 'GET', 'shopping-list-detail', lambda: request(
+                'shopping-list-detail', pk=rng.choice(list_ids),
+            )),
+            ('shopping-list-detail patch', 'PATCH', 'shopping-list-detail', lambda: request(
+                'shopping-list-detail', {'name': f'Renamed {rng.random():.6f}'}, pk=rng.choice(list_ids),
+            )),
+            ('shopping-list-detail delete', 'DELETE', 'shopping-list-detail', lambda: request(
+                'shopping-list-detail', pk=fresh_list().pk,
+            )),
+            ('shopping-list-bulk', 'POST', 'shopping-list-bulk', lambda: request('shopping-list-bulk', {
+                'create': [{'name': 'Benchmark', 'items': [{'item': 'a'}]}],
+                'update': [{'id': rng.choice(list_ids), 'name': 'Bulk'}],
+            })),
+            ('shopping-item-list', 'GET', 'shopping-item-list', lambda: request(
+                'shopping-item-list', pk=rng.choice(list_ids),
+            )),
+            ('shopping-item-list create', 'POST', 'shopping-item-list', lambda: request(
+                'shopping-item-list', {'item': 'Benchmark'}, pk=rng.choice(list_ids),
+            )),
+            ('shopping-item-detail', 'GET', 'shopping-item-detail', lambda: request(
+                'shopping-item-detail', **random_item(),
+            )),
+            ('shopping-item-detail patch', 'PATCH', 'shopping-item-detail', lambda: request(
+                'shopping-item-detail', {'checked': rng.random() < 0.5}, **random_item(),
+            )),
+            ('shopping-item-detail delete', 'DELETE', 'shopping-item-detail', lambda: request(
+                'shopping-item-detail', pk=(item := fresh_item()).shopping_list_id, item_pk=item.pk,
+            )),
+            ('shopping-item-move', 'POST', 'shopping-item-move', lambda: request(
+                'shopping-item-move', {'index': rng.randint(0, 10)}, **random_item(),
+            )),
+            ('todo-list', 'GET', 'todo-list', lambda: request('todo-list')),
+            ('todo-list filtered', 'GET', 'todo-list', lambda: request(
+                'todo-list', query='?done=false&q=buy&ordering=due_date',
+            )),
+            ('todo-list create', 'POST', 'todo-list', lambda: request('todo-list', {'description': 'Benchmark'})),
+            ('todo-list-detail', 'GET', 'todo-list-detail', lambda: request('todo-list-detail', pk=rng.choice(todo_ids))),
+            ('todo-list-detail put', 'PUT', 'todo-list-detail', lambda: request(
+                'todo-list-detail', {'description': 'Changed', 'done': rng.random() < 0.5}, pk=rng.choice(todo_ids),
+            )),
+            ('todo-list-detail delete', 'DELETE', 'todo-list-detail', lambda: request(
+                'todo-list-detail', pk=ToDoList.objects.create(user=user, description='Benchmark').pk,
+            )),
+            ('todo-list-bulk', 'POST', 'todo-list-bulk', lambda: request('todo-list-bulk', {
+                'create': [{'description': 'a'}, {'description': 'b'}],
+                'update': [{'id': rng.choice(todo_ids), 'done': rng.random() < 0.5}],
+            })),
+            ('dashboard', 'GET', 'dashboard', lambda: request('dashboard')),
+            ('batch', 'POST', 'batch', lambda: request('batch', batch)),
+            ('sync', 'GET', 'sync', lambda: request('sync')),
+            ('export', 'GET', 'export', lambda: request('export', query='?as=ndjson')),
+            ('import', 'POST', 'import', lambda: request('import', imported, content_type=CONTENT_TYPES['ndjson'])),
+        ]
+
+    def run(self, transport, method, name, prepare, warmup, requests):
+        timings, statuses, sizes = [], [], []
+        for index in range(warmup + requests):
+            path, body, content_type = prepare()
+            started = time.perf_counter()
+            status, size = transport.request(method, path, body, content_type)
+            elapsed = (time.perf_counter() - started) * 1000
+            if index >= warmup:
+                timings.append(elapsed)
+                statuses.append(status)
+                sizes.append(size)
+        timings.sort()
+        mean = statistics.mean(timings)
+        result = {
+            'method': method,
+            'name': name,
+            'status': statistics.mode(statuses),
+            'errors': sum(status >= 400 for status in statuses),
+            'bytes': round(statistics.mean(sizes)),
+            'mean_ms': round(mean, 3),
+        }
+        result.update({f'p{percent}_ms': round(percentile(timings, percent), 3) for percent in PERCENTILES})
+        result['req_per_s'] = round(1000 / mean, 1) if mean else None
+        return result
+
+    def compare(self, path, endpoints):
+        """
+        Prints the change in p95 latency of every scenario that is also
+        in the results file at ``path``.
+        """
+        try:
+            with open(path) as previous_file:
+                previous = json.load(previous_file)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Cannot read {path}: {exc}')
+        label = previous.get('label') or path
+        for name, result in endpoints.items():
+            before = previous.get('endpoints', {}).get(name)
+            if not before or not before.get('p95_ms'):
+                continue
+            change = (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100
+            self.stdout.write(
+                f'{name:<28} p95 {before["p95_ms"]:8.2f} ms ({label}) -> {result["p95_ms"]:8.2f} ms  {change:+6.1f}%'
+            )
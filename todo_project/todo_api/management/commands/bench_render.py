@@ -0,0 +1,64 @@
+import datetime
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from todo_api.models import ToDoList
+from todo_api.renderers import ORJSONRenderer, orjson
+from todo_api.serializers import ToDoListSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compares JSON render time of the stdlib and orjson renderers on a large todo list.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Number of todos in the list.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per renderer; the best is reported.')
+
+    def handle(self, *args, **options):
+        """
+        Serializes ``--rows`` unsaved todos once, then renders the result
+        with each renderer and reports the best of ``--repeat`` runs.
+
+        No database access is needed: the rows are built in memory with
+        the same shape the list endpoint returns.
+        """
+        rows, repeat = options['rows'], options['repeat']
+        user = get_user_model()(pk=1, username='bench', email='bench@example.com')
+        today = datetime.date.today()
+        todos = [
+            ToDoList(
+                pk=index + 1,
+                user=user,
+                description=f'Todo number {index}',
+                done=index % 3 == 0,
+                due_date=today + datetime.timedelta(days=index % 365) if index % 4 else None,
+            )
+            for index in range(rows)
+        ]
+
+        started = time.perf_counter()
+        data = ToDoListSerializer(todos, many=True).data
+        self.stdout.write(f'serialize       {(time.perf_counter() - started) * 1000:9.1f} ms  ({rows} rows)')
+
+        renderers = [('stdlib json', JSONRenderer())]
+        if orjson is not None:
+            renderers.append(('orjson', ORJSONRenderer()))
+        else:
+            self.stdout.write(self.style.WARNING('orjson is not installed; only the stdlib renderer is timed.'))
+
+        results = {}
+        for name, renderer in renderers:
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                body = renderer.render(data, 'application/json', {})
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            results[name] = best
+            self.stdout.write(f'{name:<15} {best * 1000:9.1f} ms  ({len(body)} bytes)')
+
+        if len(results) == 2:
+            self.stdout.write(f'speedup         {results["stdlib json"] / results["orjson"]:9.1f} x')
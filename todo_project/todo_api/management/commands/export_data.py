@@ -0,0 +1,40 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from todo_api.transfer import RENDERERS, export_records
+
+
+class Command(BaseCommand):
+    help = "Writes a user's todos, shopping lists and items as NDJSON or CSV, as /api/export/ does."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='The user whose data is exported.')
+        parser.add_argument('--as', dest='export_format', choices=sorted(RENDERERS), default='ndjson')
+        parser.add_argument('--output', default='-', help='File to write; standard output by default.')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched from the database at a time.')
+
+    def handle(self, *args, **options):
+        """
+        Streams the export to ``--output`` block by block, so memory use
+        does not depend on the amount of data.
+        """
+        user_model = get_user_model()
+        try:
+            user = user_model.objects.get(**{user_model.USERNAME_FIELD: options['username']})
+        except user_model.DoesNotExist:
+            raise CommandError(f'No user named {options["username"]!r}.')
+
+        records = export_records(user, chunk_size=options['chunk_size'])
+        blocks = RENDERERS[options['export_format']](records)
+        if options['output'] == '-':
+            self.write(sys.stdout.buffer, blocks)
+        else:
+            with open(options['output'], 'wb') as output:
+                self.write(output, blocks)
+
+    def write(self, output, blocks):
+        for block in blocks:
+            output.write(block)
+        output.flush()
@@ -0,0 +1,48 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from todo_api.transfer import READERS, Importer
+
+
+class Command(BaseCommand):
+    help = 'Creates the records of an export_data or /api/export/ file for a user, as /api/import/ does.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='The user the records are created for.')
+        parser.add_argument('path', help="The export file, or '-' for standard input.")
+        parser.add_argument(
+            '--as', dest='import_format', choices=sorted(READERS),
+            help='File format; guessed from the extension (.csv or NDJSON) by default.',
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Records written per bulk_create.')
+
+    def handle(self, *args, **options):
+        """
+        Reads the file one line at a time and imports it in a single
+        transaction; an invalid record aborts the whole import.
+        """
+        user_model = get_user_model()
+        try:
+            user = user_model.objects.get(**{user_model.USERNAME_FIELD: options['username']})
+        except user_model.DoesNotExist:
+            raise CommandError(f'No user named {options["username"]!r}.')
+
+        path = options['path']
+        import_format = options['import_format'] or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        importer = Importer(user, batch_size=options['batch_size'])
+        try:
+            if path == '-':
+                counts = importer.run(READERS[import_format](sys.stdin.buffer))
+            else:
+                with open(path, 'rb') as lines:
+                    counts = importer.run(READERS[import_format](lines))
+        except ValidationError as exc:
+            raise CommandError(f'Nothing was imported: {exc.detail}')
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        for kind, count in counts.items():
+            self.stdout.write(f'{kind}: created {count}')
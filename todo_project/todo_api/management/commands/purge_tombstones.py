@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from todo_api.models import ShoppingList, ToDoList
+from todo_api.sync import tombstone_horizon
+
+
+class Command(BaseCommand):
+    help = 'Removes soft-deleted todos and shopping lists older than SYNC_TOMBSTONE_RETENTION_DAYS.'
+
+    def handle(self, *args, **options):
+        """
+        Hard-deletes tombstones that fall outside the retention window.
+
+        Sync clients whose cursor is older than the window receive a full
+        snapshot instead, so these rows are no longer needed.
+        """
+        horizon = tombstone_horizon()
+        for model in (ToDoList, ShoppingList):
+            deleted, _ = model.all_objects.filter(deleted_at__lt=horizon).delete()
+            self.stdout.write(f'{model.__name__}: removed {deleted} tombstone(s)')
@@ -0,0 +1,111 @@
+import datetime
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from todo_api.items import POSITION_STEP
+from todo_api.models import ShoppingItem, ShoppingList, ToDoList
+
+WORDS = (
+    'buy', 'call', 'clean', 'fix', 'book', 'pay', 'email', 'plan', 'water', 'pick up', 'return', 'renew',
+    'milk', 'bread', 'plants', 'car', 'dentist', 'rent', 'bike', 'passport', 'groceries', 'kitchen',
+    'garage', 'invoice', 'tickets', 'birthday', 'laundry', 'library', 'printer', 'insurance',
+)
+ITEMS = (
+    'Apples', 'Bananas', 'Bread', 'Butter', 'Cheese', 'Coffee', 'Eggs', 'Flour', 'Milk', 'Onions',
+    'Pasta', 'Rice', 'Salt', 'Soap', 'Sugar', 'Tea', 'Tomatoes', 'Yoghurt', 'Batteries', 'Tape',
+)
+
+
+class Command(BaseCommand):
+    help = 'Creates users with todos and shopping lists to load test and benchmark the API against.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Number of users to create.')
+        parser.add_argument('--todos', type=int, default=200, help='Todos per user.')
+        parser.add_argument('--lists', type=int, default=20, help='Shopping lists per user.')
+        parser.add_argument('--items', type=int, default=50, help='Items per shopping list.')
+        parser.add_argument('--prefix', default='load', help='Usernames are <prefix>-0, <prefix>-1, ...')
+        parser.add_argument('--password', default='load-test', help='Password of every created user.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk_create.')
+
+    def handle(self, *args, **options):
+        """
+        Gives each of the users ``<prefix>-0`` to ``<prefix>-N`` a token
+        and fresh data: ``--todos`` todos and ``--lists`` shopping lists of
+        ``--items`` items. Users and tokens of an earlier run are kept, so
+        a benchmark client can reuse them; their data is replaced.
+
+        Rows are written with ``bulk_create``, one user at a time, and
+        the password is hashed once for all users, so seeding is bounded
+        by the database rather than Python. About a fifth of the todos
+        are soft-deleted, so sync and tombstone handling are exercised.
+        """
+        rng = random.Random(options['seed'])
+        prefix, batch_size = options['prefix'], options['batch_size']
+        user_model = get_user_model()
+        today = datetime.date.today()
+        usernames = [f'{prefix}-{index}' for index in range(options['users'])]
+
+        with transaction.atomic():
+            password = make_password(options['password'])
+            existing = user_model.objects.filter(username__in=usernames)
+            existing.update(password=password)
+            ShoppingList.all_objects.filter(user__in=existing).delete()
+            ToDoList.all_objects.filter(user__in=existing).delete()
+
+            known = set(existing.values_list('username', flat=True))
+            user_model.objects.bulk_create([
+                user_model(username=username, email=f'{username}@example.com', password=password)
+                for username in usernames if username not in known
+            ])
+            users = list(user_model.objects.filter(username__in=usernames).order_by('pk'))
+            with_token = set(Token.objects.filter(user__in=users).values_list('user_id', flat=True))
+            Token.objects.bulk_create([
+                Token(user=user, key=Token.generate_key()) for user in users if user.pk not in with_token
+            ])
+
+            for user in users:
+                self.create_todos(user, rng, today, options['todos'], batch_size)
+                self.create_shopping_lists(user, rng, options['lists'], options['items'], batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(users)} users with {options["todos"]} todos and {options["lists"]} shopping lists '
+            f'of {options["items"]} items each (password {options["password"]!r}).'
+        ))
+
+    def create_todos(self, user, rng, today, count, batch_size):
+        now = timezone.now()
+        ToDoList.all_objects.bulk_create([
+            ToDoList(
+                user=user,
+                description=' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 8))).capitalize(),
+                done=rng.random() < 0.4,
+                due_date=today + datetime.timedelta(days=rng.randint(-30, 90)) if rng.random() < 0.7 else None,
+                deleted_at=now if rng.random() < 0.2 else None,
+            )
+            for _ in range(count)
+        ], batch_size=batch_size)
+
+    def create_shopping_lists(self, user, rng, count, items, batch_size):
+        lists = ShoppingList.objects.bulk_create([
+            ShoppingList(user=user, name=f'{rng.choice(WORDS).capitalize()} list {index + 1}')
+            for index in range(count)
+        ], batch_size=batch_size)
+        ShoppingItem.objects.bulk_create([
+            ShoppingItem(
+                shopping_list=shopping_list,
+                item=rng.choice(ITEMS),
+                quantity=str(rng.randint(1, 12)) if rng.random() < 0.5 else '',
+                checked=rng.random() < 0.3,
+                position=POSITION_STEP * (position + 1),
+            )
+            for shopping_list in lists
+            for position in range(items)
+        ], batch_size=batch_size)
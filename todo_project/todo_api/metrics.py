@@ -0,0 +1,136 @@
+import os
+
+from django.conf import settings
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotFound
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+
+from .instrumentation import request_measured
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # pragma: no cover - exercised only without prometheus_client
+    prometheus_client = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# Anything else is counted as 'other', so clients cannot create series.
+METHODS = {'GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE'}
+
+if prometheus_client is not None:
+    REQUESTS = prometheus_client.Counter(
+        'chorify_http_requests_total', 'HTTP requests.', ['route', 'method', 'status'],
+    )
+    LATENCY = prometheus_client.Histogram(
+        'chorify_http_request_duration_seconds', 'Time to produce a response.', ['route', 'method'],
+        buckets=LATENCY_BUCKETS,
+    )
+    QUERIES = prometheus_client.Histogram(
+        'chorify_db_queries_per_request', 'Database queries per request.', ['route'], buckets=QUERY_BUCKETS,
+    )
+    DB_TIME = prometheus_client.Histogram(
+        'chorify_db_duration_seconds', 'Time spent in database queries per request.', ['route'],
+        buckets=LATENCY_BUCKETS,
+    )
+    RESPONSE_SIZE = prometheus_client.Histogram(
+        'chorify_http_response_size_bytes', 'Size of non-streaming response bodies.', ['route'],
+        buckets=SIZE_BUCKETS,
+    )
+    CACHE_LOOKUPS = prometheus_client.Counter(
+        'chorify_cache_lookups_total', 'List and token cache lookups.', ['cache', 'result'],
+    )
+    # Summed over live processes, so it counts the running workers.
+    WORKERS = prometheus_client.Gauge(
+        'chorify_worker_info', 'Running gunicorn workers.', ['worker_class', 'gunicorn_version'],
+        multiprocess_mode='livesum',
+    )
+
+
+def route_name(request):
+    """
+    Returns the URL name of the matched route (``todo-list``,
+    ``admin:index``, ...), or ``other`` for unnamed and unknown URLs.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.url_name:
+        return 'other'
+    return match.view_name
+
+
+@receiver(request_measured)
+def observe_request(sender, request, response, metrics, **kwargs):
+    """
+    Feeds the metrics of a finished request into the Prometheus metrics.
+    """
+    if prometheus_client is None:
+        return
+    route = route_name(request)
+    method = request.method if request.method in METHODS else 'other'
+    REQUESTS.labels(route, method, str(response.status_code)).inc()
+    LATENCY.labels(route, method).observe(metrics.total)
+    QUERIES.labels(route).observe(metrics.query_count)
+    DB_TIME.labels(route).observe(metrics.db_time)
+    if metrics.response_bytes is not None:
+        RESPONSE_SIZE.labels(route).observe(metrics.response_bytes)
+    for (cache, hit), count in metrics.cache_lookups.items():
+        CACHE_LOOKUPS.labels(cache, 'hit' if hit else 'miss').inc(count)
+
+
+def record_worker(worker):
+    """
+    Registers a gunicorn worker process in ``chorify_worker_info``;
+    called from the ``post_worker_init`` hook in ``gunicorn.conf.py``.
+    """
+    if prometheus_client is None:
+        return
+    import gunicorn
+
+    WORKERS.labels(type(worker).__name__, gunicorn.__version__).set(1)
+
+
+def get_registry():
+    """
+    Returns the registry to expose: under gunicorn, the metrics of every
+    worker merged from the files in ``PROMETHEUS_MULTIPROC_DIR``, else
+    this process's own.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return prometheus_client.REGISTRY
+
+
+@csrf_exempt
+@require_GET
+def metrics_view(request):
+    """
+    Serves the metrics in the Prometheus text format.
+
+    Request rates, latency quantiles and cache hit ratios are computed
+    in Prometheus from the counters and histograms, e.g.
+    ``histogram_quantile(0.95, sum by (route, le)
+    (rate(chorify_http_request_duration_seconds_bucket[5m])))`` or
+    ``sum by (cache) (rate(chorify_cache_lookups_total{result="hit"}[5m]))
+    / sum by (cache) (rate(chorify_cache_lookups_total[5m]))``.
+
+    Scrapers must send ``TODO_API_METRICS_TOKEN`` as ``Authorization:
+    Bearer <token>``. Without a token the endpoint is only open with
+    ``DEBUG`` on, and answers 403 otherwise.
+    """
+    if prometheus_client is None:
+        return HttpResponseNotFound('prometheus_client is not installed.', content_type='text/plain')
+    token = getattr(settings, 'TODO_API_METRICS_TOKEN', None)
+    if not token and not settings.DEBUG:
+        return HttpResponseForbidden('Set TODO_API_METRICS_TOKEN to enable /metrics.', content_type='text/plain')
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        response = HttpResponse('Invalid or missing token.', status=401, content_type='text/plain')
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    return HttpResponse(
+        prometheus_client.generate_latest(get_registry()), content_type=prometheus_client.CONTENT_TYPE_LATEST,
+    )
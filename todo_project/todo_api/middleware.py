@@ -0,0 +1,116 @@
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+from .instrumentation import RequestMetrics, measuring, request_measured
+from .routers import PIN_COOKIE, PIN_HEADER
+
+logger = logging.getLogger('todo_api.performance')
+
+
+class ReplicaPinningMiddleware(MiddlewareMixin):
+    """
+    Pins a client to the primary database for
+    ``TODO_API_REPLICA_PIN_SECONDS`` after each write, so that its next
+    reads see the write even while the replicas lag behind.
+
+    The deadline is sent both as a cookie (browsers) and in the
+    ``X-Primary-Until`` response header, for clients that echo it back
+    instead. Nothing is set when no replicas are configured.
+    """
+
+    def process_response(self, request, response):
+        if request.method in SAFE_METHODS or not getattr(settings, 'TODO_API_READ_REPLICAS', ()):
+            return response
+        window = getattr(settings, 'TODO_API_REPLICA_PIN_SECONDS', 5)
+        until = str(math.ceil(time.time() + window))
+        response.set_cookie(
+            PIN_COOKIE, until, max_age=window, secure=request.is_secure(), httponly=True, samesite='Lax',
+        )
+        response[PIN_HEADER] = until
+        return response
+
+
+class RateLimitHeadersMiddleware(MiddlewareMixin):
+    """
+    Tells clients where they stand against the throttles of
+    ``todo_api.throttling``: ``RateLimit-Limit``, ``RateLimit-Remaining``
+    and ``RateLimit-Reset`` (seconds until the bucket is full again),
+    for the most restrictive bucket the request was checked against.
+    Responses of views without a throttle scope are left alone.
+    """
+
+    def process_response(self, request, response):
+        state = getattr(request, 'rate_limit', None)
+        if state is not None:
+            response['RateLimit-Limit'] = str(state.limit)
+            response['RateLimit-Remaining'] = str(state.remaining)
+            response['RateLimit-Reset'] = str(math.ceil(state.reset))
+        return response
+
+
+class RequestTimingMiddleware(MiddlewareMixin):
+    """
+    Measures every request: wall time, number and time of database
+    queries, the ``serialize`` and ``render`` sections timed by the views
+    and renderer, and the response size. The result is sent to
+    ``request_measured`` receivers and, with ``SERVER_TIMING`` on, as a
+    ``Server-Timing`` header (shown by browser dev tools). The header is
+    off by default, as it tells any client how long the database took.
+
+    Requests slower than ``SLOW_REQUEST_MS`` are logged to
+    ``todo_api.performance`` with their slowest queries. Only
+    ``perf_counter`` calls and a few additions are made per query, so the
+    middleware can stay on in production. It runs natively in both sync
+    and async mode, so async views keep their event loop.
+
+    Configured by ``TODO_API_INSTRUMENTATION``; should be the first
+    middleware so the total includes the others.
+    """
+
+    def __call__(self, request):
+        if self._is_coroutine:
+            return self.__acall__(request)
+        with measuring(self.create_metrics()) as metrics:
+            response = self.get_response(request)
+        return self.process_metrics(request, response, metrics)
+
+    async def __acall__(self, request):
+        with measuring(self.create_metrics()) as metrics:
+            response = await self.get_response(request)
+        return self.process_metrics(request, response, metrics)
+
+    def get_config(self):
+        return getattr(settings, 'TODO_API_INSTRUMENTATION', None) or {}
+
+    def create_metrics(self):
+        return RequestMetrics(max_queries=self.get_config().get('MAX_LOGGED_QUERIES', 20))
+
+    def process_metrics(self, request, response, metrics):
+        metrics.finish()
+        # Streaming bodies are only produced after this point.
+        if not response.streaming:
+            metrics.response_bytes = len(response.content)
+        config = self.get_config()
+        if config.get('SERVER_TIMING', False):
+            response['Server-Timing'] = metrics.server_timing()
+        threshold = config.get('SLOW_REQUEST_MS')
+        if threshold is not None and metrics.total * 1000 >= threshold:
+            self.log_slow_request(request, response, metrics)
+        request_measured.send(sender=self.__class__, request=request, response=response, metrics=metrics)
+        return response
+
+    def log_slow_request(self, request, response, metrics):
+        match = request.resolver_match
+        queries = sorted(metrics.queries, key=lambda query: query[0], reverse=True)
+        size = 'streamed' if metrics.response_bytes is None else f'{metrics.response_bytes} bytes'
+        logger.warning(
+            'Slow request: %s %s (%s) -> %s, %s, in %.1f ms; %d queries in %.1f ms%s',
+            request.method, request.path, match.url_name if match else '-', response.status_code, size,
+            metrics.total * 1000, metrics.query_count, metrics.db_time * 1000,
+            ''.join(f'\n  {duration * 1000:8.1f} ms  {sql}' for duration, sql in queries),
+        )
@@ -0,0 +1,25 @@
+# Generated by Django 4.1 on 2026-10-18 07:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_api', '0008_todolist'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shoppinglist',
+            index=models.Index(fields=['user', 'id'], name='shoppinglist_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todolist',
+            index=models.Index(fields=['user', 'id'], name='todolist_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todolist',
+            index=models.Index(fields=['user', 'due_date', 'id'], name='todolist_user_due_id_idx'),
+        ),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 4.1 on 2026-10-18 07:40
+
+import json
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+POSITION_STEP = 1024
+
+
+def as_text(value, max_length):
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        value = json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+    return value[:max_length]
+
+
+def legacy_entries(items):
+    """
+    Normalizes the shapes the old JSON column has held: a list of
+    ``{"item", "quantity"}`` objects, a list of strings, or an
+    ``{item: quantity}`` mapping.
+    """
+    if isinstance(items, dict):
+        return [{'item': key, 'quantity': value} for key, value in items.items()]
+    if not isinstance(items, list):
+        return []
+    entries = []
+    for entry in items:
+        if isinstance(entry, dict):
+            entries.append(entry)
+        else:
+            entries.append({'item': entry})
+    return entries
+
+
+def copy_items_to_rows(apps, schema_editor):
+    ShoppingList = apps.get_model('todo_api', 'ShoppingList')
+    ShoppingItem = apps.get_model('todo_api', 'ShoppingItem')
+    db = schema_editor.connection.alias
+    batch = []
+    for shopping_list in ShoppingList.objects.using(db).only('id', 'legacy_items').iterator(chunk_size=500):
+        for index, entry in enumerate(legacy_entries(shopping_list.legacy_items)):
+            batch.append(ShoppingItem(
+                shopping_list_id=shopping_list.id,
+                item=as_text(entry.get('item'), 255),
+                quantity=as_text(entry.get('quantity'), 50),
+                checked=bool(entry.get('checked', False)),
+                position=(index + 1) * POSITION_STEP,
+            ))
+        if len(batch) >= 1000:
+            ShoppingItem.objects.using(db).bulk_create(batch)
+            batch = []
+    ShoppingItem.objects.using(db).bulk_create(batch)
+
+
+def copy_rows_to_items(apps, schema_editor):
+    ShoppingList = apps.get_model('todo_api', 'ShoppingList')
+    ShoppingItem = apps.get_model('todo_api', 'ShoppingItem')
+    db = schema_editor.connection.alias
+    for shopping_list in ShoppingList.objects.using(db).iterator(chunk_size=500):
+        items = []
+        for row in ShoppingItem.objects.using(db).filter(shopping_list_id=shopping_list.id).order_by('position', 'id'):
+            entry = {'item': row.item, 'quantity': row.quantity}
+            if row.checked:
+                entry['checked'] = True
+            items.append(entry)
+        shopping_list.legacy_items = items
+        shopping_list.save(using=db, update_fields=['legacy_items'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_api', '0010_sync_tombstones'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='shoppinglist',
+            old_name='items',
+            new_name='legacy_items',
+        ),
+        migrations.CreateModel(
+            name='ShoppingItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item', models.CharField(blank=True, max_length=255)),
+                ('quantity', models.CharField(blank=True, default='', max_length=50)),
+                ('checked', models.BooleanField(default=False)),
+                ('position', models.IntegerField()),
+                ('shopping_list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='todo_api.shoppinglist')),
+            ],
+            options={
+                'ordering': ['position', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='shoppingitem',
+            index=models.Index(fields=['shopping_list', 'position'], name='shoppingitem_list_pos_idx'),
+        ),
+        migrations.RunPython(copy_items_to_rows, copy_rows_to_items),
+        migrations.RemoveField(
+            model_name='shoppinglist',
+            name='legacy_items',
+        ),
+    ]
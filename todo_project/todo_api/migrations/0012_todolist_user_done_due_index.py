@@ -0,0 +1,17 @@
+# Generated by Django 4.1 on 2026-10-18 07:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_api', '0011_shoppingitem'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='todolist',
+            index=models.Index(fields=['user', 'done', 'due_date'], name='todolist_user_done_due_idx'),
+        ),
+    ]
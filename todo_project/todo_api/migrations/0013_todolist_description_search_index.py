@@ -0,0 +1,35 @@
+from django.db import migrations
+
+INDEX_NAME = 'todolist_description_search_idx'
+
+
+def create_search_index(apps, schema_editor):
+    # GIN and to_tsvector are Postgres features; SQLite searches with
+    # LIKE instead (see ``ToDoListFilter.search``). The expression must
+    # match ``SearchDocument`` for the planner to use the index.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} ON todo_api_todolist '
+        "USING gin (to_tsvector('simple'::regconfig, description))"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+    # CONCURRENTLY keeps the table writable while the index is built, but
+    # cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('todo_api', '0012_todolist_user_done_due_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
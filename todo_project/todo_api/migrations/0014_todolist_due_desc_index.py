@@ -0,0 +1,36 @@
+from django.db import migrations
+
+INDEX_NAME = 'todolist_user_due_desc_idx'
+
+
+def create_due_desc_index(apps, schema_editor):
+    # Keyset pages ordered by ``-due_date`` sort by ``due_date DESC NULLS
+    # LAST, id DESC``. Scanning ``todolist_user_due_id_idx`` backwards
+    # gives NULLS FIRST instead, so that ordering needs its own index.
+    # SQLite cannot declare NULL placement in an index.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} ON todo_api_todolist '
+        '(user_id, due_date DESC NULLS LAST, id DESC)'
+    )
+
+
+def drop_due_desc_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+    # CONCURRENTLY keeps the table writable while the index is built, but
+    # cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('todo_api', '0013_todolist_description_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_due_desc_index, drop_due_desc_index),
+    ]
@@ -1,8 +1,8 @@
 from django.db import models
-from django.db.models import JSONField
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.utils import timezone
 
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None):
@@ -68,20 +68,105 @@ class User(AbstractBaseUser):
         return self.is_admin
 
 
-class ShoppingList(models.Model):
+class SyncedQuerySet(models.QuerySet):
+    def soft_delete(self):
+        """
+        Turns every row in the queryset into a tombstone in one UPDATE.
+
+        ``updated_at`` is bumped explicitly because ``QuerySet.update``
+        bypasses ``auto_now``.
+
+        Returns:
+        The number of rows marked as deleted.
+        """
+        now = timezone.now()
+        return self.filter(deleted_at__isnull=True).update(deleted_at=now, updated_at=now)
+
+
+class LiveManager(models.Manager.from_queryset(SyncedQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class SyncedModel(models.Model):
+    """
+    Abstract base for rows that offline clients keep in sync.
+
+    Every write bumps ``updated_at`` and deleting a row only stamps
+    ``deleted_at``, leaving a tombstone the sync endpoint can report.
+    ``objects`` hides tombstones; ``all_objects`` includes them.
+    """
+    updated_at = models.DateTimeField(auto_now=True)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = LiveManager()
+    all_objects = SyncedQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def soft_delete(self):
+        """
+        Marks this row as deleted instead of removing it.
+        """
+        self.deleted_at = timezone.now()
+        self.save(update_fields=['deleted_at', 'updated_at'])
+
+
+class ShoppingList(SyncedModel):
     name = models.CharField(max_length=100)
-    items = JSONField(default=list)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='shoppinglist_user_id_idx'),
+            models.Index(fields=['user', 'updated_at'], name='shoppinglist_user_upd_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
+    def touch(self):
+        """
+        Bumps ``updated_at`` after one of the list's items changed, so
+        ETags, the list cache and the sync endpoint notice the change.
+        """
+        self.save(update_fields=['updated_at'])
+
 
-class ToDoList(models.Model):
+class ShoppingItem(models.Model):
+    shopping_list = models.ForeignKey(ShoppingList, on_delete=models.CASCADE, related_name='items')
+    item = models.CharField(max_length=255, blank=True)
+    quantity = models.CharField(max_length=50, blank=True, default='')
+    checked = models.BooleanField(default=False)
+    # Sparse sort key (see todo_api.items), so moving or inserting one
+    # item usually only rewrites that item's row.
+    position = models.IntegerField()
+
+    class Meta:
+        ordering = ['position', 'id']
+        indexes = [
+            models.Index(fields=['shopping_list', 'position'], name='shoppingitem_list_pos_idx'),
+        ]
+
+    def __str__(self):
+        return self.item
+
+
+class ToDoList(SyncedModel):
     description = models.TextField()
     done = models.BooleanField(default=False)
     due_date = models.DateField(null=True, blank=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='todolist_user_id_idx'),
+            models.Index(fields=['user', 'due_date', 'id'], name='todolist_user_due_id_idx'),
+            models.Index(fields=['user', 'updated_at'], name='todolist_user_upd_idx'),
+            # Filtering a user's todos by ``done`` and sorting by due date.
+            models.Index(fields=['user', 'done', 'due_date'], name='todolist_user_done_due_idx'),
+        ]
+
     def __str__(self):
         return self.description
\ No newline at end of file
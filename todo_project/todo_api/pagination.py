@@ -0,0 +1,250 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework import exceptions
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in keyset (seek) pagination.
+
+    A page is only produced when the client sends ``page_size`` or
+    ``cursor``; otherwise ``paginate_queryset`` returns None and the view
+    falls back to its unpaginated response. Each page is fetched with a
+    ``WHERE (key) > (last key) ORDER BY key LIMIT n`` query, so its cost
+    does not grow with how far the client has scrolled.
+
+    Every ordering needs a matching index, including the direction and
+    NULL placement: ``(user, due_date, id)`` for ``due_date`` and
+    ``(user, due_date DESC NULLS LAST, id DESC)`` for ``-due_date``.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering_query_param = 'ordering'
+    page_size = 50
+    max_page_size = 500
+    invalid_cursor_message = 'Invalid cursor'
+
+    # Maps the public ``ordering`` value to the model fields of the key.
+    # The last field must be unique (the primary key) so the key is total.
+    orderings = {
+        'id': ('id',),
+    }
+    default_ordering = 'id'
+
+    def get_key_columns(self, request):
+        """
+        Returns the model fields the rows of a paginated response must
+        carry for the next link to be built: every field any supported
+        ordering sorts on. Empty when the request is not paginated.
+        """
+        if not self.is_requested(request):
+            return set()
+        return {name for fields in self.orderings.values() for name in fields}
+
+    def is_requested(self, request):
+        """
+        Returns True when the client asked for a paginated response.
+        """
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Returns the next page of ``queryset`` as a list, or None when the
+        request did not opt in to pagination.
+
+        Parameters:
+        - queryset: The already user-scoped queryset to paginate.
+        - request: The DRF request carrying the cursor and page size.
+        - view: The view being paginated (unused).
+
+        Raises:
+        - ValidationError: If the cursor cannot be decoded (400).
+
+        Returns:
+        A list of at most ``page_size`` model instances, or None.
+        """
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        model = queryset.model
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            self.ordering, position = self.decode_cursor(encoded, model)
+        else:
+            self.ordering, position = self.get_ordering(request), None
+
+        self.fields = self.orderings[self.ordering.lstrip('-')]
+        self.descending = self.ordering.startswith('-')
+        self.nullable = {name for name in self.fields if model._meta.get_field(name).null}
+
+        queryset = queryset.order_by(*self.get_order_by())
+        # Fetch one extra row to find out whether another page exists.
+        if position is None:
+            results = list(queryset[:self.page_size + 1])
+        else:
+            results = []
+            for seek_filter in self.get_seek_filters(position):
+                results += queryset.filter(seek_filter)[:self.page_size + 1 - len(results)]
+                if len(results) > self.page_size:
+                    break
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        """
+        Wraps a serialized page in a ``{"next": ..., "results": [...]}``
+        envelope.
+        """
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        """
+        Reads ``page_size`` from the query string, clamped to
+        ``max_page_size``. Missing or invalid values use the default.
+        """
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, request):
+        """
+        Returns the requested ordering if it is one of ``orderings``
+        (optionally prefixed with ``-``), otherwise the default.
+        """
+        ordering = request.query_params.get(self.ordering_query_param, self.default_ordering)
+        if ordering.lstrip('-') not in self.orderings:
+            return self.default_ordering
+        return ordering
+
+    def get_order_by(self, ordering=None):
+        """
+        Builds the ORDER BY clause for the key of ``ordering`` (by default
+        the one of the current page). NULLs always sort last so the order
+        matches a plain ascending b-tree index on Postgres.
+        """
+        ordering = self.ordering if ordering is None else ordering
+        descending = ordering.startswith('-')
+        order_by = []
+        for name in self.orderings[ordering.lstrip('-')]:
+            expression = F(name).desc(nulls_last=True) if descending else F(name).asc(nulls_last=True)
+            order_by.append(expression)
+        return order_by
+
+    def get_seek_filters(self, position):
+        """
+        Builds the filters selecting every row that sorts after
+        ``position`` under the current ordering, as a list of regions to
+        read in order until the page is full.
+
+        For a key ``(a, b)`` the first region is ``a >= x AND (a > x OR
+        (a = x AND b > y))``. The redundant ``a >= x`` bound is what lets
+        the database start the index scan at the cursor instead of
+        filtering every earlier row. NULLs sort last, so when ``a`` is
+        nullable the rows where it is NULL are a second region, read
+        (with its own index range) only once the first one runs out.
+        """
+        regions = [self.seek(self.fields, position)]
+        leading, value = self.fields[0], position[0]
+        if value is not None and leading in self.nullable and len(self.fields) > 1:
+            regions.append(Q(**{f'{leading}__isnull': True}))
+        return regions
+
+    def seek(self, fields, position):
+        """
+        Returns the filter for the rows after ``position`` among those
+        equal on the fields before ``fields``.
+        """
+        after, bound = ('lt', 'lte') if self.descending else ('gt', 'gte')
+        name, value = fields[0], position[0]
+        if len(fields) == 1:
+            return Q(**{f'{name}__{after}': value})
+        rest = self.seek(fields[1:], position[1:])
+        if value is None:
+            # Only other NULLs can tie with it; they sort last.
+            return Q(**{f'{name}__isnull': True}) & rest
+        condition = Q(**{f'{name}__{bound}': value}) & (Q(**{f'{name}__{after}': value}) | (Q(**{name: value}) & rest))
+        if name in self.nullable and name != self.fields[0]:
+            condition |= Q(**{f'{name}__isnull': True})
+        return condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        # Pages of a ``.values()`` queryset hold dicts instead of instances.
+        if isinstance(last, dict):
+            position = [last[name] for name in self.fields]
+        else:
+            position = [getattr(last, name) for name in self.fields]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position))
+
+    def encode_cursor(self, position):
+        """
+        Encodes the ordering and the key of the last row on the page as an
+        opaque URL-safe token.
+        """
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]
+        payload = json.dumps({'o': self.ordering, 'p': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, encoded, model):
+        """
+        Decodes a token produced by ``encode_cursor`` back into the ordering
+        and a key position with each value converted to its field's Python
+        type.
+        """
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            ordering = payload['o']
+            fields = self.orderings[ordering.lstrip('-')]
+            values = payload['p']
+            if len(values) != len(fields):
+                raise ValueError
+            position = [
+                None if value is None else model._meta.get_field(name).to_python(value)
+                for name, value in zip(fields, values)
+            ]
+        except (TypeError, ValueError, KeyError, AttributeError, UnicodeError,
+                binascii.Error, ValidationError):
+            raise exceptions.ValidationError({self.cursor_query_param: [self.invalid_cursor_message]})
+        return ordering, position
+
+
+class ToDoListPagination(KeysetPagination):
+    """
+    Keyset pagination for todos, ordered by id or by due date.
+    """
+    orderings = {
+        'id': ('id',),
+        'due_date': ('due_date', 'id'),
+    }
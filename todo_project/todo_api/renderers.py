@@ -0,0 +1,85 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .instrumentation import timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Renders JSON with orjson when it is installed, and with DRF's stdlib
+    renderer otherwise.
+
+    orjson encodes dicts, lists, strings, numbers, dates, datetimes and
+    UUIDs natively in C. Anything else (Decimal, lazy translation strings,
+    querysets...) goes through DRF's ``JSONEncoder.default``, so the output
+    matches the stdlib renderer.
+    """
+    options = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def __init__(self):
+        super().__init__()
+        self._default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Render ``data`` into JSON, returning a bytestring.
+
+        ``indent`` requests (``application/json; indent=4`` or the
+        browsable API) are rendered with a two-space indent, the only one
+        orjson supports.
+        """
+        with timed('render'):
+            return self.render_bytes(data, accepted_media_type, renderer_context)
+
+    def render_bytes(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        options = self.options
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        try:
+            ret = orjson.dumps(data, default=self._default, option=options)
+        except TypeError:
+            # orjson refuses a few values the stdlib accepts, such as
+            # integers wider than 64 bits.
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Match JSONRenderer, which escapes these so the output stays a
+        # strict JavaScript subset.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    """
+    Parses JSON request bodies with orjson when it is installed, and with
+    DRF's stdlib parser otherwise.
+    """
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """
+        Parses the incoming bytestream as JSON and returns the resulting
+        data. orjson only accepts UTF-8, so other declared charsets fall
+        back to the stdlib parser.
+        """
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,76 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Set by the cookie and response header after a write: the client reads
+# from the primary until this UNIX time.
+PIN_COOKIE = 'db_primary_until'
+PIN_HEADER = 'X-Primary-Until'
+
+# The replica chosen for the current request, or None for the primary.
+_replica = ContextVar('replica', default=None)
+
+
+class ReplicaRouter:
+    """
+    Sends reads of this app's models to one of the databases listed in
+    ``TODO_API_READ_REPLICAS``, but only inside ``replica_reads(True)``,
+    which views opt in to for safe requests. Everything else, writes,
+    authentication and the other apps included, uses the primary.
+
+    The replica is picked once per block, so all the reads of a request
+    (the ETag aggregate, the rows, the prefetches) see the same snapshot
+    even when the replicas lag by different amounts. A context variable
+    carries it, so it follows the request into the threads
+    ``sync_to_async`` runs the async ORM in.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != 'todo_api':
+            return None
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        # Explicit, because Django otherwise writes an instance back to
+        # the database it was read from.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *getattr(settings, 'TODO_API_READ_REPLICAS', ())}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+@contextmanager
+def replica_reads(enabled):
+    """
+    Lets ``ReplicaRouter`` send the reads made inside the block to a
+    replica when ``enabled`` is true, the same one for the whole block.
+    """
+    replicas = getattr(settings, 'TODO_API_READ_REPLICAS', ())
+    token = _replica.set(random.choice(replicas) if enabled and replicas else None)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+def is_pinned(request):
+    """
+    Returns True while the client must read its own writes, i.e. until
+    the time in the pin cookie or the ``X-Primary-Until`` header.
+    """
+    if getattr(request, 'pin_to_primary', False):
+        return True
+    for value in (request.COOKIES.get(PIN_COOKIE), request.headers.get(PIN_HEADER)):
+        try:
+            if value is not None and float(value) > time.time():
+                return True
+        except ValueError:
+            continue
+    return False
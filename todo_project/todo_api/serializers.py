@@ -1,5 +1,9 @@
 from rest_framework import serializers
-from .models import ShoppingList
+from rest_framework.settings import api_settings
+from django.db import transaction
+from .models import ShoppingList, ShoppingItem
+from .items import sync_items
+from .instrumentation import timed
 from .models import ToDoList
 from django.contrib.auth import get_user_model
 
@@ -31,8 +35,51 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'email', 'is_active', 'is_staff']
 
-class ShoppingListSerializer(serializers.ModelSerializer):
+class OwnerFieldMixin:
+    """
+    Drops the nested ``user`` field when the view sends the owner once at
+    the envelope level (``owner_in_envelope`` in the serializer context).
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.context.get('owner_in_envelope'):
+            fields.pop('user', None)
+        return fields
+
+
+class FieldSelectionMixin:
+    """
+    Narrows the output to the sparse fieldset requested by the client.
+
+    The view puts the parsed ``?fields=`` and ``?omit=`` values in the
+    serializer context as ``fields`` (names to keep, or None for all)
+    and ``omit`` (names to drop).
+    """
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = self.context.get('fields')
+        omitted = self.context.get('omit') or ()
+        for name in list(fields):
+            if (selected is not None and name not in selected) or name in omitted:
+                fields.pop(name)
+        return fields
+
+
+class ShoppingItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ShoppingItem
+        fields = ['id', 'item', 'quantity', 'checked']
+
+
+class NestedShoppingItemSerializer(ShoppingItemSerializer):
+    # Writable here only to match submitted items to existing rows.
+    id = serializers.IntegerField(required=False)
+
+
+class ShoppingListSerializer(FieldSelectionMixin, OwnerFieldMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)  # Change PrimaryKeyRelatedField to UserSerializer
+    items = NestedShoppingItemSerializer(many=True, required=False)
 
     class Meta:
         model = ShoppingList
@@ -42,7 +89,7 @@ class ShoppingListSerializer(serializers.ModelSerializer):
         """
         Creates a ShoppingList instance from validated data. If 'user'
         is present in the data, it is set separately. The instance is
-        saved to the database and then returned.
+        saved to the database together with its items and then returned.
 
         Parameters
         ----------
@@ -56,8 +103,9 @@ class ShoppingListSerializer(serializers.ModelSerializer):
             The newly created ShoppingList instance with 'user' set
             and saved to the database.
         """
-        # Remove 'user' from validated_data if present
+        # Remove 'user' and 'items' from validated_data if present
         user_data = validated_data.pop('user', None)
+        items = validated_data.pop('items', [])
 
         # Create the ShoppingList object without 'user'
         shopping_list = ShoppingList(**validated_data)
@@ -66,8 +114,10 @@ class ShoppingListSerializer(serializers.ModelSerializer):
         if user_data:
             shopping_list.user = user_data
 
-        # Save the instance to the database
-        shopping_list.save()
+        # Save the instance and its items in one transaction
+        with transaction.atomic():
+            shopping_list.save()
+            sync_items(shopping_list, items)
 
         return shopping_list
 
@@ -75,8 +125,9 @@ class ShoppingListSerializer(serializers.ModelSerializer):
         """
         Update the attributes of a given instance with the provided validated
         data. If specific fields are not provided in the validated_data, it
-        retains the existing values. After updating, it saves the instance to
-        the database.
+        retains the existing values. Submitted items are matched to the
+        existing rows by id, so only added, changed or removed items are
+        written. After updating, it saves the instance to the database.
 
         Parameters:
         - instance: The object instance to be updated.
@@ -86,12 +137,14 @@ class ShoppingListSerializer(serializers.ModelSerializer):
         The updated instance after saving it to the database.
         """
         instance.name = validated_data.get('name', instance.name)
-        instance.items = validated_data.get('items', instance.items)
-        instance.save()
+        with transaction.atomic():
+            if 'items' in validated_data:
+                sync_items(instance, validated_data['items'])
+            instance.save()
         return instance
 
 
-class ToDoListSerializer(serializers.ModelSerializer):
+class ToDoListSerializer(FieldSelectionMixin, OwnerFieldMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
 
     class Meta:
@@ -144,4 +197,173 @@ class ToDoListSerializer(serializers.ModelSerializer):
         instance.done = validated_data.get('done', instance.done)
         instance.due_date = validated_data.get('due_date', instance.due_date)
         instance.save()
-        return instance
\ No newline at end of file
+        return instance
+
+# Field types whose ``to_representation`` returns database values as they
+# are, so the values-based serializers can copy them without a call.
+PASSTHROUGH_FIELDS = (serializers.CharField, serializers.IntegerField, serializers.BooleanField)
+
+
+def _converter(field):
+    """
+    Returns None if ``field`` outputs database values unchanged, otherwise
+    the function that formats them.
+    """
+    if isinstance(field, serializers.DateField):
+        if getattr(field, 'format', api_settings.DATE_FORMAT) is None:
+            return None
+        return field.to_representation
+    if isinstance(field, PASSTHROUGH_FIELDS):
+        return None
+    return field.to_representation
+
+
+class ValuesSerializer:
+    """
+    Read-only stand-in for a ModelSerializer on list endpoints.
+
+    Instead of building model instances and running every field's
+    ``to_representation``, rows are fetched with ``.values()`` and copied
+    into dicts shaped exactly like ``serializer_class`` output. Nested
+    serializers on a foreign key (the owner) are read through a join, and
+    nested ``many=True`` serializers on a reverse relation (items) with
+    one extra query.
+
+    The field list is taken from ``serializer_class`` itself (with the
+    same context), so the two stay in sync. Fields whose representation
+    is not a plain copy of the column are still passed through their
+    ``to_representation``.
+
+    Usage is two-step so the values queryset can be paginated:
+    ``rows = paginate(reader.get_queryset(queryset))`` and then
+    ``reader.to_representation(rows)``.
+    """
+    serializer_class = None
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        self.fields = self.serializer_class(context=self.context).fields
+        self.model = self.serializer_class.Meta.model
+        self.columns = []
+        self.plan = []
+        for name, field in self.fields.items():
+            if isinstance(field, serializers.ListSerializer):
+                relation = self.model._meta.get_field(field.source)
+                self.plan.append((name, 'many', (relation, self.child_plan(field.child))))
+            elif isinstance(field, serializers.BaseSerializer):
+                attname = self.model._meta.get_field(field.source).attname
+                nested = [
+                    (sub_name, f'{field.source}__{column}', convert)
+                    for sub_name, column, convert in self.child_plan(field)
+                ]
+                self.add_columns([attname] + [column for _, column, _ in nested])
+                self.plan.append((name, 'one', (attname, nested)))
+            else:
+                self.add_columns([field.source])
+                self.plan.append((name, 'field', (field.source, _converter(field))))
+        self.add_columns([self.model._meta.pk.attname])
+
+    def add_columns(self, columns):
+        for column in columns:
+            if column not in self.columns:
+                self.columns.append(column)
+
+    def child_plan(self, serializer):
+        return [(name, field.source, _converter(field)) for name, field in serializer.fields.items()]
+
+    def get_queryset(self, queryset, extra_columns=()):
+        """
+        Turns a model queryset (filtered and ordered as the view needs)
+        into the ``.values()`` queryset this serializer reads.
+
+        ``extra_columns`` are fetched without being output, e.g. the
+        pagination key when the client asked for a sparse fieldset.
+        """
+        columns = list(self.columns)
+        columns += [column for column in extra_columns if column not in columns]
+        return queryset.select_related(None).prefetch_related(None).values(*columns)
+
+    def to_representation(self, rows):
+        """
+        Builds the list output from the ``.values()`` rows.
+        """
+        rows = list(rows)
+        children = [(name, spec, list(queryset)) for name, spec, queryset in self.children_querysets(rows)]
+        return self.build_output(rows, children)
+
+    async def ato_representation(self, queryset):
+        """
+        Async counterpart of ``to_representation``: evaluates the
+        ``.values()`` queryset and the nested relations with async
+        iteration.
+        """
+        rows = [row async for row in queryset]
+        children = []
+        for name, spec, child_queryset in self.children_querysets(rows):
+            children.append((name, spec, [row async for row in child_queryset]))
+        return self.build_output(rows, children)
+
+    def build_output(self, rows, children):
+        # Timed apart from the queries, which are measured on their own.
+        with timed('serialize'):
+            grouped = {name: self.group_children(spec, child_rows) for name, spec, child_rows in children}
+            return self.assemble(rows, grouped)
+
+    def assemble(self, rows, children):
+        pk = self.model._meta.pk.attname
+        data = []
+        for row in rows:
+            item = {}
+            for name, kind, spec in self.plan:
+                if kind == 'field':
+                    column, convert = spec
+                    value = row[column]
+                    item[name] = value if convert is None or value is None else convert(value)
+                elif kind == 'one':
+                    attname, nested = spec
+                    item[name] = None if row[attname] is None else self.build(row, nested)
+                else:
+                    item[name] = children[name].get(row[pk], [])
+            data.append(item)
+        return data
+
+    def children_querysets(self, rows):
+        """
+        Yields ``(name, spec, queryset)`` for every nested ``many=True``
+        field: one ``.values()`` query loading the related rows of all
+        parents, in the related model's default ordering.
+        """
+        pk = self.model._meta.pk.attname
+        parent_ids = [row[pk] for row in rows]
+        for name, kind, spec in self.plan:
+            if kind != 'many':
+                continue
+            relation, plan = spec
+            parent_column = relation.field.attname
+            columns = [parent_column] + [column for _, column, _ in plan if column != parent_column]
+            queryset = relation.related_model._default_manager.filter(**{f'{parent_column}__in': parent_ids})
+            yield name, spec, queryset.values(*columns) if parent_ids else queryset.none()
+
+    def group_children(self, spec, rows):
+        relation, plan = spec
+        parent_column = relation.field.attname
+        grouped = {}
+        for row in rows:
+            grouped.setdefault(row[parent_column], []).append(self.build(row, plan))
+        return grouped
+
+    @staticmethod
+    def build(row, plan):
+        item = {}
+        for name, column, convert in plan:
+            value = row[column]
+            item[name] = value if convert is None or value is None else convert(value)
+        return item
+
+
+class ShoppingListValuesSerializer(ValuesSerializer):
+    serializer_class = ShoppingListSerializer
+
+
+class ToDoListValuesSerializer(ValuesSerializer):
+    serializer_class = ToDoListSerializer
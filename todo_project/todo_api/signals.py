@@ -0,0 +1,127 @@
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_out
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import get_token_cache, invalidate_tokens
+from .cache import get_list_cache
+from .events import publish_event
+from .instrumentation import record_query
+from .models import ShoppingList, ToDoList
+
+CACHE_RESOURCES = {
+    ShoppingList: 'shopping-list',
+    ToDoList: 'todo-list',
+}
+
+
+def invalidate_lists(user_id, resources=None):
+    """
+    Drops the cached list responses of a user once the current
+    transaction commits, so a concurrent request cannot re-cache the
+    pre-commit state.
+
+    Parameters:
+    - user_id: The owner whose lists changed.
+    - resources: Resource names to invalidate; all of them by default.
+    """
+    cache = get_list_cache()
+    if cache is None:
+        return
+    resources = resources or CACHE_RESOURCES.values()
+
+    def invalidate():
+        for resource in resources:
+            cache.invalidate(resource, user_id)
+
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_delete, sender=ShoppingList)
+@receiver(post_save, sender=ToDoList)
+@receiver(post_delete, sender=ToDoList)
+def invalidate_owner_lists(sender, instance, **kwargs):
+    invalidate_lists(instance.user_id, [CACHE_RESOURCES[sender]])
+
+
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_save, sender=ToDoList)
+def publish_saved_row(sender, instance, created, **kwargs):
+    if created:
+        action = 'created'
+    elif instance.deleted_at is not None:
+        action = 'deleted'
+    else:
+        action = 'updated'
+    publish_event(instance.user_id, CACHE_RESOURCES[sender], action, instance.pk, instance.updated_at)
+
+
+@receiver(post_delete, sender=ShoppingList)
+@receiver(post_delete, sender=ToDoList)
+def publish_deleted_row(sender, instance, **kwargs):
+    # Purging a tombstone is not news to the client.
+    if instance.deleted_at is None:
+        publish_event(instance.user_id, CACHE_RESOURCES[sender], 'deleted', instance.pk)
+
+
+def is_login_stamp(update_fields):
+    # Django saves only last_login on every login; no cached data shows it.
+    return update_fields is not None and set(update_fields) == {'last_login'}
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_lists(sender, instance, created, update_fields=None, **kwargs):
+    # The owner is nested in every row, so profile changes affect lists.
+    if not created and not is_login_stamp(update_fields):
+        invalidate_lists(instance.pk)
+
+
+def invalidate_user_tokens(user_id):
+    """
+    Drops the cached authentication of every token of a user once the
+    current transaction commits.
+    """
+    if get_token_cache() is None:
+        return
+
+    def invalidate():
+        invalidate_tokens(Token.objects.filter(user_id=user_id).values_list('key', flat=True))
+
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    # Covers dj_rest_auth's logout, which deletes the token, and users
+    # being deleted, which cascades to their token.
+    if get_token_cache() is not None:
+        # Read the key now; Django clears the primary key after deleting.
+        key = instance.key
+        transaction.on_commit(lambda: invalidate_tokens([key]))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_saved_user_tokens(sender, instance, created, update_fields=None, **kwargs):
+    # The cached user must not outlive a deactivation or profile change.
+    if not created and not is_login_stamp(update_fields):
+        invalidate_user_tokens(instance.pk)
+
+
+@receiver(user_logged_out)
+def invalidate_logged_out_tokens(sender, request, user, **kwargs):
+    if user is not None:
+        invalidate_user_tokens(user.pk)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    """
+    Times the queries of every connection for RequestTimingMiddleware.
+    The wrapper object outlives reconnections, so it is added only once.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
@@ -0,0 +1,166 @@
+import asyncio
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import CachedTokenAuthentication
+from .events import event_stream_disabled, get_event_broker
+from .renderers import ORJSONRenderer
+
+
+class EventStream:
+    """
+    ASGI app serving ``GET /api/events/``: a Server-Sent Events stream
+    of the current user's todo and shopping list changes.
+
+    Every other request is passed on to ``app`` (the Django application).
+    The stream is handled here rather than by a Django view so that an
+    open connection costs a coroutine, not a worker thread.
+
+    The token is read from the ``Authorization: Token <key>`` header or,
+    because browsers' ``EventSource`` cannot set headers, from
+    ``?token=<key>``. Each event is a JSON object such as
+    ``{"resource": "todo-list", "action": "updated", "id": 3,
+    "updated_at": "..."}``. The stream starts with ``{"action": "ready"}``
+    and may send ``{"action": "resync"}``; on either, the client refetches
+    its lists (cheap with ``If-None-Match``). Comments are sent every
+    ``keepalive`` seconds to keep proxies from closing the connection,
+    and the token is checked again each time.
+    """
+    path = '/api/events/'
+    keyword = 'Token'
+    keepalive = 15
+    retry = 5000
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == self.path:
+            await self.stream(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+    async def stream(self, scope, receive, send):
+        headers = dict(scope['headers'])
+        if scope['method'] != 'GET':
+            return await self.error(send, 405, 'Method "%s" not allowed.' % scope['method'], headers, [
+                (b'allow', b'GET'),
+            ])
+        broker = get_event_broker()
+        if broker is None:
+            reason = event_stream_disabled()
+            if reason is not None:
+                return await self.error(send, 503, reason, headers)
+            return await self.error(send, 404, 'Not found.', headers)
+
+        key = self.get_token_key(scope, headers)
+        try:
+            if key is None:
+                raise AuthenticationFailed('Authentication credentials were not provided.')
+            user, _ = await self.authenticate(key)
+        except AuthenticationFailed as exc:
+            return await self.error(send, 401, str(exc.detail), headers, [
+                (b'www-authenticate', self.keyword.encode()),
+            ])
+
+        subscription = broker.subscribe(user.pk)
+        disconnected = asyncio.ensure_future(self.wait_for_disconnect(receive))
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream'),
+                    (b'cache-control', b'no-cache'),
+                    # Stops nginx-style proxies from buffering the stream.
+                    (b'x-accel-buffering', b'no'),
+                    *self.cors_headers(headers),
+                ],
+            })
+            await self.send_event(send, {'action': 'ready'}, retry=self.retry)
+            while True:
+                next_event = asyncio.ensure_future(subscription.get())
+                done, _ = await asyncio.wait(
+                    {next_event, disconnected}, timeout=self.keepalive, return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnected in done:
+                    next_event.cancel()
+                    break
+                if next_event in done:
+                    await self.send_event(send, next_event.result())
+                    continue
+                next_event.cancel()
+                try:
+                    await self.authenticate(key)
+                except AuthenticationFailed:
+                    break
+                await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            subscription.close()
+            disconnected.cancel()
+
+    async def authenticate(self, key):
+        try:
+            return await CachedTokenAuthentication().aauthenticate_credentials(key)
+        finally:
+            # The stream never ends a Django request, so release the
+            # connection (or return it to the pool) as request_finished would.
+            await sync_to_async(close_old_connections)()
+
+    def get_token_key(self, scope, headers):
+        auth = headers.get(b'authorization', b'').split()
+        if len(auth) == 2 and auth[0].lower() == self.keyword.lower().encode():
+            return auth[1].decode('latin-1')
+        values = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('token')
+        return values[-1] if values else None
+
+    def cors_headers(self, headers):
+        # The stream bypasses Django's middleware, so corsheaders does not
+        # see it; allow the same origins.
+        origin = headers.get(b'origin', b'').decode('latin-1')
+        if origin not in getattr(settings, 'CORS_ALLOWED_ORIGINS', ()):
+            return []
+        return [
+            (b'access-control-allow-origin', origin.encode('latin-1')),
+            (b'access-control-allow-credentials', b'true'),
+            (b'vary', b'Origin'),
+        ]
+
+    async def send_event(self, send, data, retry=None):
+        body = b'data: ' + ORJSONRenderer().render(data) + b'\n\n'
+        if retry is not None:
+            body = b'retry: %d\n' % retry + body
+        await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+
+    async def wait_for_disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    async def error(self, send, status, detail, headers, extra_headers=()):
+        body = ORJSONRenderer().render({'detail': detail})
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                *extra_headers,
+                *self.cors_headers(headers),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+def event_stream_unavailable(request):
+    """
+    Answers ``/api/events/`` when the request reaches Django, i.e. when
+    no ``EventStream`` sits in front of it (WSGI), rather than letting
+    the single-page app's catch-all return its HTML.
+    """
+    return JsonResponse({'detail': 'The event stream is only served under ASGI.'}, status=501)
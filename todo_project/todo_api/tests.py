@@ -1,3 +1,1355 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import datetime
+import json
+import os
+import runpy
+import tempfile
+import threading
+import time
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock, skipIf
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User, update_last_login
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.client import AsyncRequestFactory, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from . import metrics, throttling
+from .async_views import AsyncShoppingListDetailView, AsyncShoppingListView, AsyncToDoListView
+from .authentication import get_token_cache, invalidate_tokens, token_cache_key
+from .cache import get_list_cache
+from .events import check_worker_count, event_stream_disabled, get_event_broker
+from .instrumentation import RequestMetrics, request_measured
+from .items import POSITION_STEP, assign_positions
+from .middleware import ReplicaPinningMiddleware
+from .models import ShoppingItem, ShoppingList, ToDoList
+from .renderers import ORJSONRenderer
+from .routers import PIN_COOKIE, ReplicaRouter, is_pinned, replica_reads
+from .serializers import (
+    ShoppingListSerializer, ShoppingListValuesSerializer, ToDoListSerializer, ToDoListValuesSerializer,
+)
+from .sse import EventStream
+from .sync import encode_cursor, tombstone_horizon
+from .transfer import CONTENT_TYPES
+from .urls import urlpatterns
+from .views import ShoppingListView, ToDoListView
+
+try:
+    from .db.pooled_postgresql import base as pooled_postgresql
+except ImproperlyConfigured:
+    # psycopg2 is not installed.
+    pooled_postgresql = None
+
+
+def create_fixtures():
+    """
+    Creates two users with a mix of todos and shopping lists, including
+    empty values, non-ASCII text, tombstones and lists without items.
+    """
+    user = User.objects.create_user('owner', 'owner@example.com', 'password')
+    other = User.objects.create_user('other', 'other@example.com', 'password')
+    today = datetime.date(2024, 2, 29)
+    for index in range(12):
+        ToDoList.objects.create(
+            user=user,
+            description=f'Tâche {index}   "quoted"',
+            done=index % 2 == 0,
+            due_date=today + datetime.timedelta(days=index) if index % 3 else None,
+        )
+    ToDoList.objects.create(user=other, description='Not mine')
+    ToDoList.objects.create(user=user, description='Deleted').soft_delete()
+
+    for index in range(4):
+        shopping_list = ShoppingList.objects.create(user=user, name=f'List {index} ✓')
+        for position in range(index):
+            shopping_list.items.create(
+                item=f'Item {position}', quantity=str(position) if position else '',
+                checked=position == 1, position=position * 1024,
+            )
+    ShoppingList.objects.create(user=other, name='Not mine').items.create(item='x', position=1)
+    return user
+
+
+class FixtureTestCase(APITestCase):
+    """
+    Loads ``create_fixtures()`` once per class, gives both of its users a
+    token and authenticates the client as the owner. ``authenticate``
+    switches to another user.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_fixtures()
+        cls.other = User.objects.get(username='other')
+        cls.tokens = {user.pk: Token.objects.create(user=user) for user in (cls.user, cls.other)}
+        cls.token = cls.tokens[cls.user.pk]
+
+    def setUp(self):
+        self.authenticate(self.user)
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.tokens[user.pk].key)
+
+
+class ValuesSerializerEquivalenceTest(TestCase):
+    """
+    The values-based list serializers must render exactly the same bytes
+    as the ModelSerializers they replace.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_fixtures()
+
+    def assertSameOutput(self, serializer_class, values_serializer_class, queryset, context):
+        expected = serializer_class(queryset, many=True, context=context).data
+        reader = values_serializer_class(context=context)
+        actual = reader.to_representation(reader.get_queryset(queryset))
+        for renderer in (JSONRenderer(), ORJSONRenderer()):
+            self.assertEqual(renderer.render(actual), renderer.render(expected))
+
+    def test_todo_lists(self):
+        queryset = ToDoList.objects.filter(user=self.user).select_related('user').order_by('id')
+        for envelope in (False, True):
+            with self.subTest(owner_in_envelope=envelope):
+                self.assertSameOutput(
+                    ToDoListSerializer, ToDoListValuesSerializer, queryset, {'owner_in_envelope': envelope},
+                )
+
+    def test_shopping_lists(self):
+        queryset = ShoppingList.objects.filter(user=self.user).select_related('user').prefetch_related('items')
+        for envelope in (False, True):
+            with self.subTest(owner_in_envelope=envelope):
+                self.assertSameOutput(
+                    ShoppingListSerializer, ShoppingListValuesSerializer, queryset.order_by('id'),
+                    {'owner_in_envelope': envelope},
+                )
+
+    def test_empty_queryset(self):
+        queryset = ShoppingList.objects.none()
+        self.assertSameOutput(ShoppingListSerializer, ShoppingListValuesSerializer, queryset, {})
+
+
+@override_settings(TODO_API_LIST_CACHE=None)
+class ValuesListEndpointTest(FixtureTestCase):
+    """
+    The list endpoints return the same body whichever serializer builds
+    it. The list cache is off so both requests are actually rendered.
+    """
+
+    def test_same_body(self):
+        urls = ['/api/todo-lists/', '/api/shopping-lists/']
+        queries = [
+            '', '?owner=envelope', '?page_size=5', '?page_size=5&ordering=-due_date',
+            '?fields=id,user', '?omit=user,due_date&page_size=5&ordering=due_date',
+        ]
+        for view, url in zip((ToDoListView, ShoppingListView), urls):
+            for query in queries:
+                if 'due_date' in query and view is ShoppingListView:
+                    continue
+                with self.subTest(url=url + query):
+                    fast = self.client.get(url + query)
+                    with mock.patch.object(view, 'values_serializer_class', None):
+                        slow = self.client.get(url + query)
+                    self.assertEqual(fast.status_code, 200)
+                    self.assertEqual(fast.content, slow.content)
+
+
+@override_settings(TODO_API_LIST_CACHE=None)
+class ToDoListFilterTest(FixtureTestCase):
+    """
+    ``ToDoListFilter`` narrows and sorts the todo list in the query, with
+    and without keyset pagination.
+    """
+
+    def descriptions(self, rows):
+        return [row['description'].split()[1] for row in rows]
+
+    def test_filters_and_ordering(self):
+        response = self.client.get('/api/todo-lists/?done=false&due_after=2024-03-02&ordering=-due_date')
+        self.assertEqual(self.descriptions(response.json()), ['11', '7', '5'])
+        response = self.client.get('/api/todo-lists/?q=t%C3%A2che%201&due_before=2024-03-11&ordering=id')
+        self.assertEqual(self.descriptions(response.json()), ['1', '10'])
+
+    def test_paginated(self):
+        response = self.client.get('/api/todo-lists/?page_size=2&done=true&ordering=due_date')
+        self.assertEqual(self.descriptions(response.data['results']), ['2', '4'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual(self.descriptions(response.data['results']), ['8', '10'])
+
+    def test_invalid(self):
+        response = self.client.get('/api/todo-lists/?done=maybe&due_before=tomorrow&due_after=2024-01-01')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {'done', 'due_before'})
+        for ordering in ('foo', '-', 'description', '--id'):
+            with self.subTest(ordering=ordering):
+                response = self.client.get(f'/api/todo-lists/?ordering={ordering}')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(set(response.json()), {'ordering'})
+                response = self.client.get(f'/api/todo-lists/?page_size=2&ordering={ordering}')
+                self.assertEqual(response.status_code, 400)
+
+
+@override_settings(TODO_API_LIST_CACHE=None)
+class KeysetPaginationTest(FixtureTestCase):
+    """
+    Following ``next`` links visits every todo exactly once in the
+    requested order, whatever the page size, across NULL due dates and
+    ties on the due date.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Ties with a fixture todo, and with each other.
+        for index in range(3):
+            ToDoList.objects.create(user=cls.user, description=f'Tie {index}', due_date=datetime.date(2024, 3, 2))
+
+    def expected(self, ordering):
+        todos = list(ToDoList.objects.filter(user=self.user))
+        if ordering == 'id':
+            return sorted(todo.pk for todo in todos)
+        sign = -1 if ordering.startswith('-') else 1
+        todos.sort(key=lambda todo: (
+            todo.due_date is None, sign * (todo.due_date.toordinal() if todo.due_date else 0), sign * todo.pk,
+        ))
+        return [todo.pk for todo in todos]
+
+    def test_pages(self):
+        for ordering in ('id', 'due_date', '-due_date'):
+            for page_size in (1, 2, 3, 5, 100):
+                with self.subTest(ordering=ordering, page_size=page_size):
+                    url, seen = f'/api/todo-lists/?page_size={page_size}&ordering={ordering}', []
+                    while url:
+                        response = self.client.get(url)
+                        self.assertEqual(response.status_code, 200)
+                        self.assertLessEqual(len(response.data['results']), page_size)
+                        seen += [row['id'] for row in response.data['results']]
+                        url = response.data['next']
+                    self.assertEqual(seen, self.expected(ordering))
+
+    def test_invalid_cursor(self):
+        for cursor in ('garbage', 'eyJvIjoiZHVlX2RhdGUiLCJwIjpbMV19', 'eyJvIjoibmFtZSIsInAiOlsxXX0'):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(f'/api/todo-lists/?cursor={cursor}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('cursor', response.json())
+
+
+@override_settings(TODO_API_LIST_CACHE=None)
+class ConditionalRequestTest(FixtureTestCase):
+    """
+    List ETags answer ``If-None-Match`` with 304 and change with every
+    write, user and representation; a stale ``If-Match`` stops a write
+    with 412.
+    """
+
+    def etag(self, url='/api/todo-lists/'):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_not_modified(self):
+        etag = self.etag()
+        response = self.client.get('/api/todo-lists/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        response = self.client.get('/api/todo-lists/', HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_changes_on_write(self):
+        etags = [self.etag()]
+        pk = self.client.post('/api/todo-lists/', {'description': 'New'}, format='json').data['id']
+        etags.append(self.etag())
+        self.client.patch(f'/api/todo-lists/{pk}/', {'done': True}, format='json')
+        etags.append(self.etag())
+        self.client.delete(f'/api/todo-lists/{pk}/')
+        etags.append(self.etag())
+        self.assertEqual(len(set(etags)), 4)
+        self.assertEqual(self.etag(), etags[-1])
+
+    def test_etag_per_user_and_variant(self):
+        etags = {self.etag(), self.etag('/api/todo-lists/?page_size=5')}
+        etags.add(self.etag('/api/todo-lists/?fields=id'))
+        self.authenticate(self.other)
+        etags.add(self.etag())
+        self.assertEqual(len(etags), 4)
+
+    def test_stale_if_match(self):
+        todo = ToDoList.objects.filter(user=self.user).first()
+        url = f'/api/todo-lists/{todo.pk}/'
+        etag = self.client.get(url)['ETag']
+        ToDoList.objects.filter(pk=todo.pk).update(updated_at=timezone.now())
+        for method, body in (('put', {'description': 'Lost', 'done': True}), ('patch', {'done': True}), ('delete', None)):
+            with self.subTest(method=method):
+                response = getattr(self.client, method)(url, body, format='json', HTTP_IF_MATCH=etag)
+                self.assertEqual(response.status_code, 412)
+        todo_after = ToDoList.all_objects.get(pk=todo.pk)
+        self.assertEqual((todo_after.description, todo_after.done, todo_after.deleted_at), (todo.description, todo.done, None))
+
+        fresh = self.client.get(url)['ETag']
+        response = self.client.patch(url, {'done': not todo.done}, format='json', HTTP_IF_MATCH=fresh)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], fresh)
+
+    def test_if_match_ignores_representation(self):
+        shopping_list = ShoppingList.objects.filter(user=self.user).first()
+        url = f'/api/shopping-lists/{shopping_list.pk}/'
+        sparse = self.client.get(url + '?fields=id,items')['ETag']
+        full = self.client.get(url)['ETag']
+        self.assertNotEqual(sparse, full)
+        # A 304 still needs the same representation.
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=sparse).status_code, 200)
+        self.assertEqual(self.client.get(url + '?fields=id,items', HTTP_IF_NONE_MATCH=sparse).status_code, 304)
+
+        response = self.client.patch(url, {'name': 'Renamed'}, format='json', HTTP_IF_MATCH=sparse)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.delete(url, HTTP_IF_MATCH=sparse)
+        self.assertEqual(response.status_code, 412)
+        current = self.client.get(url + '?fields=id')['ETag']
+        self.assertEqual(self.client.delete(url, HTTP_IF_MATCH=current).status_code, 204)
+
+
+@override_settings(TODO_API_LIST_CACHE={
+    'BACKEND': 'todo_api.cache.LRUCacheBackend',
+    'VALIDATE': False,
+})
+class ListCacheTest(FixtureTestCase):
+    """
+    Without ETag validation a cached list is only refreshed by the
+    invalidation the signals schedule for after the commit, so a stale
+    response shows a missed invalidation.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.cache = get_list_cache()
+
+    def count(self):
+        response = self.client.get('/api/todo-lists/')
+        self.assertEqual(response.status_code, 200)
+        return len(response.data)
+
+    def test_hit_after_miss(self):
+        self.assertEqual(self.count(), 12)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.count(), 12)
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_invalidated_after_commit(self):
+        self.count()
+        with self.captureOnCommitCallbacks() as callbacks:
+            ToDoList.objects.create(user=self.user, description='New')
+        # Not before the commit, when another request could re-cache the old rows.
+        self.assertEqual(self.count(), 12)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.count(), 13)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/todo-lists/{ToDoList.objects.filter(user=self.user).first().pk}/')
+        self.assertEqual(self.count(), 12)
+
+    def test_per_user(self):
+        self.count()
+        self.authenticate(self.other)
+        self.assertEqual(self.count(), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            ToDoList.objects.create(user=self.other, description='New')
+        self.assertEqual(self.count(), 2)
+        self.authenticate(self.user)
+        hits = self.cache.hits
+        self.assertEqual(self.count(), 12)
+        self.assertEqual(self.cache.hits, hits + 1)
+
+
+@override_settings(
+    TODO_API_LIST_CACHE=None,
+    TODO_API_TOKEN_CACHE={'BACKEND': 'todo_api.cache.LRUCacheBackend'},
+)
+class TokenCacheTest(FixtureTestCase):
+    """
+    A warm token authenticates without a query, and every change that
+    should end its session drops the cached entry once committed.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.key = self.token.key
+        self.cache = get_token_cache()
+        # The cache is configured once for the class; start every test cold.
+        self.cache.clear()
+
+    def cached(self):
+        return self.cache.get(token_cache_key(self.cache, self.key)) is not None
+
+    def test_warm_token_saves_query(self):
+        with CaptureQueriesContext(connection) as cold:
+            self.assertEqual(self.client.get('/api/todo-lists/').status_code, 200)
+        self.assertTrue(self.cached())
+        with CaptureQueriesContext(connection) as warm:
+            self.assertEqual(self.client.get('/api/todo-lists/').status_code, 200)
+        self.assertEqual(len(warm), len(cold) - 1)
+        self.assertFalse(any('authtoken_token' in query['sql'] for query in warm))
+
+    def test_dropped(self):
+        def logout():
+            self.client.post('/auth/logout/')
+
+        def deactivate():
+            self.user.is_active = False
+            self.user.save()
+
+        def change_password():
+            self.user.set_password('changed')
+            self.user.save()
+
+        for change in (logout, self.token.delete, deactivate, change_password):
+            with self.subTest(change=change.__name__):
+                self.assertEqual(self.client.get('/api/todo-lists/').status_code, 200)
+                self.assertTrue(self.cached())
+                with self.captureOnCommitCallbacks(execute=True):
+                    change()
+                self.assertFalse(self.cached())
+                # Reset the user and token for the next change.
+                self.user.is_active = True
+                self.user.save()
+                self.token, _ = Token.objects.get_or_create(user=self.user, key=self.key)
+
+    def test_invalidated_during_miss(self):
+        authenticate = TokenAuthentication.authenticate_credentials
+
+        def revoked_after_read(auth, key):
+            entry = authenticate(auth, key)
+            # The logout's on_commit invalidation lands before the write.
+            invalidate_tokens([key])
+            return entry
+
+        with mock.patch.object(TokenAuthentication, 'authenticate_credentials', revoked_after_read):
+            self.assertEqual(self.client.get('/api/todo-lists/').status_code, 200)
+        self.assertFalse(self.cached())
+
+    def test_kept_on_login(self):
+        self.client.get('/api/todo-lists/')
+        with self.captureOnCommitCallbacks(execute=True):
+            update_last_login(None, self.user)
+        self.assertTrue(self.cached())
+
+
+class SyncTest(FixtureTestCase):
+    """
+    ``/api/sync/`` returns a snapshot, then only what changed since the
+    cursor, including tombstones and rows that committed late, and asks
+    for a full resync once the cursor is older than the tombstones.
+    """
+
+    def sync(self, since=None):
+        response = self.client.get('/api/sync/', {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def ids(self, changes):
+        return sorted(row['id'] for row in changes['changed']), sorted(changes['deleted'])
+
+    @override_settings(SYNC_CURSOR_OVERLAP_SECONDS=0)
+    def test_round_trip(self):
+        snapshot = self.sync()
+        self.assertFalse(snapshot['reset'])
+        self.assertEqual(len(snapshot['todo_lists']['changed']), 12)
+        self.assertEqual(snapshot['todo_lists']['deleted'], [])
+        self.assertEqual(self.ids(self.sync(snapshot['cursor'])['todo_lists']), ([], []))
+
+        changed, removed = ToDoList.objects.filter(user=self.user)[:2]
+        changed.done = not changed.done
+        changed.save()
+        removed.soft_delete()
+        created = ToDoList.objects.create(user=self.user, description='New')
+        ToDoList.objects.create(user=self.other, description='Not mine')
+        delta = self.sync(snapshot['cursor'])
+        self.assertEqual(self.ids(delta['todo_lists']), (sorted([changed.pk, created.pk]), [removed.pk]))
+        self.assertEqual(self.ids(delta['shopping_lists']), ([], []))
+        self.assertEqual(self.ids(self.sync(delta['cursor'])['todo_lists']), ([], []))
+
+    def test_late_commit(self):
+        issued = timezone.now() - datetime.timedelta(minutes=10)
+        ToDoList.all_objects.update(updated_at=issued - datetime.timedelta(minutes=10))
+        cursor = encode_cursor(issued)
+        late = ToDoList.objects.filter(user=self.user).first()
+        # Saved before the cursor was issued, committed after it.
+        ToDoList.objects.filter(pk=late.pk).update(updated_at=issued - datetime.timedelta(seconds=5))
+        self.assertEqual(self.ids(self.sync(cursor)['todo_lists'])[0], [late.pk])
+        with override_settings(SYNC_CURSOR_OVERLAP_SECONDS=0):
+            self.assertEqual(self.ids(self.sync(cursor)['todo_lists'])[0], [])
+
+    def test_expired_cursor(self):
+        stale = encode_cursor(tombstone_horizon() - datetime.timedelta(days=1))
+        response = self.sync(stale)
+        self.assertTrue(response['reset'])
+        self.assertEqual(len(response['todo_lists']['changed']), 12)
+        self.assertEqual(response['todo_lists']['deleted'], [])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/sync/', {'since': 'garbage'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('since', response.json())
+
+
+@override_settings(TODO_API_LIST_CACHE=None)
+class AsyncViewEquivalenceTest(FixtureTestCase):
+    """
+    The async views answer with the same status, body and ETag as the
+    sync views, whether they serve the request or fall back.
+    """
+
+    def assertSameResponse(self, async_view, path, **kwargs):
+        headers = {'authorization': 'Token ' + self.token.key}
+        expected = self.client.get(path)
+        actual = async_to_sync(async_view.as_view())(AsyncRequestFactory().get(path, **headers), **kwargs)
+        # Fallback responses are rendered by the handler, as for sync views.
+        actual.render()
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual.content, expected.content)
+        self.assertEqual(actual.get('ETag'), expected.get('ETag'))
+
+    def test_lists(self):
+        for query in ('', '?owner=envelope', '?omit=items', '?fields=bogus', '?page_size=2'):
+            with self.subTest(query=query):
+                self.assertSameResponse(AsyncShoppingListView, '/api/shopping-lists/' + query)
+        for query in ('?fields=id,done', '?done=true&ordering=-due_date', '?due_before=never'):
+            with self.subTest(query=query):
+                self.assertSameResponse(AsyncToDoListView, '/api/todo-lists/' + query)
+
+    def test_detail(self):
+        shopping_list = ShoppingList.objects.filter(user=self.user).last()
+        path = f'/api/shopping-lists/{shopping_list.pk}/'
+        self.assertSameResponse(AsyncShoppingListDetailView, path, pk=shopping_list.pk)
+        self.assertSameResponse(AsyncShoppingListDetailView, '/api/shopping-lists/0/', pk=0)
+
+
+class EventStreamTest(TransactionTestCase):
+    """
+    Commits of the user's rows reach their open event stream, and nothing
+    else does. A transaction test case, so on_commit callbacks run.
+    """
+
+    async def test_stream(self):
+        user = await sync_to_async(User.objects.create_user)('owner', 'owner@example.com', 'password')
+        other = await sync_to_async(User.objects.create_user)('other', 'other@example.com', 'password')
+        token = await sync_to_async(Token.objects.create)(user=user)
+        sent = []
+        closed = asyncio.Event()
+
+        async def receive():
+            await closed.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        def write():
+            todo = ToDoList.objects.create(user=user, description='Milk')
+            todo.soft_delete()
+            ToDoList.objects.create(user=other, description='Not mine')
+            ShoppingList.objects.create(user=user, name='Groceries')
+
+        scope = {
+            'type': 'http', 'path': '/api/events/', 'method': 'GET', 'headers': [],
+            'query_string': f'token={token.key}'.encode(),
+        }
+        stream = asyncio.ensure_future(EventStream(None)(scope, receive, send))
+        while len(sent) < 2:
+            await asyncio.sleep(0.01)
+        await sync_to_async(write)()
+        while len(sent) < 5:
+            await asyncio.sleep(0.01)
+        closed.set()
+        await asyncio.wait_for(stream, 1)
+
+        self.assertEqual(sent[0]['status'], 200)
+        events = [json.loads(message['body'].partition(b'data: ')[2]) for message in sent[1:] if message['body']]
+        self.assertEqual(
+            [(event.get('resource'), event['action']) for event in events],
+            [(None, 'ready'), ('todo-list', 'created'), ('todo-list', 'deleted'), ('shopping-list', 'created')],
+        )
+
+    def test_not_served_by_django(self):
+        response = self.client.get('/api/events/')
+        self.assertEqual(response.status_code, 501)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_several_workers_disable_stream(self):
+        self.addCleanup(check_worker_count, 1)
+        with self.assertLogs('todo_api.events', 'WARNING'):
+            check_worker_count(2)
+        self.assertIsNone(get_event_broker())
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'path': '/api/events/', 'method': 'GET', 'headers': [], 'query_string': b''}
+        async_to_sync(EventStream(None))(scope, None, send)
+        self.assertEqual(sent[0]['status'], 503)
+
+        check_worker_count(1)
+        self.assertIsNotNone(get_event_broker())
+        with override_settings(TODO_API_EVENT_BROKER=None):
+            check_worker_count(2)
+            self.assertIsNone(event_stream_disabled())
+
+    def test_gunicorn_asgi_profile(self):
+        self.addCleanup(check_worker_count, 1)
+        environ = {'GUNICORN_PROFILE': 'asgi', 'WEB_CONCURRENCY': '3'}
+        with mock.patch.dict(os.environ, environ), mock.patch('todo_api.metrics.record_worker'):
+            config = runpy.run_path(os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'))
+            self.assertEqual((config['worker_class'], config['workers']), ('uvicorn.workers.UvicornWorker', 3))
+            # The worker boots; only the event stream is turned off.
+            with self.assertLogs('todo_api.events', 'WARNING'):
+                config['post_worker_init'](SimpleNamespace(cfg=SimpleNamespace(workers=config['workers'])))
+        self.assertIn('3 workers', event_stream_disabled())
+
+
+@override_settings(TODO_API_READ_REPLICAS=['replica'])
+class ReplicaRoutingTest(SimpleTestCase):
+    """
+    Only opted-in reads of this app's models go to a replica, and a
+    write pins the client to the primary.
+    """
+
+    def test_router(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(ToDoList))
+        with replica_reads(True):
+            self.assertEqual(router.db_for_read(ToDoList), 'replica')
+            self.assertIsNone(router.db_for_read(User))
+            self.assertEqual(router.db_for_write(ToDoList), 'default')
+        with replica_reads(False):
+            self.assertIsNone(router.db_for_read(ToDoList))
+
+    @override_settings(TODO_API_READ_REPLICAS=['replica', 'replica2'])
+    def test_one_replica_per_block(self):
+        router = ReplicaRouter()
+        chosen = set()
+        for _ in range(20):
+            with replica_reads(True):
+                aliases = {router.db_for_read(model) for model in (ToDoList, ShoppingList, ShoppingItem) * 5}
+            self.assertEqual(len(aliases), 1)
+            chosen |= aliases
+        self.assertLessEqual(chosen, {'replica', 'replica2'})
+
+    def test_pinning(self):
+        factory = RequestFactory()
+        middleware = ReplicaPinningMiddleware(lambda request: HttpResponse())
+        self.assertNotIn(PIN_COOKIE, middleware(factory.get('/api/todo-lists/')).cookies)
+        response = middleware(factory.post('/api/todo-lists/'))
+        request = factory.get('/api/todo-lists/')
+        self.assertFalse(is_pinned(request))
+        request.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        self.assertTrue(is_pinned(request))
+        self.assertTrue(is_pinned(factory.get('/', HTTP_X_PRIMARY_UNTIL=response['X-Primary-Until'])))
+        self.assertFalse(is_pinned(factory.get('/', HTTP_X_PRIMARY_UNTIL='1')))
+
+
+class FakeConnection:
+    """
+    Stands in for a psycopg2 connection in the pool tests; ``SELECT 1``
+    fails once ``healthy`` is cleared.
+    """
+
+    def __init__(self):
+        self.closed = 0
+        self.healthy = True
+        self.pings = 0
+        self.resets = 0
+        self.info = SimpleNamespace(transaction_status=0)
+
+    @contextlib.contextmanager
+    def cursor(self):
+        self.pings += 1
+        if not self.healthy:
+            raise pooled_postgresql.Database.OperationalError('server closed the connection')
+        yield mock.Mock()
+
+    def reset(self):
+        self.resets += 1
+
+    def close(self):
+        self.closed = 1
+
+
+@skipIf(pooled_postgresql is None, 'psycopg2 is not installed')
+class ConnectionPoolTest(SimpleTestCase):
+
+    def test_checkout_blocks_then_times_out(self):
+        pool = pooled_postgresql.ConnectionPool(max_size=1, timeout=0.05)
+        connection = pool.get(FakeConnection)
+        started = time.monotonic()
+        with self.assertRaises(pooled_postgresql.Database.OperationalError):
+            pool.get(FakeConnection)
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+
+        # A connection returned while waiting is handed to the waiter.
+        pool.timeout = 5
+        threading.Timer(0.05, pool.put, [connection]).start()
+        self.assertIs(pool.get(FakeConnection), connection)
+
+    def test_broken_connection_replaced(self):
+        pool = pooled_postgresql.ConnectionPool(max_size=1, check_after=0)
+        connection = pool.get(FakeConnection)
+        pool.put(connection)
+        connection.healthy = False
+        replacement = pool.get(FakeConnection)
+        self.assertIsNot(replacement, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(len(pool), 0)
+
+    def test_recently_returned_not_checked(self):
+        pool = pooled_postgresql.ConnectionPool(check_after=60)
+        connection = pool.get(FakeConnection)
+        pool.put(connection)
+        self.assertIs(pool.get(FakeConnection), connection)
+        self.assertEqual(connection.pings, 0)
+
+    def test_reset_on_return(self):
+        pool = pooled_postgresql.ConnectionPool()
+        connection = pool.get(FakeConnection)
+        pool.put(connection)
+        self.assertEqual(connection.resets, 1)
+        self.assertEqual(len(pool), 1)
+
+        # A connection in an unknown state is closed instead.
+        connection = pool.get(FakeConnection)
+        connection.info.transaction_status = pooled_postgresql.Database.extensions.TRANSACTION_STATUS_UNKNOWN
+        pool.put(connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(len(pool), 0)
+
+    def test_close_returns_to_pool(self):
+        wrapper = pooled_postgresql.DatabaseWrapper({
+            'NAME': 'pool-test',
+            'OPTIONS': {},
+            'CONN_HEALTH_CHECKS': False,
+            'POOL': {'MAX_SIZE': 1},
+        }, alias='pool-test')
+        self.addCleanup(pooled_postgresql._pools.pop, ('pool-test', 'pool-test'), None)
+        wrapper.connection = wrapper.pool.get(FakeConnection)
+        connection = wrapper.connection
+        wrapper._close()
+        self.assertFalse(connection.closed)
+        self.assertEqual(len(wrapper.pool), 1)
+        self.assertIs(wrapper.pool.get(FakeConnection), connection)
+
+
+class ShoppingItemOrderTest(FixtureTestCase):
+    """
+    Items keep sparse positions, so reordering normally writes only the
+    moved row and never replaces existing rows.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.shopping_list = ShoppingList.objects.create(user=self.user, name='Ordered')
+        self.items = [
+            self.shopping_list.items.create(item=name, position=POSITION_STEP * (index + 1))
+            for index, name in enumerate('abcd')
+        ]
+        self.url = f'/api/shopping-lists/{self.shopping_list.pk}/items/'
+
+    def order(self):
+        return list(self.shopping_list.items.values_list('item', flat=True))
+
+    def item_writes(self, queries):
+        return [query['sql'] for query in queries if query['sql'].startswith('UPDATE "todo_api_shoppingitem"')]
+
+    def test_assign_positions(self):
+        self.assertEqual(assign_positions([3072, 1024, 2048]), [512, 1024, 2048])
+        self.assertEqual(assign_positions([1024, None, 2048, None]), [1024, 1536, 2048, 3072])
+        self.assertEqual(assign_positions([1, None, 2]), [1024, 2048, 3072])
+
+    def test_move_writes_one_row(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'{self.url}{self.items[3].pk}/move/', {'index': 1}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.item_writes(queries)), 1)
+        self.assertEqual(self.order(), ['a', 'd', 'b', 'c'])
+
+    def test_insert_between_adjacent_renumbers(self):
+        ShoppingItem.objects.filter(pk=self.items[1].pk).update(position=POSITION_STEP + 1)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'item': 'new', 'index': 1}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(self.item_writes(queries)), 1)
+        self.assertEqual(self.order(), ['a', 'new', 'b', 'c', 'd'])
+        positions = list(self.shopping_list.items.values_list('position', flat=True))
+        self.assertEqual(positions, [POSITION_STEP * (index + 1) for index in range(5)])
+
+    def test_reorder_keeps_ids(self):
+        ids = [item.pk for item in reversed(self.items)]
+        response = self.client.patch(f'/api/shopping-lists/{self.shopping_list.pk}/', {
+            'items': [{'id': pk, 'item': item.item} for pk, item in zip(ids, reversed(self.items))],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data['items']], ids)
+        self.assertEqual(list(self.shopping_list.items.values_list('pk', flat=True)), ids)
+        self.assertEqual(self.order(), ['d', 'c', 'b', 'a'])
+
+
+@override_settings(TODO_API_LIST_CACHE=None)
+class JSONPatchTest(FixtureTestCase):
+    """
+    ``application/json-patch+json`` PATCHes of a shopping list, applied
+    to its ``{"name", "items"}`` representation.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.shopping_list = ShoppingList.objects.get(user=self.user, name='List 3 ✓')
+        self.url = f'/api/shopping-lists/{self.shopping_list.pk}/'
+
+    def patch(self, *operations):
+        return self.client.patch(self.url, json.dumps(operations), content_type='application/json-patch+json')
+
+    def state(self):
+        self.shopping_list.refresh_from_db()
+        return self.shopping_list.name, list(self.shopping_list.items.values_list('pk', 'item'))
+
+    def test_operations(self):
+        name, items = self.state()
+        a, b, c = items
+        cases = [
+            ({'op': 'replace', 'path': '/name', 'value': 'Renamed'}, 'Renamed', [a, b, c]),
+            ({'op': 'add', 'path': '/name', 'value': 'Added'}, 'Added', [a, b, c]),
+            ({'op': 'copy', 'from': '/items/1/item', 'path': '/name'}, b[1], [a, b, c]),
+            ({'op': 'move', 'from': '/items/0', 'path': '/items/-'}, b[1], [b, c, a]),
+            ({'op': 'remove', 'path': '/items/1'}, b[1], [b, a]),
+            ({'op': 'add', 'path': '/items/-', 'value': {'item': 'Milk'}}, b[1], [b, a, (None, 'Milk')]),
+            ({'op': 'copy', 'from': '/name', 'path': '/items/-/item'}, None, None),
+        ]
+        for operation, name, items in cases:
+            with self.subTest(op=operation['op'], path=operation['path']):
+                response = self.patch(operation)
+                if items is None:
+                    # "-" only addresses the end of an array, not a member.
+                    self.assertEqual(response.status_code, 400)
+                    continue
+                self.assertEqual(response.status_code, 200)
+                stored_name, stored_items = self.state()
+                self.assertEqual(stored_name, name)
+                self.assertEqual([item for _, item in stored_items], [item for _, item in items])
+                # Existing rows keep their ids; only the new item gets one.
+                for (pk, _), (expected, _) in zip(stored_items, items):
+                    if expected is not None:
+                        self.assertEqual(pk, expected)
+                self.assertEqual([item['id'] for item in response.data['items']], [pk for pk, _ in stored_items])
+
+    def test_copy_to_end(self):
+        _, items = self.state()
+        response = self.patch({'op': 'copy', 'from': '/items/0', 'path': '/items/-'})
+        self.assertEqual(response.status_code, 200)
+        _, stored = self.state()
+        self.assertEqual([item for _, item in stored], [item for _, item in items + items[:1]])
+        self.assertEqual([pk for pk, _ in stored][:3], [pk for pk, _ in items])
+        self.assertNotIn(stored[3][0], [pk for pk, _ in items])
+
+    def test_failed_test_conflicts(self):
+        before = self.state()
+        response = self.patch(
+            {'op': 'replace', 'path': '/name', 'value': 'Renamed'},
+            {'op': 'remove', 'path': '/items/0'},
+            {'op': 'test', 'path': '/items/0/checked', 'value': False},
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.state(), before)
+
+    def test_malformed(self):
+        before = self.state()
+        patches = [
+            [{'op': 'replace', 'path': 'name', 'value': 'x'}],
+            [{'op': 'remove', 'path': '/items/01'}],
+            [{'op': 'remove', 'path': '/items/3'}],
+            [{'op': 'replace', 'path': '/missing/name', 'value': 'x'}],
+            [{'op': 'frobnicate', 'path': '/name'}],
+            [{'op': 'add', 'path': '/name'}],
+            [{'op': 'move', 'path': '/items/0'}],
+            [{'op': 'move', 'from': '/items', 'path': '/items/0'}],
+            {'op': 'remove', 'path': '/name'},
+        ]
+        for operations in patches:
+            with self.subTest(operations=operations):
+                response = self.client.patch(
+                    self.url, json.dumps(operations), content_type='application/json-patch+json',
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(self.state(), before)
+
+    def test_item_patch_keeps_ids(self):
+        _, items = self.state()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch(
+                {'op': 'test', 'path': '/items/2/checked', 'value': False},
+                {'op': 'replace', 'path': '/items/2/checked', 'value': True},
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.state()[1], items)
+        self.assertEqual([item['id'] for item in response.data['items']], [pk for pk, _ in items])
+        self.assertTrue(ShoppingItem.objects.get(pk=items[2][0]).checked)
+        writes = ('UPDATE "todo_api_shoppingitem"', 'INSERT INTO "todo_api_shoppingitem"',
+                  'DELETE FROM "todo_api_shoppingitem"')
+        self.assertEqual(len([query for query in queries if query['sql'].startswith(writes)]), 1)
+
+
+class DashboardTest(FixtureTestCase):
+
+    def counts(self, today='2024-03-05'):
+        response = self.client.get('/api/dashboard/', {'today': today})
+        self.assertEqual(response.status_code, 200)
+        return response.data['counts']
+
+    def test_todo_counts(self):
+        # Open todos are due 03-01, 03-05, 03-07 and 03-11, two have no date.
+        expected = {'total': 12, 'open': 6, 'done': 6, 'overdue': 1, 'due_today': 1}
+        self.assertEqual(self.counts()['todo_lists'], expected)
+        self.assertEqual(self.counts('2024-03-12')['todo_lists']['overdue'], 4)
+        self.assertEqual(self.counts('2024-02-01')['todo_lists']['overdue'], 0)
+
+        rest_framework = {**settings.REST_FRAMEWORK, 'DATE_FORMAT': 'iso-8601'}
+        with override_settings(REST_FRAMEWORK=rest_framework):
+            self.assertEqual(self.counts()['todo_lists'], expected)
+
+    def test_shopping_list_counts(self):
+        counts = self.counts()['shopping_lists']
+        lists = ShoppingList.objects.filter(user=self.user).order_by('name')
+        self.assertEqual([counts[str(pk)] for pk in lists.values_list('pk', flat=True)], [
+            {'items': 0, 'checked': 0},
+            {'items': 1, 'checked': 0},
+            {'items': 2, 'checked': 1},
+            {'items': 3, 'checked': 1},
+        ])
+
+    def test_invalid_today(self):
+        self.assertEqual(self.client.get('/api/dashboard/', {'today': 'tomorrow'}).status_code, 400)
+
+
+@override_settings(TODO_API_LIST_CACHE=None)
+class BatchTest(FixtureTestCase):
+    url = '/api/batch/'
+
+    def setUp(self):
+        super().setUp()
+        self.todo = ToDoList.objects.filter(user=self.user).first()
+
+    def batch(self, requests, atomic=False):
+        return self.client.post(self.url, {'requests': requests, 'atomic': atomic}, format='json')
+
+    def test_atomic_rollback(self):
+        count = ToDoList.objects.count()
+        response = self.batch([
+            {'method': 'POST', 'path': '/api/todo-lists/', 'body': {'description': 'New'}},
+            {'method': 'PATCH', 'path': f'/api/todo-lists/{self.todo.pk}/', 'body': {'description': 'Changed'}},
+            {'method': 'PATCH', 'path': f'/api/todo-lists/{self.todo.pk}/', 'body': {'done': 'maybe'}},
+            {'method': 'DELETE', 'path': f'/api/todo-lists/{self.todo.pk}/'},
+            {'method': 'GET', 'path': '/api/todo-lists/'},
+        ], atomic=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['committed'])
+        self.assertEqual([entry['status'] for entry in response.data['responses']], [201, 200, 400, 424, 424])
+        self.assertEqual(ToDoList.objects.count(), count)
+        self.todo.refresh_from_db()
+        self.assertNotEqual(self.todo.description, 'Changed')
+
+    def test_not_atomic(self):
+        count = ToDoList.objects.count()
+        response = self.batch([
+            {'method': 'POST', 'path': '/api/todo-lists/', 'body': {'description': 'New'}},
+            {'method': 'PATCH', 'path': f'/api/todo-lists/{self.todo.pk}/', 'body': {'done': 'maybe'}},
+            {'method': 'GET', 'path': f'/api/todo-lists/{self.todo.pk}/'},
+        ])
+        self.assertTrue(response.data['committed'])
+        self.assertEqual([entry['status'] for entry in response.data['responses']], [201, 400, 200])
+        self.assertEqual(ToDoList.objects.count(), count + 1)
+
+    def test_size_limit(self):
+        entry = {'method': 'GET', 'path': f'/api/users/{self.user.pk}/'}
+        self.assertEqual(self.batch([entry] * 100).status_code, 200)
+        response = self.batch([entry] * 101)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('100', str(response.data['requests']))
+
+    def test_not_batchable(self):
+        for path in ('/api/batch/', '/api/export/', '/api/import/', '/api/events/', '/metrics', '/auth/logout/'):
+            with self.subTest(path=path):
+                response = self.batch([{'method': 'POST', 'path': path}])
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('cannot be batched', str(response.data['requests']))
+
+
+@override_settings(TODO_API_LIST_CACHE=None)
+class BulkWriteTest(FixtureTestCase):
+    """
+    A batch is written whole or not at all, and may only touch the
+    user's own rows.
+    """
+    url = '/api/todo-lists/bulk/'
+
+    def setUp(self):
+        super().setUp()
+        self.todos = list(ToDoList.objects.filter(user=self.user).order_by('pk')[:3])
+        self.foreign = ToDoList.objects.get(user=self.other)
+
+    def snapshot(self):
+        return list(ToDoList.all_objects.order_by('pk').values_list('pk', 'description', 'done', 'deleted_at'))
+
+    def test_batch(self):
+        response = self.client.post(self.url, {
+            'create': [{'description': 'New'}],
+            'update': [{'id': self.todos[0].pk, 'description': 'Changed'}],
+            'delete': [self.todos[1].pk],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'][0]['user']['id'], self.user.pk)
+        self.assertEqual(response.data['updated'][0]['description'], 'Changed')
+        self.assertEqual(response.data['deleted'], [self.todos[1].pk])
+        self.assertTrue(ToDoList.objects.filter(description='New', user=self.user).exists())
+        self.assertFalse(ToDoList.objects.filter(pk=self.todos[1].pk).exists())
+
+    def test_rolled_back(self):
+        before = self.snapshot()
+        payloads = {
+            'invalid create': {
+                'create': [{'description': 'New'}, {'done': 'maybe'}],
+                'update': [{'id': self.todos[0].pk, 'description': 'Changed'}],
+            },
+            'invalid update': {
+                'create': [{'description': 'New'}],
+                'update': [{'id': self.todos[0].pk, 'done': True}, {'id': self.todos[1].pk, 'done': 'maybe'}],
+            },
+            # The update is written before the delete is checked.
+            'unknown delete': {
+                'update': [{'id': self.todos[0].pk, 'description': 'Changed'}],
+                'delete': [self.todos[1].pk, 10 ** 6],
+            },
+        }
+        for name, payload in payloads.items():
+            with self.subTest(name):
+                response = self.client.post(self.url, payload, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(self.snapshot(), before)
+
+    def test_foreign_ids_rejected(self):
+        before = self.snapshot()
+        for key, row in (('update', {'id': self.foreign.pk, 'done': True}), ('delete', self.foreign.pk)):
+            with self.subTest(key):
+                response = self.client.post(self.url, {
+                    'create': [{'description': 'New'}],
+                    key: [row],
+                }, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(str(self.foreign.pk), str(response.data[key]))
+                self.assertEqual(self.snapshot(), before)
+
+
+class ExportImportTest(FixtureTestCase):
+    """
+    An export imported into another account recreates the same data, in
+    both formats, and a broken import writes nothing.
+    """
+
+    def export(self, user, export_format):
+        self.authenticate(user)
+        response = self.client.get(f'/api/export/?as={export_format}')
+        self.assertEqual(response['Content-Type'], CONTENT_TYPES[export_format])
+        return b''.join(response.streaming_content)
+
+    def records(self, body):
+        # Ids change on import; the list an item belongs to is implied by
+        # the record order.
+        return [
+            {key: value for key, value in json.loads(line).items() if key not in ('id', 'list')}
+            for line in body.splitlines()
+        ]
+
+    def test_round_trip(self):
+        exported = self.export(self.user, 'ndjson')
+        self.assertEqual(len(exported.splitlines()), 12 + 4 + 6)
+        for export_format in ('ndjson', 'csv'):
+            with self.subTest(export_format=export_format):
+                ToDoList.objects.filter(user=self.other).delete()
+                ShoppingList.objects.filter(user=self.other).delete()
+                body = self.export(self.user, export_format)
+                self.authenticate(self.other)
+                response = self.client.post('/api/import/', body, content_type=CONTENT_TYPES[export_format])
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual(response.data['created'], {'todo': 12, 'shopping-list': 4, 'shopping-item': 6})
+                self.assertEqual(self.records(self.export(self.other, 'ndjson')), self.records(exported))
+
+    def test_invalid_import(self):
+        self.authenticate(self.other)
+        body = b'{"type": "todo", "description": "ok"}\n\n{"type": "todo", "due_date": "never"}\n'
+        response = self.client.post('/api/import/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['line'], '3')
+        self.assertEqual(ToDoList.objects.filter(user=self.other).count(), 1)
+
+
+@override_settings(TODO_API_LIST_CACHE=None, TODO_API_TOKEN_CACHE=None)
+class RequestTimingTest(FixtureTestCase):
+    """
+    ``RequestTimingMiddleware`` reports a request's queries in the
+    ``Server-Timing`` header and logs slow requests with their SQL.
+    """
+
+    def test_server_timing(self):
+        self.assertFalse(self.client.get('/api/todo-lists/').has_header('Server-Timing'))
+        with override_settings(TODO_API_INSTRUMENTATION={'SERVER_TIMING': True}):
+            response = self.client.get('/api/todo-lists/?omit=user')
+        entries = {entry.split(';')[0]: entry for entry in response['Server-Timing'].split(', ')}
+        self.assertEqual(set(entries), {'total', 'db', 'serialize', 'render'})
+        self.assertRegex(entries['db'], r'^db;dur=\d+\.\d;desc="3 queries"$')
+
+    def test_measured_signal(self):
+        measured = []
+
+        def receiver(sender, response, metrics, **kwargs):
+            measured.append((response, metrics))
+
+        request_measured.connect(receiver)
+        self.addCleanup(request_measured.disconnect, receiver)
+        self.client.get('/api/shopping-lists/')
+        (response, metrics), = measured
+        self.assertEqual(metrics.response_bytes, len(response.content))
+        self.assertEqual(metrics.query_count, 4)
+
+    def test_slowest_queries_kept(self):
+        metrics = RequestMetrics(max_queries=2)
+        for duration, sql in ((0.3, 'a'), (0.1, 'b'), (0.5, 'c'), (0.2, 'd'), (0.4, 'e')):
+            metrics.add_query(sql, duration)
+        self.assertEqual(sorted(metrics.queries, reverse=True), [(0.5, 'c'), (0.4, 'e')])
+        self.assertEqual(metrics.query_count, 5)
+        self.assertAlmostEqual(metrics.db_time, 1.5)
+
+    def test_slow_request_log(self):
+        config = {'SLOW_REQUEST_MS': 0, 'MAX_LOGGED_QUERIES': 1}
+        with override_settings(TODO_API_INSTRUMENTATION=config), self.assertLogs('todo_api.performance') as logs:
+            self.client.get('/api/shopping-lists/')
+        message, = logs.output
+        self.assertRegex(message, r'GET /api/shopping-lists/ \(shopping-list\) -> 200, \d+ bytes, in')
+        self.assertIn('4 queries', message)
+        self.assertEqual(message.count('SELECT'), 1)
+
+
+def throttle_config(backend, rates):
+    return {'BACKEND': f'todo_api.throttling.{backend}', 'RATES': rates}
+
+
+class ThrottleTest(FixtureTestCase):
+    """
+    The token-bucket throttles refuse requests over a scope's rate with
+    a 429 and ``Retry-After``, report the bucket in ``RateLimit-*``
+    headers, and keep one bucket per user.
+    """
+
+    def test_user_bucket(self):
+        config = throttle_config('InProcessBucketBackend', {'lists': {'user': '2/minute'}})
+        with override_settings(TODO_API_THROTTLE=config):
+            self.client.force_authenticate(self.user)
+            responses = [self.client.get('/api/todo-lists/') for _ in range(3)]
+            self.assertEqual([response.status_code for response in responses], [200, 200, 429])
+            self.assertEqual([response['RateLimit-Remaining'] for response in responses], ['1', '0', '0'])
+            self.assertEqual(responses[2]['RateLimit-Limit'], '2')
+            self.assertEqual(responses[2]['Retry-After'], '30')
+            # Other scopes and other users have their own buckets.
+            self.assertEqual(self.client.get('/api/dashboard/').status_code, 200)
+            self.assertNotIn('RateLimit-Limit', self.client.get('/api/dashboard/'))
+            self.client.force_authenticate(self.other)
+            self.assertEqual(self.client.get('/api/shopping-lists/').status_code, 200)
+
+    def test_ip_bucket_is_shared_by_users(self):
+        config = throttle_config('DjangoCacheBucketBackend', {'lists': {'ip': '1/hour'}})
+        with override_settings(TODO_API_THROTTLE=config):
+            throttling.get_rate_limiter().backend.clear()
+            self.client.force_authenticate(self.user)
+            self.assertEqual(self.client.get('/api/todo-lists/').status_code, 200)
+            self.client.force_authenticate(self.other)
+            response = self.client.get('/api/todo-lists/')
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['RateLimit-Remaining'], '0')
+
+    @override_settings(TODO_API_THROTTLE=throttle_config('InProcessBucketBackend', {'lists': {'ip': '2/minute'}}))
+    def test_ip_bucket_ignores_spoofed_forwarded_for(self):
+        # The router appends the address it saw; the client controls the rest.
+        responses = [
+            self.client.get('/api/todo-lists/', HTTP_X_FORWARDED_FOR=f'10.0.0.{index}, 203.0.113.7')
+            for index in range(3)
+        ]
+        self.assertEqual([response.status_code for response in responses], [200, 200, 429])
+        other = self.client.get('/api/todo-lists/', HTTP_X_FORWARDED_FOR='10.0.0.1, 203.0.113.8')
+        self.assertEqual(other.status_code, 200)
+
+    def test_backends_refill(self):
+        buckets = throttling.InProcessBucketBackend()
+        self.assertEqual([buckets.consume('key', 2, 60, now=0).allowed for _ in range(3)], [True, True, False])
+        self.assertEqual(buckets.consume('key', 2, 60, now=0).wait, 30)
+        self.assertTrue(buckets.consume('key', 2, 60, now=30).allowed)
+
+        windows = throttling.DjangoCacheBucketBackend(key_prefix='test-throttle')
+        self.assertEqual([windows.consume('key', 2, 60, now=0).allowed for _ in range(3)], [True, True, False])
+        # Half way through the next window, half of the previous one counts.
+        self.assertTrue(windows.consume('key', 2, 60, now=90).allowed)
+        state = windows.consume('key', 2, 60, now=90)
+        self.assertFalse(state.allowed)
+        self.assertEqual(state.wait, 30)
+
+
+@skipIf(metrics.prometheus_client is None, 'prometheus_client is not installed')
+class MetricsEndpointTest(FixtureTestCase):
+    """
+    Requests are counted per URL name and exposed at ``/metrics``.
+    """
+
+    def sample(self, name, **labels):
+        return metrics.prometheus_client.REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_counts_requests(self):
+        labels = {'route': 'todo-list', 'method': 'GET', 'status': '200'}
+        before = self.sample('chorify_http_requests_total', **labels)
+        lookups = self.sample('chorify_cache_lookups_total', cache='token', result='hit')
+        self.client.get('/api/todo-lists/')
+        self.client.get('/api/todo-lists/')
+        self.assertEqual(self.sample('chorify_http_requests_total', **labels), before + 2)
+        self.assertEqual(self.sample('chorify_cache_lookups_total', cache='token', result='hit'), lookups + 1)
+
+        with override_settings(DEBUG=True):
+            response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'chorify_db_queries_per_request_bucket{le="3.0",route="todo-list"}', response.content)
+        self.assertIn(b'chorify_http_response_size_bytes_count{route="todo-list"}', response.content)
+
+    @override_settings(TODO_API_METRICS_TOKEN='secret')
+    def test_token(self):
+        self.client.credentials()
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+    @override_settings(TODO_API_METRICS_TOKEN=None)
+    def test_closed_without_token(self):
+        self.client.credentials()
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+
+class BenchmarkCommandTest(TestCase):
+    """
+    Seeds a small data set and benchmarks it in-process, checking that
+    every endpoint is measured and answers without errors.
+    """
+
+    def test_seed_and_bench(self):
+        call_command('seed_load_data', users=2, todos=10, lists=2, items=5, stdout=StringIO())
+        # Seeding again replaces the data but keeps the users and tokens.
+        token = Token.objects.get(user__username='load-0').key
+        call_command('seed_load_data', users=2, todos=10, lists=2, items=5, stdout=StringIO())
+        self.assertEqual(Token.objects.get(user__username='load-0').key, token)
+        self.assertEqual(ToDoList.all_objects.filter(user__username='load-0').count(), 10)
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            call_command('bench_endpoints', requests=2, warmup=0, output=output, label='test', stdout=StringIO())
+            with open(output) as results_file:
+                results = json.load(results_file)
+        endpoints = results['endpoints']
+        self.assertEqual({result['name'] for result in endpoints.values()}, {pattern.name for pattern in urlpatterns})
+        self.assertEqual({label: result['errors'] for label, result in endpoints.items() if result['errors']}, {})
+        self.assertLessEqual(endpoints['todo-list']['p50_ms'], endpoints['todo-list']['p99_ms'])
+
+
+@override_settings(TODO_API_LIST_CACHE=None, TODO_API_TOKEN_CACHE=None)
+class QueryCountTest(FixtureTestCase):
+    """
+    Pins the number of queries of every endpoint in ``todo_api/urls.py``
+    on fixtures with several rows per user, so an N+1 regression fails.
+
+    Both caches are off, so every count includes the token lookup and no
+    request depends on an earlier one having warmed a cache. Savepoints
+    of nested ``atomic`` blocks are counted too. Requests run in order:
+    the writes change the rows the later requests see.
+    """
+
+    def test_endpoints(self):
+        todo = ToDoList.objects.filter(user=self.user).first()
+        shopping_list = ShoppingList.objects.filter(user=self.user).last()
+        item = {'pk': shopping_list.pk, 'item_pk': shopping_list.items.first().pk}
+        batch = {'requests': [
+            {'method': 'GET', 'path': '/api/todo-lists/'},
+            {'method': 'GET', 'path': '/api/shopping-lists/'},
+        ]}
+        requests = [
+            ('get', 'user-list', {}, None, 2),
+            ('get', 'user-detail', {'pk': self.user.pk}, None, 2),
+            ('get', 'shopping-list', {}, None, 4),
+            ('get', 'shopping-list', {}, '?page_size=2', 4),
+            ('post', 'shopping-list', {}, {'name': 'New', 'items': [{'item': 'a'}, {'item': 'b'}]}, 7),
+            ('get', 'shopping-list-detail', {'pk': shopping_list.pk}, None, 3),
+            ('patch', 'shopping-list-detail', {'pk': shopping_list.pk}, {'name': 'Renamed'}, 9),
+            ('post', 'shopping-list-bulk', {}, {
+                'create': [{'name': 'a', 'items': [{'item': 'z'}]}, {'name': 'b'}],
+                'update': [{'id': shopping_list.pk, 'name': 'c'}],
+            }, 8),
+            ('get', 'shopping-item-list', {'pk': shopping_list.pk}, None, 3),
+            ('post', 'shopping-item-list', {'pk': shopping_list.pk}, {'item': 'Bread'}, 7),
+            ('get', 'shopping-item-detail', item, None, 2),
+            ('patch', 'shopping-item-detail', item, {'checked': True}, 7),
+            ('post', 'shopping-item-move', item, {'index': 1}, 8),
+            ('get', 'todo-list', {}, None, 3),
+            ('get', 'todo-list', {}, '?page_size=5&ordering=due_date', 3),
+            ('get', 'todo-list', {}, '?done=false&q=t%C3%A2che&ordering=-due_date', 3),
+            ('post', 'todo-list', {}, {'description': 'New'}, 2),
+            ('get', 'todo-list-detail', {'pk': todo.pk}, None, 2),
+            ('put', 'todo-list-detail', {'pk': todo.pk}, {'description': 'Changed', 'done': True}, 5),
+            ('post', 'todo-list-bulk', {}, {
+                'create': [{'description': 'a'}, {'description': 'b'}], 'update': [{'id': todo.pk, 'done': False}],
+            }, 6),
+            ('get', 'dashboard', {}, None, 6),
+            ('post', 'batch', {}, batch, 6),
+            ('get', 'sync', {}, None, 4),
+            ('get', 'export', {}, None, 4),
+            ('post', 'import', {}, b'\n'.join([
+                b'{"type": "todo", "description": "a"}', b'{"type": "todo", "description": "b"}',
+                b'{"type": "shopping-list", "id": 1, "name": "c"}', b'{"type": "shopping-item", "list": 1}',
+            ]), 6),
+            ('delete', 'shopping-item-detail', item, None, 7),
+            ('delete', 'todo-list-detail', {'pk': todo.pk}, None, 5),
+            ('delete', 'shopping-list-detail', {'pk': shopping_list.pk}, None, 6),
+        ]
+        covered = {name for _, name, _, _, _ in requests}
+        self.assertEqual(covered, {pattern.name for pattern in urlpatterns})
+
+        for method, name, kwargs, body, queries in requests:
+            url = reverse(name, kwargs=kwargs)
+            if isinstance(body, str):
+                url, body = url + body, None
+            with self.subTest(method=method, url=url), self.assertNumQueries(queries):
+                if isinstance(body, bytes):
+                    response = self.client.generic(method.upper(), url, body, CONTENT_TYPES['ndjson'])
+                else:
+                    response = getattr(self.client, method)(url, body, format='json')
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                self.assertLess(response.status_code, 300)
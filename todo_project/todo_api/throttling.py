@@ -0,0 +1,254 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """
+    Parses a rate such as ``'100/minute'`` or ``'5/h'`` (DRF's format)
+    into ``(requests, period in seconds)``.
+    """
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+class BucketState:
+    """
+    The outcome of taking a token from a bucket, as sent in the
+    ``RateLimit-*`` headers: the bucket size, the whole tokens left, the
+    seconds until the bucket is full again, and for a refused request the
+    seconds until a token is available.
+    """
+    __slots__ = ('allowed', 'limit', 'remaining', 'reset', 'wait')
+
+    def __init__(self, allowed, limit, remaining, reset, wait=None):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+        self.wait = wait
+
+
+class InProcessBucketBackend:
+    """
+    Token buckets in a dict of this process.
+
+    Each bucket is a ``(tokens, timestamp)`` pair, refilled from the
+    elapsed time when it is next used, so a check is a dict lookup and a
+    little arithmetic; no timer or background thread is involved. CPython
+    has no compare-and-swap, so the read-modify-write is done under a
+    lock, held only for those few operations. The least recently used
+    bucket is dropped once ``max_entries`` is reached; a dropped bucket
+    comes back full.
+
+    Every worker process has its own buckets, so the effective limit is
+    the rate times the number of workers.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, limit, period, now=None):
+        now = time.monotonic() if now is None else now
+        refill = limit / period
+        with self._lock:
+            tokens, stamp = self._buckets.get(key, (limit, now))
+            tokens = min(limit, tokens + (now - stamp) * refill)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        wait = None if allowed else (1 - tokens) / refill
+        return BucketState(allowed, limit, int(tokens), (limit - tokens) / refill, wait)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class DjangoCacheBucketBackend:
+    """
+    Buckets shared by every process through one of the caches configured
+    in ``CACHES`` (Redis, Memcached), using only atomic ``incr``.
+
+    A bucket of ``limit`` tokens refilled over ``period`` is approximated
+    by a sliding window: a counter per period, where the previous
+    period's count is weighted by how much of it still overlaps the
+    window. Each check is an ``incr`` and a ``get``; concurrent requests
+    get distinct counts from ``incr``, so no two of them can take the
+    last token. A refused request gives its count back.
+    """
+
+    def __init__(self, alias='default', key_prefix='throttle'):
+        self.alias = alias
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def consume(self, key, limit, period, now=None):
+        now = time.time() if now is None else now
+        window, elapsed = divmod(now, period)
+        current_key = f'{self.key_prefix}:{key}:{int(window)}'
+        try:
+            count = self.cache.incr(current_key)
+        except ValueError:
+            # First request of the window. add() keeps a concurrent
+            # first request from resetting the counter.
+            self.cache.add(current_key, 0, timeout=2 * period + 1)
+            count = self.cache.incr(current_key)
+        previous = self.cache.get(f'{self.key_prefix}:{key}:{int(window) - 1}', 0)
+
+        overlap = 1 - elapsed / period
+        used = previous * overlap + count
+        allowed = used <= limit
+        if allowed:
+            wait = None
+        else:
+            self.cache.decr(current_key)
+            used -= 1
+            if count > limit or not previous:
+                wait = period - elapsed
+            else:
+                # The previous window's weight drops by previous/period per second.
+                wait = min(period - elapsed, (used + 1 - limit) * period / previous)
+        return BucketState(allowed, limit, max(0, int(limit - used)), period - elapsed, wait)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class RateLimiter:
+    """
+    Applies the rates of ``TODO_API_THROTTLE['RATES']``: a mapping of
+    throttle scope to ``{'user': rate, 'ip': rate}``. Either kind may be
+    left out; scopes without rates are not limited.
+    """
+
+    def __init__(self, backend, rates):
+        self.backend = backend
+        self.rates = {
+            scope: {kind: parse_rate(rate) for kind, rate in kinds.items() if rate}
+            for scope, kinds in rates.items()
+        }
+
+    def consume(self, scope, kind, key):
+        """
+        Takes a token from the ``kind`` bucket of ``key`` in ``scope``.
+        Returns a ``BucketState``, or None when no rate applies.
+        """
+        rate = self.rates.get(scope, {}).get(kind)
+        if rate is None:
+            return None
+        return self.backend.consume(f'{scope}:{kind}:{key}', *rate)
+
+
+_rate_limiter = None
+_configured = False
+
+
+def get_rate_limiter():
+    """
+    Returns the process-wide ``RateLimiter`` described by the
+    ``TODO_API_THROTTLE`` setting, or None when throttling is disabled.
+    """
+    global _rate_limiter, _configured
+    if not _configured:
+        config = getattr(settings, 'TODO_API_THROTTLE', None)
+        if config and config.get('BACKEND'):
+            backend = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+            _rate_limiter = RateLimiter(backend, config.get('RATES', {}))
+        else:
+            _rate_limiter = None
+        _configured = True
+    return _rate_limiter
+
+
+@receiver(setting_changed)
+def reset_rate_limiter(*, setting, **kwargs):
+    global _rate_limiter, _configured
+    if setting == 'TODO_API_THROTTLE':
+        _rate_limiter = None
+        _configured = False
+
+
+class BucketThrottle(BaseThrottle):
+    """
+    Token-bucket throttle for views with a ``throttle_scope``, using the
+    rate of its ``kind`` in that scope.
+
+    The state of the most restrictive bucket checked for a request is
+    kept as ``request.rate_limit`` for ``RateLimitHeadersMiddleware``;
+    a refused request gets DRF's 429 with ``Retry-After``.
+    """
+    kind = None
+
+    def get_key(self, request):
+        """
+        Returns what the bucket is kept per, or None to not limit the
+        request.
+        """
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        limiter = get_rate_limiter() if scope else None
+        if limiter is None:
+            return True
+        key = self.get_key(request)
+        if key is None:
+            return True
+        self.state = limiter.consume(scope, self.kind, key)
+        if self.state is None:
+            return True
+        # The underlying HttpRequest, where the middleware can see it.
+        http_request = getattr(request, '_request', request)
+        current = getattr(http_request, 'rate_limit', None)
+        if current is None or (self.state.allowed, self.state.remaining) <= (current.allowed, current.remaining):
+            http_request.rate_limit = self.state
+        return self.state.allowed
+
+    def wait(self):
+        return self.state.wait
+
+
+class UserBucketThrottle(BucketThrottle):
+    """
+    Limits each authenticated user; anonymous requests are left to
+    ``IPBucketThrottle``.
+    """
+    kind = 'user'
+
+    def get_key(self, request):
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return None
+        return user.pk
+
+
+class IPBucketThrottle(BucketThrottle):
+    """
+    Limits each client address, as DRF determines it: with
+    ``NUM_PROXIES`` set, the ``X-Forwarded-For`` entry added by the
+    outermost trusted proxy, so addresses the client puts in the header
+    itself are ignored.
+    """
+    kind = 'ip'
+
+    def get_key(self, request):
+        return self.get_ident(request)
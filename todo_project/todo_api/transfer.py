@@ -0,0 +1,258 @@
+import codecs
+import csv
+import io
+import json
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from .events import publish_resync
+from .items import POSITION_STEP
+from .models import ShoppingItem, ShoppingList, ToDoList
+from .renderers import ORJSONRenderer
+from .serializers import ShoppingItemSerializer, ShoppingListSerializer, ToDoListSerializer
+from .signals import invalidate_lists
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+# Exports are flat records, one per line. Items follow the shopping list
+# they belong to and point to it by the list's id in the file.
+CSV_COLUMNS = ('type', 'id', 'list', 'name', 'description', 'done', 'due_date', 'item', 'quantity', 'checked')
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+RECORD_FIELDS = {
+    'todo': ('description', 'done', 'due_date'),
+    'shopping-list': ('name',),
+    'shopping-item': ('item', 'quantity', 'checked'),
+}
+
+# Rendered records are yielded in blocks of about this many bytes rather
+# than one write per row.
+BLOCK_SIZE = 64 * 1024
+
+
+def export_records(user, chunk_size=2000, using=None):
+    """
+    Yields every live todo, shopping list and shopping item of ``user``
+    as a flat record.
+
+    Rows are read with ``.iterator(chunk_size=...)`` (server-side cursors
+    on Postgres), so memory does not grow with the amount of data. Items
+    are read in one ordered query that is merged with the lists, rather
+    than one query per list.
+
+    Parameters:
+    - user: The owner of the exported rows.
+    - chunk_size: Rows fetched from the database at a time.
+    - using: The database alias to read from; routed as usual if None.
+    """
+    todos = (
+        ToDoList.objects.using(using).filter(user=user).order_by('id')
+        .values_list('id', 'description', 'done', 'due_date')
+    )
+    for pk, description, done, due_date in todos.iterator(chunk_size=chunk_size):
+        yield {'type': 'todo', 'id': pk, 'description': description, 'done': done, 'due_date': due_date}
+
+    lists = ShoppingList.objects.using(using).filter(user=user).order_by('id').values_list('id', 'name')
+    items = (
+        ShoppingItem.objects.using(using)
+        .filter(shopping_list__user=user, shopping_list__deleted_at__isnull=True)
+        .order_by('shopping_list_id', 'position', 'id')
+        .values_list('shopping_list_id', 'item', 'quantity', 'checked')
+        .iterator(chunk_size=chunk_size)
+    )
+    item = next(items, None)
+    for pk, name in lists.iterator(chunk_size=chunk_size):
+        yield {'type': 'shopping-list', 'id': pk, 'name': name}
+        # Items of lists created after the lists were read are skipped.
+        while item is not None and item[0] <= pk:
+            if item[0] == pk:
+                yield {'type': 'shopping-item', 'list': pk, 'item': item[1], 'quantity': item[2], 'checked': item[3]}
+            item = next(items, None)
+
+
+def render_ndjson(records):
+    """
+    Renders records as newline-delimited JSON, in blocks of bytes.
+    """
+    renderer = ORJSONRenderer()
+    block = bytearray()
+    for record in records:
+        block += renderer.render(record)
+        block += b'\n'
+        if len(block) >= BLOCK_SIZE:
+            yield bytes(block)
+            block.clear()
+    if block:
+        yield bytes(block)
+
+
+def render_csv(records):
+    """
+    Renders records as CSV with a header row, in blocks of bytes. Each
+    record fills the columns of its type and leaves the others empty.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for record in records:
+        writer.writerow([_csv_value(record.get(column)) for column in CSV_COLUMNS])
+        if buffer.tell() >= BLOCK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+RENDERERS = {
+    'ndjson': render_ndjson,
+    'csv': render_csv,
+}
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return value
+
+
+def read_ndjson(lines):
+    """
+    Parses newline-delimited JSON from an iterable of byte lines, one
+    line at a time. Yields ``(line number, record)``; blank lines are
+    skipped.
+    """
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = orjson.loads(line) if orjson else json.loads(line)
+        except ValueError as exc:
+            raise ValidationError({'line': number, 'detail': f'Invalid JSON: {exc}'})
+        yield number, record
+
+
+def read_csv(lines):
+    """
+    Parses CSV written by ``render_csv`` from an iterable of byte lines,
+    one record at a time. Yields ``(line number, record)``; empty cells
+    become missing keys, so they take the serializer's default.
+    """
+    reader = csv.DictReader(codecs.iterdecode(lines, 'utf-8'))
+    try:
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if key and value not in ('', None)}
+    except csv.Error as exc:
+        raise ValidationError({'line': reader.line_num, 'detail': f'Invalid CSV: {exc}'})
+
+
+READERS = {
+    'ndjson': read_ndjson,
+    'csv': read_csv,
+}
+
+
+class Importer:
+    """
+    Creates the records of an export for ``user``, as new rows: the ids
+    in the file are only used to attach items to their list.
+
+    Records are validated with the API serializers and written with one
+    ``bulk_create`` per model every ``batch_size`` records, so memory
+    stays flat however large the upload is, apart from a map of the
+    file's shopping list ids to the new ones.
+    """
+
+    def __init__(self, user, batch_size=500):
+        self.user = user
+        self.batch_size = batch_size
+        self.counts = {'todo': 0, 'shopping-list': 0, 'shopping-item': 0}
+        self.list_ids = {}
+        self.list_sizes = {}
+        self.pending = {name: [] for name in self.counts}
+
+    def run(self, records):
+        """
+        Imports ``(line number, record)`` pairs in one transaction and
+        returns the number of rows created per record type.
+
+        Raises:
+        - ValidationError: naming the line of the first invalid record.
+          Nothing is written in that case.
+        """
+        with transaction.atomic():
+            for number, record in records:
+                self.add(number, record)
+                if sum(len(rows) for rows in self.pending.values()) >= self.batch_size:
+                    self.flush()
+            self.flush()
+            invalidate_lists(self.user.pk, ['todo-list', 'shopping-list'])
+            # One event instead of one per row: clients refetch their lists.
+            publish_resync(self.user.pk)
+        return self.counts
+
+    def add(self, number, record):
+        kind = record.get('type') if isinstance(record, dict) else None
+        if kind not in RECORD_FIELDS:
+            raise ValidationError({'line': number, 'detail': f'Unknown record type: {kind!r}.'})
+        data = {name: record[name] for name in RECORD_FIELDS[kind] if name in record}
+        key, extra = None, {}
+        if kind == 'shopping-list':
+            key = record.get('id')
+            if key is None or key in self.list_ids:
+                raise ValidationError({'line': number, 'detail': 'Every shopping list needs a unique id.'})
+            self.list_ids[key] = None
+        elif kind == 'shopping-item':
+            key = record.get('list')
+            if key not in self.list_ids:
+                raise ValidationError({'line': number, 'detail': 'Items must follow the shopping list they refer to.'})
+            extra['position'] = self.next_position(key)
+        self.pending[kind].append((number, key, data, extra))
+
+    def next_position(self, key):
+        size = self.list_sizes.get(key, 0) + 1
+        self.list_sizes[key] = size
+        return POSITION_STEP * size
+
+    def flush(self):
+        todos = self.validate(ToDoListSerializer, self.pending['todo'])
+        ToDoList.objects.bulk_create([ToDoList(user=self.user, **attrs) for _, attrs in todos])
+
+        lists = self.validate(ShoppingListSerializer, self.pending['shopping-list'])
+        created = ShoppingList.objects.bulk_create([ShoppingList(user=self.user, **attrs) for _, attrs in lists])
+        for (key, _), shopping_list in zip(lists, created):
+            self.list_ids[key] = shopping_list.pk
+
+        items = self.validate(ShoppingItemSerializer, self.pending['shopping-item'])
+        ShoppingItem.objects.bulk_create([
+            ShoppingItem(shopping_list_id=self.list_ids[key], **attrs) for key, attrs in items
+        ])
+
+        for kind, rows in (('todo', todos), ('shopping-list', lists), ('shopping-item', items)):
+            self.counts[kind] += len(rows)
+            self.pending[kind] = []
+
+    def validate(self, serializer_class, rows):
+        """
+        Validates a batch of pending rows with ``serializer_class`` and
+        returns ``(key, attrs)`` pairs, where ``attrs`` are the validated
+        fields plus the ones the importer sets itself (item positions).
+        """
+        if not rows:
+            return []
+        serializer = serializer_class(data=[data for _, _, data, _ in rows], many=True)
+        if not serializer.is_valid():
+            for (number, _, _, _), errors in zip(rows, serializer.errors):
+                if errors:
+                    raise ValidationError({'line': number, 'detail': errors})
+        return [
+            (key, {**attrs, **extra})
+            for (_, key, _, extra), attrs in zip(rows, serializer.validated_data)
+        ]
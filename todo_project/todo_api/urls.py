@@ -1,5 +1,17 @@
+from django.conf import settings
 from django.urls import path
-from .views import UserList, UserDetail, ShoppingListView, ShoppingListDetailView, ToDoListView, ToDoListDetailView
+from .views import UserList, UserDetail, ShoppingListView, ShoppingListDetailView, ToDoListView, ToDoListDetailView, SyncView
+from .views import DashboardView, BatchView, ExportView, ImportView
+from .views import ShoppingListBulkView, ToDoListBulkView
+from .views import ShoppingItemListView, ShoppingItemDetailView, ShoppingItemMoveView
+
+if settings.TODO_API_ASYNC_VIEWS:
+    # ASGI deployments serve list and detail reads from the async views,
+    # which fall back to the sync views for everything else.
+    from .async_views import AsyncShoppingListView as ShoppingListView
+    from .async_views import AsyncShoppingListDetailView as ShoppingListDetailView
+    from .async_views import AsyncToDoListView as ToDoListView
+    from .async_views import AsyncToDoListDetailView as ToDoListDetailView
 
 urlpatterns = [
     # User management
@@ -9,8 +21,26 @@ urlpatterns = [
     # Shopping lists
     path('shopping-lists/', ShoppingListView.as_view(), name='shopping-list'),
     path('shopping-lists/<int:pk>/', ShoppingListDetailView.as_view(), name='shopping-list-detail'),
+    path('shopping-lists/bulk/', ShoppingListBulkView.as_view(), name='shopping-list-bulk'),
+    path('shopping-lists/<int:pk>/items/', ShoppingItemListView.as_view(), name='shopping-item-list'),
+    path('shopping-lists/<int:pk>/items/<int:item_pk>/', ShoppingItemDetailView.as_view(), name='shopping-item-detail'),
+    path('shopping-lists/<int:pk>/items/<int:item_pk>/move/', ShoppingItemMoveView.as_view(), name='shopping-item-move'),
 
     # ToDo lists
     path('todo-lists/', ToDoListView.as_view(), name='todo-list'),
     path('todo-lists/<int:pk>/', ToDoListDetailView.as_view(), name='todo-list-detail'),
+    path('todo-lists/bulk/', ToDoListBulkView.as_view(), name='todo-list-bulk'),
+
+    # Landing page data in one request
+    path('dashboard/', DashboardView.as_view(), name='dashboard'),
+
+    # Several API calls in one request
+    path('batch/', BatchView.as_view(), name='batch'),
+
+    # Delta sync for offline clients
+    path('sync/', SyncView.as_view(), name='sync'),
+
+    # Whole-account export and import
+    path('export/', ExportView.as_view(), name='export'),
+    path('import/', ImportView.as_view(), name='import'),
 ]
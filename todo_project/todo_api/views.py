@@ -1,20 +1,51 @@
+import datetime
+import logging
+
 from django.shortcuts import render
+from django.db import router, transaction
+from django.db.models import prefetch_related_objects
+from django.shortcuts import get_object_or_404
+from django.http import Http404, StreamingHttpResponse
+from django.core.exceptions import FieldDoesNotExist
+from django.utils import timezone
 from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework import permissions
+from rest_framework.views import APIView
+from rest_framework.settings import api_settings
 from django.contrib.auth.models import User
-from .models import ShoppingList
+from .models import ShoppingList, ShoppingItem
 from .serializers import UserSerializer, ShoppingListSerializer, UserRegistrationSerializer
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import AuthenticationFailed
+from .serializers import ShoppingItemSerializer, ShoppingListValuesSerializer, ToDoListValuesSerializer
+from .authentication import CachedTokenAuthentication
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.exceptions import AuthenticationFailed, UnsupportedMediaType, ValidationError
 from .models import ToDoList
 from .serializers import ToDoListSerializer
+from .pagination import KeysetPagination, ToDoListPagination
+from .filters import ToDoListFilter
+from .sync import collect_changes, decode_cursor, encode_cursor, tombstone_horizon
+from .signals import invalidate_lists
+from .events import publish_event
+from .instrumentation import timed
+from .routers import is_pinned, replica_reads
+from .items import POSITION_STEP, position_at, sync_items
+from .transfer import CONTENT_TYPES, READERS, RENDERERS, Importer, export_records
+from .batch import SubRequestError, build_subrequest, run_subrequest
+from .jsonpatch import JSONPatchError, JSONPatchParser, JSONPatchTestFailed, PatchConflict, apply_patch
+from .conditional import (
+    ConditionalListMixin, ConditionalWriteMixin, collection_etag, etag_matches, instance_etag, make_etag,
+    not_modified,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class UserRegistrationView(generics.CreateAPIView):
     serializer_class = UserRegistrationSerializer
+    # Checked before the serializer hashes the password.
+    throttle_scope = 'register'
 
     def post(self, request, *args, **kwargs):
         """
@@ -54,10 +85,232 @@ class UserDetail(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class ShoppingListView(generics.ListCreateAPIView):
-    authentication_classes = [TokenAuthentication]
+class ReplicaReadMixin:
+    """
+    Serves safe requests from the read replicas (see
+    ``todo_api.routers``) unless the client wrote within the last few
+    seconds. Writes always go to the primary.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with self.read_from_replicas(request):
+            return super().dispatch(request, *args, **kwargs)
+
+    def read_from_replicas(self, request):
+        return replica_reads(request.method in SAFE_METHODS and not is_pinned(request))
+
+
+class OwnerEnvelopeMixin:
+    """
+    Lets list views send the owning user once, next to the rows, instead
+    of nesting the same user object in every row.
+
+    Clients opt in with ``?owner=envelope``. Rows then omit ``user`` and
+    the queryset skips the join on the user table entirely.
+    """
+    owner_query_param = 'owner'
+
+    def owner_in_envelope(self):
+        if self.request.method not in ('GET', 'HEAD'):
+            return False
+        return self.request.query_params.get(self.owner_query_param) == 'envelope'
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['owner_in_envelope'] = self.owner_in_envelope()
+        return context
+
+    def with_owner(self, response):
+        """
+        Moves the owner into the response envelope when requested.
+
+        A plain list becomes ``{"user": ..., "results": [...]}``; a
+        paginated envelope gains a ``user`` key.
+        """
+        if not self.owner_in_envelope():
+            return response
+        owner = UserSerializer(self.request.user).data
+        if isinstance(response.data, dict):
+            response.data = {'user': owner, **response.data}
+        else:
+            response.data = {'user': owner, 'results': response.data}
+        return response
+
+
+class SparseFieldsMixin:
+    """
+    Supports sparse fieldsets on GET: ``?fields=id,description`` keeps
+    only the listed fields and ``?omit=user`` drops fields.
+
+    The selection is handed to the serializer through its context, and
+    ``sparse_queryset`` narrows the SQL to the columns that are still
+    needed. Views skip the owner join and the item prefetch when those
+    fields are not sent.
+    """
+    fields_query_param = 'fields'
+    omit_query_param = 'omit'
+
+    def get_field_selection(self):
+        """
+        Returns ``(fields, omit)``: the names to keep (None for all) and
+        the names to drop.
+
+        Raises:
+        - ValidationError: If a parameter names an unknown field.
+        """
+        if not hasattr(self, '_field_selection'):
+            self._field_selection = self.parse_field_selection()
+        return self._field_selection
+
+    def parse_field_selection(self):
+        if self.request.method not in ('GET', 'HEAD'):
+            return None, frozenset()
+        available = self.serializer_class.Meta.fields
+        selection = []
+        for param in (self.fields_query_param, self.omit_query_param):
+            value = self.request.query_params.get(param)
+            if value is None:
+                selection.append(None)
+                continue
+            names = [name.strip() for name in value.split(',') if name.strip()]
+            unknown = [name for name in names if name not in available]
+            if unknown:
+                raise ValidationError({param: f'Unknown field(s): {", ".join(unknown)}.'})
+            selection.append(frozenset(names))
+        fields, omit = selection
+        return fields, omit or frozenset()
+
+    def includes_field(self, name):
+        fields, omit = self.get_field_selection()
+        return (fields is None or name in fields) and name not in omit
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'], context['omit'] = self.get_field_selection()
+        return context
+
+    def sparse_queryset(self, queryset):
+        """
+        Restricts ``queryset`` with ``.only()`` to the primary key, the
+        pagination key and the selected concrete fields. Without a
+        selection the queryset is returned unchanged.
+        """
+        fields, omit = self.get_field_selection()
+        if fields is None and not omit:
+            return queryset
+        model = queryset.model
+        columns = {model._meta.pk.name}
+        if hasattr(self.paginator, 'get_key_columns'):
+            columns |= self.paginator.get_key_columns(self.request)
+        for name in self.serializer_class.Meta.fields:
+            if not self.includes_field(name):
+                continue
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete:
+                columns.add(name)
+        return queryset.only(*columns)
+
+
+class ValuesReadMixin:
+    """
+    Lets a list view build its GET output with a ``ValuesSerializer``
+    (rows read with ``.values()``) instead of ``serializer_class``.
+
+    The output is identical; only the CPU cost differs. Set
+    ``values_serializer_class`` to None on a view to go back to the
+    ModelSerializer, e.g. to compare the two.
+    """
+    values_serializer_class = None
+
+    def get_values_serializer(self):
+        if self.values_serializer_class is None:
+            return None
+        if not hasattr(self, '_values_serializer'):
+            self._values_serializer = self.values_serializer_class(context=self.get_serializer_context())
+        return self._values_serializer
+
+    def get_list_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        reader = self.get_values_serializer()
+        if reader is None:
+            return queryset
+        # Rows must carry the pagination key even if it is not output.
+        key_columns = ()
+        if hasattr(self.paginator, 'get_key_columns'):
+            key_columns = self.paginator.get_key_columns(self.request)
+        return reader.get_queryset(queryset, extra_columns=key_columns)
+
+    def serialize_list(self, rows):
+        reader = self.get_values_serializer()
+        if reader is None:
+            # Fetch first, so the serialize timing excludes the queries.
+            rows = list(rows)
+            with timed('serialize'):
+                return self.get_serializer(rows, many=True).data
+        return reader.to_representation(rows)
+
+    def supports_async_get(self):
+        """
+        Returns True when the async views can serve this GET: rows come
+        from the values serializer and no keyset page was requested.
+        """
+        if self.get_values_serializer() is None:
+            return False
+        return not (hasattr(self.paginator, 'is_requested') and self.paginator.is_requested(self.request))
+
+    async def alist(self, request, *args, **kwargs):
+        """
+        Async counterpart of ``list()`` for unpaginated responses.
+        """
+        data = await self.get_values_serializer().ato_representation(self.get_list_queryset())
+        return self.with_owner(Response(data, status=status.HTTP_200_OK, content_type='application/json'))
+
+
+class AsyncRetrieveMixin:
+    """
+    Async GET for detail views, used by the async views. The row is read
+    with ``aget()``, related rows included; ETags and the sparse fieldset
+    behave as in ``retrieve()``.
+    """
+
+    def supports_async_get(self):
+        return True
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            instance = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except queryset.model.DoesNotExist:
+            raise Http404
+        self.check_object_permissions(self.request, instance)
+        return instance
+
+    async def aget(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        etag = instance_etag(instance, request)
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return not_modified(etag)
+
+        serializer = self.get_serializer(instance)
+        response = Response(serializer.data, status=status.HTTP_200_OK, content_type='application/json')
+        response['ETag'] = etag
+        return response
+
+
+class ShoppingListView(ReplicaReadMixin, ConditionalListMixin, ValuesReadMixin, SparseFieldsMixin, OwnerEnvelopeMixin,
+                       generics.ListCreateAPIView):
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
     serializer_class = ShoppingListSerializer
+    values_serializer_class = ShoppingListValuesSerializer
+    pagination_class = KeysetPagination
+    throttle_scope = 'lists'
+    cache_resource = 'shopping-list'
+    version_model = ShoppingList
 
     def get_queryset(self):
         """
@@ -67,18 +320,28 @@ class ShoppingListView(generics.ListCreateAPIView):
         This function takes no parameters but uses the `self.request.user`
         to filter the ShoppingList objects.
 
+        The owner is fetched in the same query via ``select_related``
+        unless it is sent once in the envelope or omitted. Items are
+        loaded for all lists with one extra query unless omitted. With a
+        sparse fieldset only the needed columns are read.
+
         Returns:
             QuerySet: A QuerySet containing all ShoppingList objects
                       associated with the current user.
         """
         user = self.request.user
-        return ShoppingList.objects.filter(user=user)
+        queryset = ShoppingList.objects.filter(user=user)
+        if self.includes_field('items'):
+            queryset = queryset.prefetch_related('items')
+        if self.includes_field('user') and not self.owner_in_envelope():
+            queryset = queryset.select_related('user')
+        return self.sparse_queryset(queryset)
 
     def perform_create(self, serializer):
         """
         Attempts to create a resource using the provided serializer and
         associates it with the current user. If an error occurs during
-        the save operation, it prints the error and re-raises the
+        the save operation, it logs the error and re-raises the
         exception.
 
         :param serializer: The serializer instance that is used to
@@ -88,8 +351,8 @@ class ShoppingListView(generics.ListCreateAPIView):
         """
         try:
             serializer.save(user=self.request.user)
-        except Exception as e:
-            print(f"Error in perform_create: {e}")
+        except Exception:
+            logger.exception('Error in perform_create')
             raise
 
     def list(self, request, *args, **kwargs):
@@ -98,6 +361,14 @@ class ShoppingListView(generics.ListCreateAPIView):
         serializes the data, and returns it in a JSON formatted 
         HTTP response with status 200 OK.
 
+        ETags, ``If-None-Match`` and the list cache are handled by
+        ``ConditionalListMixin`` before this method is called.
+
+        When the client sends ``page_size`` or ``cursor`` only one keyset
+        page is returned, wrapped in a ``{"next", "results"}`` envelope.
+        Without those parameters the full list is returned as before.
+        Rows are built by ``values_serializer_class`` when it is set.
+
         Parameters:
         request - The HTTP request object.
         *args - Variable length argument list.
@@ -107,22 +378,67 @@ class ShoppingListView(generics.ListCreateAPIView):
         Response - The serialized data in JSON format with a 200 OK 
         status.
         """
-        queryset = self.get_queryset()
-        serializer = ShoppingListSerializer(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK, content_type='application/json')
+        queryset = self.get_list_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.with_owner(self.get_paginated_response(self.serialize_list(page)))
 
+        data = self.serialize_list(queryset)
+        return self.with_owner(Response(data, status=status.HTTP_200_OK, content_type='application/json'))
 
-class ShoppingListDetailView(generics.RetrieveUpdateDestroyAPIView):
-    authentication_classes = [TokenAuthentication]
+
+class ShoppingListDetailView(ReplicaReadMixin, AsyncRetrieveMixin, ConditionalWriteMixin, SparseFieldsMixin,
+                             generics.RetrieveUpdateDestroyAPIView):
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
-    queryset = ShoppingList.objects.all()
+    parser_classes = [*api_settings.DEFAULT_PARSER_CLASSES, JSONPatchParser]
+    queryset = ShoppingList.objects.select_related('user').prefetch_related('items')
     serializer_class = ShoppingListSerializer
 
+    def is_json_patch(self):
+        return (
+            self.request.method == 'PATCH'
+            and self.request.content_type.split(';')[0].strip() == JSONPatchParser.media_type
+        )
+
+    def requires_lock(self):
+        # A JSON Patch is applied to the stored state, which must not
+        # change between reading it and writing the result.
+        return self.is_json_patch() or super().requires_lock()
+
+    def get_serializer(self, *args, **kwargs):
+        """
+        For ``application/json-patch+json`` requests, applies the patch to
+        the list's current representation and validates the result as a
+        full update. The items are then written through the same diff as
+        any other update, so only the touched rows change.
+
+        Patch paths address the representation, e.g. ``/name``,
+        ``/items/3/checked`` or ``/items/-``.
+        """
+        if self.is_json_patch() and 'data' in kwargs:
+            instance = args[0]
+            kwargs['data'] = self.apply_json_patch(instance, kwargs['data'])
+            kwargs['partial'] = False
+        return super().get_serializer(*args, **kwargs)
+
+    def apply_json_patch(self, instance, operations):
+        document = {
+            'name': instance.name,
+            'items': [dict(item) for item in ShoppingItemSerializer(instance.items.all(), many=True).data],
+        }
+        try:
+            return apply_patch(document, operations)
+        except JSONPatchTestFailed as error:
+            raise PatchConflict(str(error))
+        except JSONPatchError as error:
+            raise ValidationError({'detail': str(error)})
+
     def perform_update(self, serializer):
         """
         Attempts to save updates made to a serialized object, 
         associating it with the current user. If an error occurs 
-        during save, it prints the error message and re-raises 
+        during save, it logs the error message and re-raises 
         the exception.
 
         Parameters:
@@ -134,15 +450,30 @@ class ShoppingListDetailView(generics.RetrieveUpdateDestroyAPIView):
         """
         try:
             serializer.save(user=self.request.user)
-        except Exception as e:
-            print(f"Error in perform_update: {e}")
+        except Exception:
+            logger.exception('Error in perform_update')
             raise
 
+    def perform_destroy(self, instance):
+        """
+        Soft-deletes the shopping list, leaving a tombstone so that
+        clients using the sync endpoint learn about the deletion.
+
+        Parameters:
+        instance (ShoppingList): The shopping list to delete.
+
+        Returns:
+        None
+        """
+        instance.soft_delete()
+
     def retrieve(self, request, *args, **kwargs):
         """
         Retrieve a specific object by processing a GET request, serialize
         the object, and return the serialized data in JSON format with a
-        200 OK HTTP status.
+        200 OK HTTP status. If the client's ``If-None-Match`` matches the
+        object's ETag, a 304 is returned without serializing. The output
+        honours ``?fields=`` and ``?omit=``.
 
         Parameters:
         - request: The HTTP request object.
@@ -153,31 +484,183 @@ class ShoppingListDetailView(generics.RetrieveUpdateDestroyAPIView):
         - Response object containing serialized data and HTTP status.
         """
         instance = self.get_object()
-        serializer = ShoppingListSerializer(instance)
-        return Response(serializer.data, status=status.HTTP_200_OK, content_type='application/json')
+        etag = instance_etag(instance, request)
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return not_modified(etag)
+
+        serializer = self.get_serializer(instance)
+        response = Response(serializer.data, status=status.HTTP_200_OK, content_type='application/json')
+        response['ETag'] = etag
+        return response
+
+
+class ShoppingItemMixin:
+    """
+    Scopes item views to the items of one of the current user's live
+    shopping lists, taken from the ``pk`` URL argument.
+
+    Every write bumps the parent list's ``updated_at`` via ``touch()``,
+    so list ETags, the list cache and the sync cursor see item changes.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    serializer_class = ShoppingItemSerializer
+
+    def get_shopping_list(self, lock=False):
+        queryset = ShoppingList.objects.filter(user=self.request.user)
+        if lock:
+            queryset = queryset.select_for_update()
+        return get_object_or_404(queryset, pk=self.kwargs['pk'])
+
+    def get_queryset(self):
+        return ShoppingItem.objects.filter(
+            shopping_list_id=self.kwargs['pk'],
+            shopping_list__user=self.request.user,
+            shopping_list__deleted_at__isnull=True,
+        )
+
+    def get_index(self, data, required=False):
+        """
+        Reads the optional zero-based ``index`` from the request body.
+        """
+        if 'index' not in data:
+            if required:
+                raise ValidationError({'index': 'This field is required.'})
+            return None
+        index = data['index']
+        if isinstance(index, bool) or not isinstance(index, int) or index < 0:
+            raise ValidationError({'index': 'Expected a non-negative integer.'})
+        return index
+
+
+class ShoppingItemListView(ShoppingItemMixin, generics.ListCreateAPIView):
+    throttle_scope = 'lists'
+
+    def list(self, request, *args, **kwargs):
+        """
+        Returns the items of one shopping list in their stored order.
+        Responds with 404 if the list does not exist or belongs to
+        another user.
+        """
+        self.get_shopping_list()
+        return super().list(request, *args, **kwargs)
+
+    def create(self, request, *args, **kwargs):
+        """
+        Adds one item to a shopping list without rewriting the others.
+
+        The item is appended unless the body carries an ``index``, in
+        which case it is inserted at that position. The parent list row is
+        locked for the duration so concurrent inserts cannot pick the same
+        position.
+
+        Parameters:
+        - request: The HTTP request object.
+        - *args: Variable length argument list.
+        - **kwargs: Arbitrary keyword arguments.
+
+        Returns:
+        - Response object with the created item and HTTP 201 Created status.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        index = self.get_index(request.data)
+        with transaction.atomic():
+            shopping_list = self.get_shopping_list(lock=True)
+            if index is None:
+                last = shopping_list.items.order_by('-position').values_list('position', flat=True).first()
+                position = (last or 0) + POSITION_STEP
+            else:
+                position = position_at(shopping_list, index)
+            serializer.save(shopping_list=shopping_list, position=position)
+            shopping_list.touch()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class ShoppingItemDetailView(ShoppingItemMixin, generics.RetrieveUpdateDestroyAPIView):
+    lookup_url_kwarg = 'item_pk'
+
+    def perform_update(self, serializer):
+        """
+        Saves the changed item and marks its shopping list as modified.
+        """
+        with transaction.atomic():
+            item = serializer.save()
+            item.shopping_list.touch()
+
+    def perform_destroy(self, instance):
+        """
+        Deletes the item and marks its shopping list as modified.
+        """
+        with transaction.atomic():
+            shopping_list = instance.shopping_list
+            instance.delete()
+            shopping_list.touch()
+
+
+class ShoppingItemMoveView(ShoppingItemMixin, APIView):
+
+    def post(self, request, *args, **kwargs):
+        """
+        Moves one item to the zero-based ``index`` given in the body.
+
+        Only the moved item is written unless its new neighbours leave no
+        room between their positions, in which case the list is
+        renumbered.
+
+        Parameters:
+        - request: The HTTP request object.
+        - *args: Variable length argument list.
+        - **kwargs: Arbitrary keyword arguments.
+
+        Returns:
+        - Response object with the moved item and HTTP 200 OK status.
+        """
+        index = self.get_index(request.data, required=True)
+        with transaction.atomic():
+            shopping_list = self.get_shopping_list(lock=True)
+            item = get_object_or_404(shopping_list.items.all(), pk=kwargs['item_pk'])
+            item.position = position_at(shopping_list, index, exclude=item.pk)
+            item.save(update_fields=['position'])
+            shopping_list.touch()
+        return Response(ShoppingItemSerializer(item).data, status=status.HTTP_200_OK)
 
 
-class ToDoListView(generics.ListCreateAPIView):
-    authentication_classes = [TokenAuthentication]
+class ToDoListView(ReplicaReadMixin, ConditionalListMixin, ValuesReadMixin, SparseFieldsMixin, OwnerEnvelopeMixin,
+                   generics.ListCreateAPIView):
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
     serializer_class = ToDoListSerializer
+    values_serializer_class = ToDoListValuesSerializer
+    pagination_class = ToDoListPagination
+    filter_backends = [ToDoListFilter]
+    throttle_scope = 'lists'
+    cache_resource = 'todo-list'
+    version_model = ToDoList
 
     def get_queryset(self):
         """
         Retrieves the queryset of ToDoList objects that are
         associated with the currently logged-in user.
         
+        The owner is fetched in the same query via ``select_related``
+        unless it is sent once in the envelope or omitted. With a sparse
+        fieldset only the needed columns are read.
+
         Returns:
             QuerySet: A Django QuerySet containing ToDoList
             objects filtered by the current user.
         """
         user = self.request.user
-        return ToDoList.objects.filter(user=user)
+        queryset = ToDoList.objects.filter(user=user)
+        if self.includes_field('user') and not self.owner_in_envelope():
+            queryset = queryset.select_related('user')
+        return self.sparse_queryset(queryset)
 
     def perform_create(self, serializer):
         """
         Attempts to save the provided serializer with the user from the
-        current request. If an exception occurs, it prints an error message and
+        current request. If an exception occurs, it logs an error message and
         raises the exception.
 
         Parameters:
@@ -191,8 +674,8 @@ class ToDoListView(generics.ListCreateAPIView):
         """
         try:
             serializer.save(user=self.request.user)
-        except Exception as e:
-            print(f"Error in perform_create: {e}")
+        except Exception:
+            logger.exception('Error in perform_create')
             raise
 
     def list(self, request, *args, **kwargs):
@@ -202,6 +685,13 @@ class ToDoListView(generics.ListCreateAPIView):
         returns an HTTP 200 OK response with the serialized data in
         JSON format.
 
+        ETags and caching are handled by ``ConditionalListMixin``.
+        Sending ``page_size`` or ``cursor`` switches to keyset pagination.
+        ``done``, ``due_before``, ``due_after``, ``q`` and ``ordering``
+        (``id`` or ``due_date``, prefix with ``-`` for descending order)
+        filter and sort the list in SQL; see ``ToDoListFilter``. Rows are
+        built by ``values_serializer_class`` when it is set.
+
         Parameters:
         - request: The HTTP request object.
         - *args: Variable length argument list.
@@ -210,21 +700,26 @@ class ToDoListView(generics.ListCreateAPIView):
         Returns:
         - Response object with serialized data and HTTP 200 OK status.
         """
-        queryset = self.get_queryset()
-        serializer = ToDoListSerializer(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK, content_type='application/json')
+        queryset = self.get_list_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.with_owner(self.get_paginated_response(self.serialize_list(page)))
 
+        data = self.serialize_list(queryset)
+        return self.with_owner(Response(data, status=status.HTTP_200_OK, content_type='application/json'))
 
-class ToDoListDetailView(generics.RetrieveUpdateDestroyAPIView):
-    authentication_classes = [TokenAuthentication]
+
+class ToDoListDetailView(ReplicaReadMixin, AsyncRetrieveMixin, ConditionalWriteMixin, SparseFieldsMixin,
+                         generics.RetrieveUpdateDestroyAPIView):
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
-    queryset = ToDoList.objects.all()
+    queryset = ToDoList.objects.select_related('user')
     serializer_class = ToDoListSerializer
 
     def perform_update(self, serializer):
         """
         Attempts to save updated data via serializer with the user from the
-        request context. If an error occurs, it prints the error message and
+        request context. If an error occurs, it logs the error message and
         re-raises the exception.
         
         :param serializer: The serializer instance that contains validated data
@@ -234,15 +729,27 @@ class ToDoListDetailView(generics.RetrieveUpdateDestroyAPIView):
         """
         try:
             serializer.save(user=self.request.user)
-        except Exception as e:
-            print(f"Error in perform_update: {e}")
+        except Exception:
+            logger.exception('Error in perform_update')
             raise
 
+    def perform_destroy(self, instance):
+        """
+        Soft-deletes the todo, leaving a tombstone so that clients using
+        the sync endpoint learn about the deletion.
+
+        :param instance: The ToDoList instance to delete
+        :type instance: ToDoList
+        """
+        instance.soft_delete()
+
     def retrieve(self, request, *args, **kwargs):
         """
         Retrieves a single instance of a ToDoList based on the provided
         request parameters, serializes the data, and returns it with an
-        HTTP 200 OK status in JSON format.
+        HTTP 200 OK status in JSON format. A matching ``If-None-Match``
+        short-circuits to 304 before serialization. The output honours
+        ``?fields=`` and ``?omit=``.
 
         Args:
             request: The HTTP request object.
@@ -254,5 +761,510 @@ class ToDoListDetailView(generics.RetrieveUpdateDestroyAPIView):
             data and an HTTP 200 OK status.
         """
         instance = self.get_object()
-        serializer = ToDoListSerializer(instance)
-        return Response(serializer.data, status=status.HTTP_200_OK, content_type='application/json')
+        etag = instance_etag(instance, request)
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return not_modified(etag)
+
+        serializer = self.get_serializer(instance)
+        response = Response(serializer.data, status=status.HTTP_200_OK, content_type='application/json')
+        response['ETag'] = etag
+        return response
+
+
+class DashboardView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    today_query_param = 'today'
+
+    def get(self, request, *args, **kwargs):
+        """
+        Returns everything the landing page needs in one response: the
+        user's todos and shopping lists, per-list item counts and todo
+        counts (open, done, overdue, due today).
+
+        The owner is sent once as ``user`` and omitted from the rows,
+        which otherwise look exactly like the list endpoints' rows. The
+        response is built from a fixed number of queries whatever the
+        data size: one aggregate per collection for the ETag, one for
+        the todos, one for the shopping lists and one for their items.
+        All counts are computed from those rows.
+
+        ``?today=YYYY-MM-DD`` sets the client's local date for the
+        overdue and due-today counts; the server's date is used
+        otherwise.
+
+        Parameters:
+        - request: The HTTP request object.
+        - *args: Variable length argument list.
+        - **kwargs: Arbitrary keyword arguments.
+
+        Returns:
+        - Response object with the dashboard data and HTTP 200 OK status,
+        or 304 if the client's ``If-None-Match`` is still current.
+        """
+        today = self.get_today(request)
+        user = request.user
+        etag = make_etag(
+            collection_etag(ToDoList.all_objects.filter(user=user), request),
+            collection_etag(ShoppingList.all_objects.filter(user=user), request),
+            today.isoformat(),
+        )
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return not_modified(etag)
+
+        context = {'request': request, 'view': self, 'owner_in_envelope': True}
+        todo_reader = ToDoListValuesSerializer(context=context)
+        # The counts use the column values, not their rendered form.
+        todo_rows = list(todo_reader.get_queryset(ToDoList.objects.filter(user=user).order_by('id')))
+        todo_lists = todo_reader.to_representation(todo_rows)
+        shopping_reader = ShoppingListValuesSerializer(context=context)
+        shopping_lists = shopping_reader.to_representation(
+            shopping_reader.get_queryset(ShoppingList.objects.filter(user=user).order_by('id'))
+        )
+
+        open_due_dates = [row['due_date'] for row in todo_rows if not row['done']]
+        response = Response({
+            'user': UserSerializer(user).data,
+            'todo_lists': todo_lists,
+            'shopping_lists': shopping_lists,
+            'counts': {
+                'todo_lists': {
+                    'total': len(todo_rows),
+                    'open': len(open_due_dates),
+                    'done': len(todo_rows) - len(open_due_dates),
+                    'overdue': sum(1 for due_date in open_due_dates if due_date is not None and due_date < today),
+                    'due_today': sum(1 for due_date in open_due_dates if due_date == today),
+                },
+                'shopping_lists': {
+                    str(shopping_list['id']): {
+                        'items': len(shopping_list['items']),
+                        'checked': sum(1 for item in shopping_list['items'] if item['checked']),
+                    }
+                    for shopping_list in shopping_lists
+                },
+            },
+        }, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        return response
+
+    def get_today(self, request):
+        value = request.query_params.get(self.today_query_param)
+        if value is None:
+            return timezone.localdate()
+        try:
+            return datetime.date.fromisoformat(value)
+        except ValueError:
+            raise ValidationError({self.today_query_param: 'Expected a date in YYYY-MM-DD format.'})
+
+
+class BatchView(APIView):
+    """
+    Runs a list of API calls sent in one request.
+
+    The body looks like ``{"requests": [{"method": "PATCH", "path":
+    "/api/todo-lists/1/", "body": {...}, "headers": {...}}, ...],
+    "atomic": false}``. The caller is authenticated once; every entry is
+    dispatched in-process to the view its path resolves to, skipping the
+    middleware and token lookup a separate HTTP request would cost.
+
+    Only this module's views can be batched, and not those that set
+    ``batchable = False``: the batch view itself and the streaming and
+    NDJSON views, whose bodies do not fit in a JSON entry.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    max_batch_size = 100
+    batchable = False
+
+    def post(self, request, *args, **kwargs):
+        """
+        Dispatches the sub-requests in order and returns their results in
+        the same order, each as ``{"status", "headers", "body"}``.
+
+        With ``"atomic": true`` all sub-requests share one transaction:
+        the first one that fails (status 400 or above) rolls everything
+        back, and the entries after it are not run and report status 424.
+        Otherwise each sub-request commits on its own and a failure does
+        not stop the others.
+
+        Parameters:
+        - request: The HTTP request object.
+        - *args: Variable length argument list.
+        - **kwargs: Arbitrary keyword arguments.
+
+        Returns:
+        - Response object with ``responses`` and ``committed``, and HTTP
+        200 OK status.
+        """
+        entries = request.data.get('requests') if isinstance(request.data, dict) else None
+        if not isinstance(entries, list) or not entries:
+            raise ValidationError({'requests': 'Expected a non-empty list.'})
+        if len(entries) > self.max_batch_size:
+            raise ValidationError({'requests': f'A batch may contain at most {self.max_batch_size} requests.'})
+        atomic = request.data.get('atomic', False)
+        if not isinstance(atomic, bool):
+            raise ValidationError({'atomic': 'Expected a boolean.'})
+
+        prepared = []
+        for index, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                raise ValidationError({'requests': {index: 'Expected an object.'}})
+            try:
+                subrequest, match = build_subrequest(
+                    request, entry.get('method'), entry.get('path'), entry.get('body'), entry.get('headers'),
+                )
+            except SubRequestError as error:
+                raise ValidationError({'requests': {index: str(error)}})
+            view_class = getattr(match.func, 'view_class', None)
+            if (view_class is None or not issubclass(view_class, APIView)
+                    or view_class.__module__ != __name__ or not getattr(view_class, 'batchable', True)):
+                raise ValidationError({'requests': {index: f'"{entry["path"]}" cannot be batched.'}})
+            prepared.append((subrequest, match))
+
+        # Sub-requests have no cookies; keep reads on the primary if the
+        # client is pinned or the batch itself writes.
+        pinned = is_pinned(request) or any(subrequest.method not in SAFE_METHODS for subrequest, _ in prepared)
+        for subrequest, _ in prepared:
+            subrequest.pin_to_primary = pinned
+
+        if not atomic:
+            results = [self.run(subrequest, match) for subrequest, match in prepared]
+            return Response({'responses': results, 'committed': True}, status=status.HTTP_200_OK)
+
+        results = []
+        with transaction.atomic():
+            for subrequest, match in prepared:
+                result = self.run(subrequest, match)
+                results.append(result)
+                if result['status'] >= 400:
+                    transaction.set_rollback(True)
+                    break
+        committed = len(results) == len(prepared) and results[-1]['status'] < 400
+        results += [
+            {'status': status.HTTP_424_FAILED_DEPENDENCY, 'headers': {}, 'body': None}
+            for _ in range(len(prepared) - len(results))
+        ]
+        return Response({'responses': results, 'committed': committed}, status=status.HTTP_200_OK)
+
+    def run(self, subrequest, match):
+        status_code, headers, data = run_subrequest(subrequest, match)
+        return {'status': status_code, 'headers': headers, 'body': data}
+
+
+class SyncView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Returns the todos and shopping lists that were created, changed or
+        deleted since the ``since`` cursor, for both models in one
+        response.
+
+        Without ``since`` a full snapshot of the live rows is returned.
+        The response carries a new ``cursor`` to send on the next call.
+        Rows changed shortly before ``since`` are sent again (see
+        ``collect_changes``), so clients must apply changes by id.
+        If ``since`` is older than the tombstone retention window the
+        server cannot prove which rows were deleted, so it answers with a
+        full snapshot and ``reset`` set to true; the client should then
+        replace its local copy.
+
+        Parameters:
+        - request: The HTTP request object.
+        - *args: Variable length argument list.
+        - **kwargs: Arbitrary keyword arguments.
+
+        Returns:
+        - Response object with the changes and HTTP 200 OK status.
+        """
+        since = decode_cursor(request.query_params.get('since'))
+        reset = since is not None and since < tombstone_horizon()
+        if reset:
+            since = None
+
+        user = request.user
+        context = {'request': request, 'view': self}
+        todo_lists, todo_latest = collect_changes(
+            ToDoList.all_objects.filter(user=user).select_related('user'),
+            since, ToDoListSerializer, context,
+        )
+        shopping_lists, shopping_latest = collect_changes(
+            ShoppingList.all_objects.filter(user=user).select_related('user').prefetch_related('items'),
+            since, ShoppingListSerializer, context,
+        )
+        latest = max(
+            (timestamp for timestamp in (since, todo_latest, shopping_latest) if timestamp is not None),
+            default=None,
+        )
+        return Response({
+            'cursor': encode_cursor(latest),
+            'reset': reset,
+            'todo_lists': todo_lists,
+            'shopping_lists': shopping_lists,
+        }, status=status.HTTP_200_OK)
+
+
+class ExportView(ReplicaReadMixin, APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    batchable = False
+    chunk_size = 2000
+
+    def get(self, request, *args, **kwargs):
+        """
+        Streams all of the user's todos, shopping lists and items as
+        newline-delimited JSON, or as CSV with ``?as=csv``.
+
+        The body is produced while it is sent, from database cursors
+        read ``chunk_size`` rows at a time, so the worker's memory does
+        not depend on the size of the export. The output can be sent
+        back to ``ImportView`` unchanged.
+
+        Parameters:
+        - request: The HTTP request object.
+        - *args: Variable length argument list.
+        - **kwargs: Arbitrary keyword arguments.
+
+        Returns:
+        - StreamingHttpResponse with the export as an attachment.
+        """
+        export_format = request.query_params.get('as', 'ndjson')
+        if export_format not in RENDERERS:
+            raise ValidationError({'as': f'Expected one of: {", ".join(RENDERERS)}.'})
+        # The body is read after dispatch returns, outside the replica
+        # routing block, so pick the database now.
+        using = router.db_for_read(ToDoList)
+        records = export_records(request.user, chunk_size=self.chunk_size, using=using)
+        response = StreamingHttpResponse(
+            RENDERERS[export_format](records), content_type=CONTENT_TYPES[export_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="chorify-export.{export_format}"'
+        return response
+
+
+class ImportView(APIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    batchable = False
+    batch_size = 500
+
+    def post(self, request, *args, **kwargs):
+        """
+        Creates the todos, shopping lists and items of an export for the
+        current user.
+
+        The body is an export as produced by ``ExportView``, sent as
+        ``application/x-ndjson`` or ``text/csv``. It is parsed one line
+        at a time as it is read from the request and written with
+        ``bulk_create`` every ``batch_size`` records, in a single
+        transaction: if any record is invalid, nothing is imported and
+        the error names its line.
+
+        Parameters:
+        - request: The HTTP request object.
+        - *args: Variable length argument list.
+        - **kwargs: Arbitrary keyword arguments.
+
+        Returns:
+        - Response object with the number of created rows per record
+        type, and HTTP 201 Created status.
+        """
+        media_type = (request.content_type or '').split(';')[0].strip().lower()
+        import_format = next((name for name, value in CONTENT_TYPES.items() if value == media_type), None)
+        if import_format is None:
+            raise UnsupportedMediaType(media_type)
+        # The raw body, without buffering it the way ``request.data`` would.
+        lines = request.stream if request.stream is not None else []
+        counts = Importer(request.user, batch_size=self.batch_size).run(READERS[import_format](lines))
+        return Response({'created': counts}, status=status.HTTP_201_CREATED)
+
+
+class BulkWriteView(APIView):
+    """
+    Applies many creates, partial updates and deletes for the current
+    user in a single request and a single transaction.
+
+    The body looks like ``{"create": [...], "update": [{"id": 1, ...}],
+    "delete": [2, 3]}``; every key is optional. Rows are validated with
+    ``serializer_class(many=True)`` and written with ``bulk_create``,
+    ``bulk_update`` and one soft-delete UPDATE, so the number of queries
+    does not depend on the batch size.
+    """
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    model = None
+    serializer_class = None
+    cache_resource = None
+    max_batch_size = 500
+    # Nested serializer fields that are stored in other tables; they are
+    # handed to ``save_related`` instead of being set on the model.
+    related_fields = ()
+    response_prefetch = ()
+
+    def post(self, request, *args, **kwargs):
+        """
+        Validates the whole batch first and then writes it atomically.
+        Nothing is written if any row is invalid or refers to a row the
+        user does not own.
+
+        Parameters:
+        - request: The HTTP request object.
+        - *args: Variable length argument list.
+        - **kwargs: Arbitrary keyword arguments.
+
+        Returns:
+        - Response object with the ``created`` and ``updated`` rows and
+        the ``deleted`` ids, and HTTP 200 OK status.
+        """
+        creates = self.get_list(request.data, 'create')
+        updates = self.get_list(request.data, 'update')
+        deletes = self.get_list(request.data, 'delete')
+        if len(creates) + len(updates) + len(deletes) > self.max_batch_size:
+            raise ValidationError({'detail': f'A batch may contain at most {self.max_batch_size} operations.'})
+
+        context = {'request': request, 'view': self}
+        create_serializer = self.serializer_class(data=creates, many=True, context=context)
+        if not create_serializer.is_valid():
+            raise ValidationError({'create': create_serializer.errors})
+
+        update_ids = [self.get_id(row, 'update') for row in updates]
+        if len(set(update_ids)) != len(update_ids):
+            raise ValidationError({'update': 'Each id may only be updated once per batch.'})
+        update_serializer = self.serializer_class(
+            data=[{key: value for key, value in row.items() if key != 'id'} for row in updates],
+            many=True, partial=True, context=context,
+        )
+        if not update_serializer.is_valid():
+            raise ValidationError({'update': update_serializer.errors})
+        delete_ids = [self.get_id(row, 'delete') for row in deletes]
+
+        user = request.user
+        with transaction.atomic():
+            updated = self.apply_updates(user, update_ids, update_serializer.validated_data)
+            deleted = self.apply_deletes(user, delete_ids)
+            related = [self.pop_related(attrs) for attrs in create_serializer.validated_data]
+            created = self.model.objects.bulk_create([
+                self.model(user=user, **attrs) for attrs in create_serializer.validated_data
+            ])
+            self.save_related(list(zip(created, related)), created=True)
+
+        invalidate_lists(user.pk, [self.cache_resource])
+        # bulk_create, bulk_update and the soft-delete UPDATE send no
+        # model signals, so the event stream is fed here.
+        for action, instances in (('created', created), ('updated', updated)):
+            for instance in instances:
+                publish_event(user.pk, self.cache_resource, action, instance.pk, instance.updated_at)
+        for pk in deleted:
+            publish_event(user.pk, self.cache_resource, 'deleted', pk)
+        if self.response_prefetch:
+            prefetch_related_objects(created + updated, *self.response_prefetch)
+        return Response({
+            'created': self.serializer_class(created, many=True, context=context).data,
+            'updated': self.serializer_class(updated, many=True, context=context).data,
+            'deleted': deleted,
+        }, status=status.HTTP_200_OK)
+
+    def get_list(self, data, key):
+        value = data.get(key, []) if isinstance(data, dict) else None
+        if not isinstance(value, list):
+            raise ValidationError({key: 'Expected a list.'})
+        return value
+
+    def get_id(self, row, key):
+        value = row.get('id') if isinstance(row, dict) else row
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValidationError({key: 'Every entry needs an integer id.'})
+        return value
+
+    def apply_updates(self, user, ids, rows):
+        """
+        Locks the user's rows named in ``ids``, applies the validated
+        partial updates and saves them with one ``bulk_update``.
+
+        ``updated_at`` is set explicitly because ``bulk_update`` does not
+        run ``auto_now``.
+        """
+        if not ids:
+            return []
+        queryset = self.model.objects.select_for_update(of=('self',)).select_related('user')
+        instances = queryset.filter(user=user).in_bulk(ids)
+        missing = [pk for pk in ids if pk not in instances]
+        if missing:
+            raise ValidationError({'update': f'Not found: {missing}'})
+
+        now = timezone.now()
+        fields = {'updated_at'}
+        updated = []
+        related = []
+        for pk, attrs in zip(ids, rows):
+            instance = instances[pk]
+            related.append((instance, self.pop_related(attrs)))
+            for name, value in attrs.items():
+                setattr(instance, name, value)
+                fields.add(name)
+            instance.updated_at = now
+            updated.append(instance)
+        self.model.objects.bulk_update(updated, sorted(fields))
+        self.save_related(related, created=False)
+        return updated
+
+    def pop_related(self, attrs):
+        return {name: attrs.pop(name) for name in self.related_fields if name in attrs}
+
+    def save_related(self, pairs, created):
+        """
+        Writes the nested ``related_fields`` of each ``(instance, values)``
+        pair. ``created`` tells whether the instances were just inserted.
+        """
+
+    def apply_deletes(self, user, ids):
+        """
+        Soft-deletes the user's rows named in ``ids`` with one UPDATE and
+        returns their ids. Like ``apply_updates`` it fails if any of them
+        is not a live row of the user.
+        """
+        if not ids:
+            return []
+        queryset = self.model.objects.select_for_update().filter(user=user, pk__in=ids)
+        found = set(queryset.values_list('pk', flat=True))
+        missing = [pk for pk in ids if pk not in found]
+        if missing:
+            raise ValidationError({'delete': f'Not found: {missing}'})
+        deleted = sorted(found)
+        self.model.objects.filter(pk__in=deleted).soft_delete()
+        return deleted
+
+
+class ShoppingListBulkView(BulkWriteView):
+    model = ShoppingList
+    serializer_class = ShoppingListSerializer
+    cache_resource = 'shopping-list'
+    related_fields = ('items',)
+    response_prefetch = ('items',)
+
+    def save_related(self, pairs, created):
+        """
+        New lists get all their items in one ``bulk_create``; updated
+        lists are diffed against their stored items by ``sync_items``.
+        """
+        if not created:
+            for shopping_list, related in pairs:
+                if 'items' in related:
+                    sync_items(shopping_list, related['items'])
+            return
+        ShoppingItem.objects.bulk_create([
+            ShoppingItem(
+                shopping_list=shopping_list,
+                position=POSITION_STEP * (index + 1),
+                **{name: value for name, value in data.items() if name != 'id'},
+            )
+            for shopping_list, related in pairs
+            for index, data in enumerate(related.get('items', []))
+        ])
+
+
+class ToDoListBulkView(BulkWriteView):
+    model = ToDoList
+    serializer_class = ToDoListSerializer
+    cache_resource = 'todo-list'
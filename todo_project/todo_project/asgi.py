@@ -9,8 +9,22 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todo_project.settings')
+# Reads are served by the async views when running under ASGI.
+os.environ.setdefault('TODO_API_ASYNC_VIEWS', 'True')
+# Requests run in fresh threads, so share pooled connections between them.
+os.environ.setdefault('DATABASE_POOL', 'True')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+# Imported once Django is set up. The handler streams response bodies
+# (the export) from a thread; EventStream serves the /api/events/ change
+# feed and passes every other request to Django.
+from todo_api.handlers import StreamingASGIHandler  # noqa: E402
+from todo_api.sse import EventStream  # noqa: E402
+
+django_application = StreamingASGIHandler()
+
+application = EventStream(django_application)
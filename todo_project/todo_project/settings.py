@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 from pathlib import Path
-from decouple import AutoConfig, config
+from decouple import AutoConfig, Csv, config
 from django.core.exceptions import ImproperlyConfigured
 import os
 
@@ -75,6 +75,19 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'X-CSRFToken',
     'x-requested-with',
+    'if-match',
+    'if-none-match',
+    'x-primary-until',
+]
+
+CORS_EXPOSE_HEADERS = [
+    'etag',
+    'ratelimit-limit',
+    'ratelimit-remaining',
+    'ratelimit-reset',
+    'retry-after',
+    'server-timing',
+    'x-primary-until',
 ]
 
 CSRF_COOKIE_NAME = "csrftoken"
@@ -84,11 +97,15 @@ CORS_ALLOW_CREDENTIALS = True
 SITE_ID = 1
 
 MIDDLEWARE = [
+    # First, so its timings include the other middleware.
+    'todo_api.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'todo_api.middleware.ReplicaPinningMiddleware',
+    'todo_api.middleware.RateLimitHeadersMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -119,17 +136,49 @@ WSGI_APPLICATION = 'todo_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Connection reuse. Sync (WSGI) workers keep each thread's connection open
+# for CONN_MAX_AGE seconds; with CONN_HEALTH_CHECKS it is pinged before
+# being reused by a new request. Under ASGI every request runs in a new
+# thread, so per-thread connections cannot be reused: set DATABASE_POOL to
+# share a per-process pool of DATABASE_POOL_MAX_SIZE connections instead
+# (asgi.py does). Keep pool size x worker processes under the server's
+# connection limit. `manage.py bench_connections` compares the options.
+DATABASE_POOL = config('DATABASE_POOL', default=False, cast=bool)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'todo_api.db.pooled_postgresql' if DATABASE_POOL else 'django.db.backends.postgresql',
         'NAME': config('DATABASE_NAME'),
         'USER': config('DATABASE_USER'),
         'PASSWORD': config('DATABASE_PASSWORD'),
         'HOST': config('DATABASE_HOST'),
         'PORT': config('DATABASE_PORT'),
+        # Pooled connections go back to the pool after each request.
+        'CONN_MAX_AGE': config('CONN_MAX_AGE', default=0 if DATABASE_POOL else 60, cast=int),
+        'CONN_HEALTH_CHECKS': config('CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'POOL': {
+            'MAX_SIZE': config('DATABASE_POOL_MAX_SIZE', default=10, cast=int),
+            'TIMEOUT': config('DATABASE_POOL_TIMEOUT', default=5, cast=float),
+            # Only connections idle this long are pinged before reuse.
+            'HEALTH_CHECK_AFTER': config('DATABASE_POOL_HEALTH_CHECK_AFTER', default=1, cast=float),
+        },
     }
 }
 
+# Read replicas: a comma-separated list of hosts sharing the primary's
+# name and credentials. Safe requests to the todo and shopping list
+# endpoints read from them, except for clients that wrote within the last
+# TODO_API_REPLICA_PIN_SECONDS (tracked in a cookie and the
+# X-Primary-Until header). Keep the list cache's VALIDATE on with
+# replicas. To try it locally, add a second database (e.g. another SQLite
+# file) to DATABASES and list its alias in TODO_API_READ_REPLICAS.
+for index, host in enumerate(config('DATABASE_REPLICA_HOSTS', default='', cast=Csv())):
+    DATABASES[f'replica{index + 1}'] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+
+TODO_API_READ_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+TODO_API_REPLICA_PIN_SECONDS = config('TODO_API_REPLICA_PIN_SECONDS', default=5, cast=int)
+DATABASE_ROUTERS = ['todo_api.routers.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -158,12 +207,139 @@ AUTHENTICATION_BACKENDS = [
 ]
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'todo_api.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Only views with a throttle_scope listed in TODO_API_THROTTLE are limited.
+    'DEFAULT_THROTTLE_CLASSES': (
+        'todo_api.throttling.UserBucketThrottle',
+        'todo_api.throttling.IPBucketThrottle',
+    ),
+    # Proxies in front of the app that append to X-Forwarded-For (Heroku's
+    # router is one). Per-IP throttles key on the address the last of them
+    # saw, so clients cannot pick their bucket by sending the header.
+    'NUM_PROXIES': config('TODO_API_NUM_PROXIES', default=1, cast=int),
+    # orjson-backed JSON; both fall back to the stdlib if orjson is missing.
+    'DEFAULT_RENDERER_CLASSES': (
+        'todo_api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'todo_api.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # Hand date objects to the renderer, which encodes them natively.
+    'DATE_FORMAT': None,
 }
+
+# Cache of list responses, keyed by user and resource. Entries are
+# invalidated by model signals. With VALIDATE on, each hit is checked
+# against the collection ETag, which keeps per-process backends correct
+# when several workers serve the same user. Use
+# 'todo_api.cache.DjangoCacheBackend' with a shared cache to skip that check.
+TODO_API_LIST_CACHE = {
+    'BACKEND': 'todo_api.cache.LRUCacheBackend',
+    'OPTIONS': {
+        'max_entries': 2048,
+    },
+    'VALIDATE': True,
+}
+
+# Token -> user lookups for CachedTokenAuthentication. Entries are
+# dropped on logout, token deletion and user changes; the timeout bounds
+# how long another worker process may still serve an invalidated entry.
+TODO_API_TOKEN_CACHE = {
+    'BACKEND': 'todo_api.cache.LRUCacheBackend',
+    'OPTIONS': {
+        'max_entries': 4096,
+        'timeout': 60,
+    },
+}
+
+# Token-bucket rate limits, per throttle scope (a view's throttle_scope)
+# and per authenticated user and/or client IP, in DRF's 'N/period' format.
+# A bucket holds N requests and refills over the period. The in-process
+# backend keeps buckets per worker process; use
+# 'todo_api.throttling.DjangoCacheBucketBackend' with a shared cache to
+# count across workers. Set to None to disable throttling.
+TODO_API_THROTTLE = {
+    'BACKEND': 'todo_api.throttling.InProcessBucketBackend',
+    'OPTIONS': {
+        'max_entries': 10000,
+    },
+    'RATES': {
+        # Registration, login and password changes hash passwords.
+        'register': {'ip': config('TODO_API_REGISTER_RATE', default='10/hour')},
+        'dj_rest_auth': {'ip': config('TODO_API_AUTH_RATE', default='60/minute')},
+        'lists': {
+            'user': config('TODO_API_LIST_USER_RATE', default='300/minute'),
+            'ip': config('TODO_API_LIST_IP_RATE', default='600/minute'),
+        },
+    },
+}
+
+# Serve list and detail reads from the async views (todo_api/async_views.py).
+# Only worthwhile under ASGI; asgi.py turns it on by default.
+TODO_API_ASYNC_VIEWS = config('TODO_API_ASYNC_VIEWS', default=False, cast=bool)
+
+# Pub/sub behind the /api/events/ change feed (served under ASGI only;
+# under WSGI the path answers 501). The in-process broker only reaches
+# streams held by the same process, so gunicorn.conf.py turns the feed
+# off (503) when it runs more than one ASGI worker; plug in a broker
+# shared between processes to scale out. Set to None to disable the feed.
+TODO_API_EVENT_BROKER = {
+    'BACKEND': 'todo_api.events.InProcessBroker',
+    'OPTIONS': {
+        'max_queued': 100,
+    },
+}
+
+# Per-request instrumentation (todo_api.middleware.RequestTimingMiddleware):
+# a Server-Timing header on every response (off unless DEBUG, since it
+# shows any client the database time and query count) and a warning on the
+# todo_api.performance logger, listing up to MAX_LOGGED_QUERIES of the
+# slowest queries, for requests taking SLOW_REQUEST_MS or more (None
+# turns the log off).
+TODO_API_INSTRUMENTATION = {
+    'SERVER_TIMING': config('TODO_API_SERVER_TIMING', default=DEBUG, cast=bool),
+    'SLOW_REQUEST_MS': config('TODO_API_SLOW_REQUEST_MS', default=500, cast=int),
+    'MAX_LOGGED_QUERIES': 20,
+}
+
+# Bearer token Prometheus must send to scrape /metrics. Unset, the
+# endpoint is only open with DEBUG on and answers 403 otherwise.
+TODO_API_METRICS_TOKEN = config('TODO_API_METRICS_TOKEN', default=None)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'todo_api': {
+            'handlers': ['console'],
+            'level': config('TODO_API_LOG_LEVEL', default='INFO'),
+        },
+    },
+}
+
+# Tombstones of deleted todos and shopping lists are kept this long so that
+# clients using /api/sync/ can learn about deletions.
+SYNC_TOMBSTONE_RETENTION_DAYS = 30
+
+# updated_at is stamped when a row is saved, not when its transaction
+# commits, so a row can become visible with a timestamp older than a
+# cursor already handed out. Each sync re-reads this many seconds before
+# its cursor (clients apply changes by id, so repeats are harmless); it
+# must exceed the longest write transaction plus clock skew between hosts.
+SYNC_CURSOR_OVERLAP_SECONDS = config('SYNC_CURSOR_OVERLAP_SECONDS', default=60, cast=int)
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 
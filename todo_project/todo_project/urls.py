@@ -3,11 +3,16 @@ from django.urls import path, re_path, include
 from django.views.generic import TemplateView
 from django.conf import settings
 from django.conf.urls.static import static
+from todo_api.metrics import metrics_view
+from todo_api.sse import event_stream_unavailable
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('todo_api.urls')),
+    # Served by todo_api.sse.EventStream under ASGI, before Django.
+    path('api/events/', event_stream_unavailable, name='events'),
     path('auth/', include('dj_rest_auth.urls')),
     path('auth/registration/', include('dj_rest_auth.registration.urls')),
+    path('metrics', metrics_view, name='metrics'),
     re_path(r'^.*$', TemplateView.as_view(template_name='index.html')),
 ]